@@ -1,50 +1,211 @@
 import os
 import csv
+import time
+import shutil
 import ac
 import acsys
 from third_party import sim_info
 from collections import deque
+from lap_writer import LapWriter
+from lap_buffer import LapBuffer, CHANNELS, LABELS
+from throttled_ui import ThrottledUI
+from physics_sampler import PhysicsSampler, scaled_frames
+from labeling import calculate_label_improved, HISTORY_SIZE
+from features import FeatureEngine, YAW_RATE, LAT_ACCEL, SPEED, EMA_FRAMES
+from frame_timer import FrameTimer
+from handling_model import HandlingModel, StreamingClassifier, MODEL_FEATURES
+from corners import load_corners, NO_CORNER
+from lap_delta import LapTrace, ReferenceLap, build_reference, reference_path, REFERENCE_POINTS, MIN_COVERAGE
+import binlog
 
 # Settings
 log_file = os.path.join(os.path.dirname(__file__), "third_party", "log.csv")
+binary_log_file = os.path.join(os.path.dirname(__file__), "third_party", "log.bin")
+incomplete_log_file = os.path.join(os.path.dirname(__file__), "third_party", "log_incomplete.csv")
+corners_file = os.path.join(os.path.dirname(__file__), "third_party", "track_corners.json")
+reference_dir = os.path.join(os.path.dirname(__file__), "third_party", "reference_laps")  # Best lap per car/track
+log_formats = ("csv", "binary")  # Outputs written for every lap (see binlog.py)
+session_id = int(time.time())  # Groups this session's laps in the binary log
+ui_refresh_hz = 10  # Window redraws per second (telemetry is still logged every frame)
+ui = ThrottledUI(ui_refresh_hz)
+
+# Optional physics sampler thread: log every physics tick (deduplicated by
+# packetId) instead of one frame per acUpdate
+sampler_enabled = False
+sampler_hz = 500  # Polling rate, above AC's 333 Hz physics rate
+sampler_capacity = 2048  # Ring buffer frames (~6s of physics ticks)
+sampler = None
+
+# Optional frame-time instrumentation: per-phase histograms, p50/p99/max in
+# the window and the session log, warnings above the per-frame budget
+timing_enabled = False
+frame_budget_ms = 1.0  # Logger time per frame before it counts as an overrun
+frame_timer = None
+TIMING_PHASES = ("fetch", "label", "append", "model", "ui", "lap", "save")
+FETCH, LABEL, APPEND, MODEL, UI, LAP, SAVE = range(len(TIMING_PHASES))
+
+# Optional trained handling classifier (train_model.py), shown next to the
+# rule-based label; only runs if model_file exists
+inference_enabled = True
+model_file = os.path.join(os.path.dirname(__file__), "third_party", "handling_model.bin")
+inference_budget_ms = 0.5  # Model time allowed in any one frame - slower predictions are split across frames
+classifier = None
 
 # Lap Count Tracking
 lapcount = 0
-current_lap_data = []
+lap_buffer_chunk = 1024  # Frames per flushed chunk (~17s at 60fps) - at most this is lost in a crash
+current_lap_data = LapBuffer(lap_buffer_chunk)
+
+# Buffers returned by the writer thread once saved (deque ops are thread-safe)
+spare_lap_buffers = deque()
 
 # REAL-TIME LABEL TRACKING (per session)
 session_labels = {'Neutral': 0, 'Understeer': 0, 'Oversteer': 0}
 current_lap_labels = {'Neutral': 0, 'Understeer': 0, 'Oversteer': 0}
+session_total = 0  # Running sum of session_labels
+last_frame = None  # Values of the most recent logged frame, for the UI
+
+# Corners of the current track (loaded on the first lap, None if the track has none)
+corner_index = None
+corner_track = None
+
+# LIVE DELTA - reference lap lookup table, replaced by the reference worker thread
+reference_lap = None
+best_lap_time = None  # ms, of reference_lap or of a new best still being built
+current_trace = LapTrace(REFERENCE_POINTS)
+live_delta = None  # Seconds vs reference, last valid value
+last_current_time = 0  # iCurrentTime of the previous frame = lap time at the line
+
+# Telemetry decoded from each frame snapshot (see sim_info.SimInfo.snapshot)
+physics_fields = (
+    'localAngularVel', 'accG', 'steerAngle', 'speedKmh', 'localVelocity', 'wheelSlip',
+    'gas', 'brake', 'gear', 'roadTemp', 'airTemp', 'heading', 'pitch', 'roll'
+)
+graphics_fields = ('surfaceGrip', 'normalizedCarPosition', 'iCurrentTime', 'carCoordinates', 'completedLaps')
+physics_layout = sim_info.page_layout(sim_info.SPageFilePhysics, *physics_fields)
+graphics_layout = sim_info.page_layout(sim_info.SPageFileGraphic, *graphics_fields)
+
+read_physics = sim_info.field_getter(
+    physics_layout,
+    ('localAngularVel', 2), ('accG', 0), ('accG', 1), ('accG', 2),
+    'steerAngle', 'speedKmh', ('localVelocity', 0), ('localVelocity', 1), ('localVelocity', 2),
+    ('wheelSlip', 0), ('wheelSlip', 1), ('wheelSlip', 2), ('wheelSlip', 3),
+    'gas', 'brake', 'gear',
+    'roadTemp', 'airTemp',
+    'heading', 'pitch', 'roll'
+)
+read_graphics = sim_info.field_getter(
+    graphics_layout,
+    'surfaceGrip', 'normalizedCarPosition', 'iCurrentTime',
+    ('carCoordinates', 0), ('carCoordinates', 1), ('carCoordinates', 2)
+)
+read_completed_laps = sim_info.field_getter(graphics_layout, 'completedLaps')
+
+# IMPROVED LABELING - Rolling window for rate of change calculations (and logged features)
+history_size = HISTORY_SIZE  # Look at last 5 frames (~0.08 seconds at 60fps); in physics ticks with the sampler
+features = FeatureEngine(history_size)
+
+def partial_log_file():
+    """Chunks of the lap in progress; moved to log.csv when the lap completes"""
+    return log_file + ".partial"
+
+
+# Column order of log.csv (channels as in lap_buffer.CHANNELS)
+CSV_HEADER = ["Lap", "CarModel", "Track"] + [name for name, _ in CHANNELS]
 
-# IMPROVED LABELING - Store recent history for rate of change calculations
-history_size = 5  # Look at last 5 frames (~0.08 seconds at 60fps)
-yaw_history = deque(maxlen=history_size)
-lat_accel_history = deque(maxlen=history_size)
-steer_history = deque(maxlen=history_size)
-speed_history = deque(maxlen=history_size)
-
-# Ensure the CSV file exists with header including Label
-if not os.path.exists(log_file):
-    with open(log_file, "w", newline="") as file:
-        writer = csv.writer(file, delimiter=";")
-        writer.writerow([
-            "Lap", "CarModel", "Track", "TrackPos", "CurrentTime",
-            "YawRate", "LateralAccel", "LongitudinalAccel", "VerticalAccel",
-            "SteerAngle", "Speed", "LocalVelX", "LocalVelY", "LocalVelZ",
-            "WheelSlipFL", "WheelSlipFR", "WheelSlipRL", "WheelSlipRR",
-            "Throttle", "Brake", "Gear",
-            "SurfaceGrip", "RoadTemp", "AirTemp",
-            "Heading", "Pitch", "Roll",
-            "CarX", "CarY", "CarZ",
-            "SlipDiff", "YawGradient", "Label"  # Added YawGradient for better analysis
-        ])
+
+def write_csv_header(path):
+    """Create a CSV log with header including Label (if it does not exist yet)"""
+    if not os.path.exists(path):
+        with open(path, "w", newline="") as file:
+            writer = csv.writer(file, delimiter=";")
+            writer.writerow(CSV_HEADER)
+
+
+def rotate_log(path):
+    """Move a log written with an older column layout aside (log.<date>.csv) so new laps start a fresh file"""
+    root, ext = os.path.splitext(path)
+    stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(os.path.getmtime(path)))
+    rotated = "{}.{}{}".format(root, stamp, ext)
+    os.rename(path, rotated)
+    ac.log("Log layout changed - moved {} to {}".format(os.path.basename(path), os.path.basename(rotated)))
+
+
+def csv_header_matches(path):
+    with open(path, "r", newline="", errors="replace") as file:
+        header = file.readline()
+    return header.rstrip("\r\n").split(";") == CSV_HEADER
+
+
+def finish_partial_lap(complete):
+    """Append the lap in progress to log.csv, or to the incomplete log if it never finished"""
+    partial = partial_log_file()
+    if not os.path.exists(partial):
+        return
+    target = log_file if complete else incomplete_log_file
+    write_csv_header(target)
+    with open(partial, "rb") as source, open(target, "ab") as destination:
+        shutil.copyfileobj(source, destination)
+    os.remove(partial)
+
+
+def ensure_log_file():
+    """
+    Ensure the CSV log exists; a lap left behind by a crash goes to the incomplete log
+    Logs with a different column layout (e.g. from before the Corner column) are rotated
+    """
+    if "csv" in log_formats:
+        finish_partial_lap(complete=False)
+        for path in (log_file, incomplete_log_file):
+            if os.path.exists(path) and not csv_header_matches(path):
+                rotate_log(path)
+        write_csv_header(log_file)
+    
+    if "binary" in log_formats and os.path.exists(binary_log_file):
+        if binlog.channel_layout(binary_log_file) not in (None, list(CHANNELS)):
+            rotate_log(binary_log_file)
 
 def acMain(ac_version):
     global l_lapcount, l_status, l_yaw, l_lataccel, l_slip_diff
     global l_conditions, l_speed, l_session_stats, l_lap_stats, l_recommendation
+    global l_timing, l_delta, l_model
+    
+    global sampler, frame_timer, classifier, history_size, features
+    
+    # Created here rather than at import so the log paths can be redirected
+    # first (see replay.py)
+    ensure_log_file()
+    
+    # Finished laps are written on a background thread
+    lap_writer.start()
+    reference_worker.start()
+    
+    if sampler_enabled:
+        # Frames are physics ticks now: keep the label window at the same duration
+        history_size = scaled_frames(HISTORY_SIZE)
+        features = FeatureEngine(history_size, ema_frames=scaled_frames(EMA_FRAMES))
+        ac.log("Physics sampler: polling at {} Hz, label history {} ticks".format(sampler_hz, history_size))
+        sampler = PhysicsSampler(sim_info.info, physics_layout, graphics_layout,
+                                 sampler_hz, sampler_capacity)
+        sampler.start()
+    
+    if timing_enabled:
+        frame_timer = FrameTimer(TIMING_PHASES, frame_budget_ms, log_fn=ac.log)
+    
+    if inference_enabled:
+        model = HandlingModel.load(model_file)
+        if model is None:
+            ac.log("No handling model at {} - model predictions off".format(model_file))
+        elif model.feature_names != MODEL_FEATURES:
+            ac.log("Handling model expects features {} - model predictions off".format(", ".join(model.feature_names)))
+        else:
+            classifier = StreamingClassifier(model, inference_budget_ms, log_fn=ac.log)
+            ac.log("Loaded handling model: {} frames x {} features, {} hidden units".format(
+                model.window, model.features, len(model.b1)))
     
+    extra_lines = (frame_timer is not None) + (classifier is not None)
     appWindow = ac.newApp("ML Training Logger")
-    ac.setSize(appWindow, 320, 340)
+    ac.setSize(appWindow, 320, 340 + 20 * extra_lines)
     
     ac.log("Improved ML Labeling Logger Initialized")
     ac.console("Using proper Bergman definition for labeling!")
@@ -59,6 +220,11 @@ def acMain(ac_version):
     ac.setPosition(l_lapcount, 3, 55)
     ac.setFontSize(l_lapcount, 12)
     
+    # === DELTA TO BEST LAP ===
+    l_delta = ac.addLabel(appWindow, "Δ Best: --")
+    ac.setPosition(l_delta, 170, 55)
+    ac.setFontSize(l_delta, 12)
+    
     # === STATUS ===
     l_status = ac.addLabel(appWindow, "Status: Waiting for Lap 1...")
     ac.setPosition(l_status, 3, 75)
@@ -108,86 +274,26 @@ def acMain(ac_version):
     ac.setPosition(l_recommendation, 3, 280)
     ac.setFontSize(l_recommendation, 10)
     
-    return "ML Training Logger"
-
-
-def calculate_label_improved(yaw_rate, lat_accel, steer_angle, speed, slip_diff):
-    """
-    PROPER implementation of Bergman's (1966) definition
-    """
-    
-    # STRICTER minimum speed threshold - low speed handling is unreliable
-    if speed < 50:  # Below 50 km/h (~30 mph), can't judge handling reliably
-        return "Neutral", 0, 0.0
-    
-    # Need enough history to calculate rate of change
-    if len(yaw_history) < history_size or len(lat_accel_history) < history_size:
-        return "Neutral", 0, 0.0
-    
-    # Calculate rate of change
-    yaw_change = yaw_history[-1] - yaw_history[0]
-    lat_accel_change = lat_accel_history[-1] - lat_accel_history[0]
-    
-    # === FILTER OUT LOSS OF CONTROL (SPINNING/CRASHING) ===
-    speed_change = speed_history[-1] - speed_history[0] if len(speed_history) >= 2 else 0
-    
-    if abs(yaw_rate) > 1.0:  # Spinning out
-        return "Neutral", 0, 0.0
-    if speed_change < -15:  # Crash/major deceleration
-        return "Neutral", 0, 0.0
-    
-    # Avoid division by zero
-    if abs(lat_accel_change) < 0.01:
-        if abs(lat_accel) < 0.3:
-            return "Neutral", 0, 0.0
-        if slip_diff > 0.15:
-            return "Oversteer", 2, 0.0
-        elif slip_diff < -0.15:
-            return "Understeer", 1, 0.0
-        else:
-            return "Neutral", 0, 0.0
-    
-    yaw_gradient = yaw_change / lat_accel_change
+    # === MODEL PREDICTION (only with a handling model) ===
+    y = 300
+    if classifier is not None:
+        l_model = ac.addLabel(appWindow, "🧠 Model: warming up")
+        ac.setPosition(l_model, 3, y)
+        ac.setFontSize(l_model, 10)
+        y += 20
     
-    # Calculate expected yaw - BUT scale by speed (more lenient at medium speeds)
-    steer_magnitude = abs(steer_angle)
+    # === FRAME TIMING (only with timing_enabled) ===
+    if frame_timer is not None:
+        l_timing = ac.addLabel(appWindow, "Logger: measuring...")
+        ac.setPosition(l_timing, 3, y)
+        ac.setFontSize(l_timing, 9)
     
-    # Speed factor: less strict at medium speeds
-    if speed < 80:  # 50-80 km/h: very lenient
-        speed_factor = 0.3
-    elif speed < 120:  # 80-120 km/h: moderate
-        speed_factor = 0.5
-    else:  # >120 km/h: full strictness
-        speed_factor = 0.7
-        
-    expected_yaw_magnitude = steer_magnitude * (speed / 100.0) * speed_factor
-    actual_yaw_magnitude = abs(yaw_rate)
-    
-    if expected_yaw_magnitude > 0.05:
-        yaw_response_ratio = actual_yaw_magnitude / expected_yaw_magnitude
-        
-        # STRICTER thresholds to reduce false positives
-        if yaw_response_ratio > 1.5 or yaw_gradient > 1.0:  # Was 1.3/0.8
-            if slip_diff > 0.10:  # Was 0.08
-                return "Oversteer", 2, yaw_gradient
-        
-        elif yaw_response_ratio < 0.6 or yaw_gradient < 0.15:  # Was 0.7/0.2
-            if slip_diff < -0.10:  # Was -0.08
-                return "Understeer", 1, yaw_gradient
-    
-    # Active cornering check - only at higher speeds
-    if abs(lat_accel) > 0.5 and speed > 80:
-        if slip_diff > 0.25:  # Was 0.20
-            return "Oversteer", 2, yaw_gradient
-        elif slip_diff < -0.25:  # Was -0.20
-            return "Understeer", 1, yaw_gradient
-    
-    return "Neutral", 0, yaw_gradient
+    return "ML Training Logger"
 
 
 def get_recommendation():
     """Generate real-time recommendation based on current distribution"""
-    total = sum(session_labels.values())
+    total = session_total
     
     if total < 100:
         return "💡 Keep driving to collect data"
@@ -209,11 +315,140 @@ def get_recommendation():
         return "✅ Good balance - keep varying!"
 
 
+def log_frame(laps, physics, graphics):
+    """
+    Label and store one telemetry frame (physics/graphics snapshot tuples)
+    Returns the values shown in the app window
+    """
+    global lapcount, current_lap_data, session_labels, current_lap_labels, session_total
+    global corner_index, corner_track
+    global current_trace, live_delta, last_current_time, best_lap_time
+    
+    # === DECODE TELEMETRY ===
+    (yaw_rate, lateral_accel, longitudinal_accel, vertical_accel,
+     steer_angle, speed, local_vel_x, local_vel_y, local_vel_z,
+     wheel_slip_fl, wheel_slip_fr, wheel_slip_rl, wheel_slip_rr,
+     gas, brake_input, gear,
+     road_temp, air_temp,
+     heading, pitch, roll) = read_physics(physics)
+    (surface_grip, track_pos, current_time,
+     car_x, car_y, car_z) = read_graphics(graphics)
+    
+    # Driver inputs
+    throttle = gas * 100
+    brake = brake_input * 100
+    
+    # === CALCULATE SLIP DIFFERENTIAL ===
+    front_slip_avg = (wheel_slip_fl + wheel_slip_fr) / 2.0
+    rear_slip_avg = (wheel_slip_rl + wheel_slip_rr) / 2.0
+    slip_diff = rear_slip_avg - front_slip_avg
+    
+    # === UPDATE ROLLING FEATURES (O(1) per frame) ===
+    features.push((yaw_rate, lateral_accel, steer_angle, speed, slip_diff), current_time)
+    
+    # === APPLY IMPROVED BERGMAN-BASED LABELING ===
+    label_str, label_int, yaw_gradient = calculate_label_improved(
+        yaw_rate, lateral_accel, steer_angle, speed, slip_diff,
+        features.change(YAW_RATE), features.change(LAT_ACCEL), features.change(SPEED)
+    )
+    yaw_accel, steer_rate, lat_jerk, slip_ema, yaw_rate_std = features.row()
+    
+    # Model input window (MODEL_FEATURES order); the prediction runs in acUpdate
+    if classifier is not None:
+        classifier.push((yaw_rate, lateral_accel, steer_angle, speed, slip_diff,
+                         yaw_accel, steer_rate, lat_jerk, slip_ema, yaw_rate_std))
+    
+    # Update label counters
+    session_labels[label_str] += 1
+    current_lap_labels[label_str] += 1
+    session_total += 1
+    
+    if frame_timer is not None:
+        frame_timer.mark(LABEL)
+    
+    # === DETECT LAP COMPLETION ===
+    if laps > lapcount:
+        # Get car info before resetting
+        car_model = sim_info.info.static.carModel
+        track_name = sim_info.info.static.track
+        
+        # Hand the rest of the previous lap to the background writer (single enqueue)
+        lap_writer.submit(lapcount, current_lap_data, car_model, track_name, True, True)
+        
+        # New best lap: its lookup table is built on the reference worker
+        lap_time = last_current_time
+        if (lapcount > 0 and current_trace.coverage() >= MIN_COVERAGE
+                and (best_lap_time is None or lap_time < best_lap_time)):
+            best_lap_time = lap_time
+            reference_worker.submit(finish_reference, current_trace, lap_time, car_model, track_name)
+        current_trace = LapTrace(REFERENCE_POINTS)
+        
+        # Corners and the saved reference lap are loaded once per track (first lap)
+        if track_name != corner_track:
+            reference_worker.submit(load_reference, car_model, track_name)
+            corner_track = track_name
+            corner_index = load_corners(corners_file, track_name)
+            if corner_index is not None:
+                ac.log("Loaded {} corners for {}".format(len(corner_index), track_name))
+            else:
+                ac.log("No corner data for {} - Corner column left at {}".format(track_name, NO_CORNER))
+        
+        # Update lap count
+        lapcount = laps
+        
+        # Reset current lap data (recycled buffer) and features
+        current_lap_data = spare_lap_buffers.pop() if spare_lap_buffers else LapBuffer(lap_buffer_chunk)
+        current_lap_labels = {'Neutral': 0, 'Understeer': 0, 'Oversteer': 0}
+        features.reset()
+        if classifier is not None:
+            classifier.reset()
+        
+        ui.set_text(l_status, "Lap {} Complete!".format(lapcount - 1))
+        
+        if frame_timer is not None:
+            frame_timer.mark(LAP)
+    
+    corner = corner_index.lookup(track_pos) if corner_index is not None else NO_CORNER
+    
+    # === LIVE DELTA (O(1): one table slice) ===
+    if current_trace.add(track_pos, current_time) and reference_lap is not None:
+        live_delta = reference_lap.delta(track_pos, current_time)
+    last_current_time = current_time
+    
+    # === STORE DATA WITH LABEL ===
+    current_lap_data.append((
+        track_pos, corner, current_time,
+        yaw_rate, lateral_accel, longitudinal_accel, vertical_accel,
+        steer_angle, speed, local_vel_x, local_vel_y, local_vel_z,
+        wheel_slip_fl, wheel_slip_fr, wheel_slip_rl, wheel_slip_rr,
+        throttle, brake, gear,
+        surface_grip, road_temp, air_temp,
+        heading, pitch, roll,
+        car_x, car_y, car_z,
+        slip_diff, yaw_gradient,  # Include yaw_gradient for analysis
+        yaw_accel, steer_rate, lat_jerk, slip_ema, yaw_rate_std,
+        label_int
+    ))
+    
+    # Chunk full: flush it mid-lap so RAM stays flat and a crash loses at most one chunk
+    if len(current_lap_data) >= lap_buffer_chunk:
+        lap_writer.submit(lapcount, current_lap_data, sim_info.info.static.carModel,
+                          sim_info.info.static.track, False, False)
+        current_lap_data = spare_lap_buffers.pop() if spare_lap_buffers else LapBuffer(lap_buffer_chunk)
+    
+    if frame_timer is not None:
+        frame_timer.mark(APPEND)
+    
+    return label_str, yaw_rate, lateral_accel, speed, surface_grip, road_temp, live_delta
+
+
 def acUpdate(deltaT):
     global l_lapcount, l_status, l_yaw, l_lataccel, l_slip_diff
     global l_conditions, l_speed, l_session_stats, l_lap_stats, l_recommendation
-    global lapcount, current_lap_data, session_labels, current_lap_labels
-    global yaw_history, lat_accel_history, steer_history, speed_history
+    global last_frame
+    
+    if frame_timer is not None:
+        frame_timer.start()
     
     # Fetch lap information
     laps = ac.getCarState(0, acsys.CS.LapCount)
@@ -221,176 +456,206 @@ def acUpdate(deltaT):
     # Only process data from Lap 1 onwards (skip out-lap)
     if laps > 0:
         # === FETCH ALL TELEMETRY ===
-        yaw_rate = sim_info.info.physics.localAngularVel[2]
-        lateral_accel = sim_info.info.physics.accG[0]
-        longitudinal_accel = sim_info.info.physics.accG[1]
-        vertical_accel = sim_info.info.physics.accG[2]
-        steer_angle = sim_info.info.physics.steerAngle
-        speed = sim_info.info.physics.speedKmh
-        local_vel_x = sim_info.info.physics.localVelocity[0]
-        local_vel_y = sim_info.info.physics.localVelocity[1]
-        local_vel_z = sim_info.info.physics.localVelocity[2]
-        
-        # Wheel slip
-        wheel_slip_fl = sim_info.info.physics.wheelSlip[0]
-        wheel_slip_fr = sim_info.info.physics.wheelSlip[1]
-        wheel_slip_rl = sim_info.info.physics.wheelSlip[2]
-        wheel_slip_rr = sim_info.info.physics.wheelSlip[3]
-        
-        # Driver inputs
-        throttle = sim_info.info.physics.gas * 100
-        brake = sim_info.info.physics.brake * 100
-        gear = sim_info.info.physics.gear
-        
-        # Track conditions
-        surface_grip = sim_info.info.graphics.surfaceGrip
-        road_temp = sim_info.info.physics.roadTemp
-        air_temp = sim_info.info.physics.airTemp
-        
-        # Position and orientation
-        track_pos = sim_info.info.graphics.normalizedCarPosition
-        current_time = sim_info.info.graphics.iCurrentTime
-        heading = sim_info.info.physics.heading
-        pitch = sim_info.info.physics.pitch
-        roll = sim_info.info.physics.roll
-        
-        # Car coordinates
-        car_coordinates = sim_info.info.graphics.carCoordinates
-        car_x, car_y, car_z = car_coordinates[0], car_coordinates[1], car_coordinates[2]
-        
-        # === UPDATE HISTORY BUFFERS ===
-        yaw_history.append(yaw_rate)
-        lat_accel_history.append(lateral_accel)
-        steer_history.append(steer_angle)
-        speed_history.append(speed)
-        
-        # === CALCULATE SLIP DIFFERENTIAL ===
-        front_slip_avg = (wheel_slip_fl + wheel_slip_fr) / 2.0
-        rear_slip_avg = (wheel_slip_rl + wheel_slip_rr) / 2.0
-        slip_diff = rear_slip_avg - front_slip_avg
+        if sampler is not None:
+            # Every new physics tick since the last update, each with its own lap count
+            frames = sampler.drain()
+            if frame_timer is not None:
+                frame_timer.mark(FETCH)
+            for physics, graphics in frames:
+                frame_laps = read_completed_laps(graphics)
+                if frame_laps > 0:
+                    last_frame = log_frame(frame_laps, physics, graphics)
+        else:
+            # One consistent copy of each shared-memory page, decoded in bulk
+            physics, graphics = sim_info.info.snapshot(physics_layout, graphics_layout)
+            if frame_timer is not None:
+                frame_timer.mark(FETCH)
+            last_frame = log_frame(laps, physics, graphics)
         
-        # === APPLY IMPROVED BERGMAN-BASED LABELING ===
-        label_str, label_int, yaw_gradient = calculate_label_improved(
-            yaw_rate, lateral_accel, steer_angle, speed, slip_diff
-        )
+        if last_frame is None:
+            if frame_timer is not None:
+                frame_timer.end_frame()
+            return
+        label_str, yaw_rate, lateral_accel, speed, surface_grip, road_temp, delta = last_frame
         
-        # Update label counters
-        session_labels[label_str] += 1
-        current_lap_labels[label_str] += 1
+        # === MODEL PREDICTION (at most one per update, decimated to the budget) ===
+        if classifier is not None:
+            classifier.update(label_str)
+            if frame_timer is not None:
+                frame_timer.mark(MODEL)
         
-        # === DETECT LAP COMPLETION ===
-        if laps > lapcount:
-            # Get car info before resetting
-            car_model = sim_info.info.static.carModel
-            track_name = sim_info.info.static.track
+        # === UPDATE UI (rate-limited, telemetry above runs every frame) ===
+        if ui.tick(deltaT):
+            ui.set_text(l_lapcount, "Laps: {}".format(lapcount))
             
-            # Save previous lap data
-            save_lap_data(lapcount, current_lap_data, car_model, track_name)
+            # Delta to the best lap (green ahead, red behind)
+            if delta is not None:
+                ui.set_text(l_delta, "{} Δ {:+.2f} s".format("🟢" if delta <= 0 else "🔴", delta))
             
-            # Update lap count
-            lapcount = laps
+            if lapcount > 0:
+                ui.set_text(l_status, "Logging Lap {}".format(lapcount))
             
-            # Reset current lap data and history
-            current_lap_data = []
-            current_lap_labels = {'Neutral': 0, 'Understeer': 0, 'Oversteer': 0}
-            yaw_history.clear()
-            lat_accel_history.clear()
-            steer_history.clear()
-            speed_history.clear()
+            # Current behavior with color coding
+            if label_str == "Oversteer":
+                behavior_text = "Current: 🔴 OVERSTEER"
+            elif label_str == "Understeer":
+                behavior_text = "Current: 🔵 UNDERSTEER"
+            else:
+                behavior_text = "Current: 🟢 Neutral"
+            ui.set_text(l_slip_diff, behavior_text)
             
-            ac.setText(l_status, "Lap {} Complete!".format(lapcount - 1))
-        
-        # === STORE DATA WITH LABEL ===
-        current_lap_data.append([
-            track_pos, current_time,
-            yaw_rate, lateral_accel, longitudinal_accel, vertical_accel,
-            steer_angle, speed, local_vel_x, local_vel_y, local_vel_z,
-            wheel_slip_fl, wheel_slip_fr, wheel_slip_rl, wheel_slip_rr,
-            throttle, brake, gear,
-            surface_grip, road_temp, air_temp,
-            heading, pitch, roll,
-            car_x, car_y, car_z,
-            slip_diff, yaw_gradient, label_str  # Include yaw_gradient for analysis
-        ])
-        
-        # === UPDATE UI ===
-        ac.setText(l_lapcount, "Laps: {}".format(lapcount))
-        
-        if lapcount > 0:
-            ac.setText(l_status, "Logging Lap {}".format(lapcount))
+            # Current lap distribution
+            lap_text = "This Lap: N:{} U:{} O:{}".format(
+                current_lap_labels['Neutral'],
+                current_lap_labels['Understeer'],
+                current_lap_labels['Oversteer']
+            )
+            ui.set_text(l_lap_stats, lap_text)
+            
+            # Session total distribution
+            session_text = "Session: N:{} U:{} O:{}".format(
+                session_labels['Neutral'],
+                session_labels['Understeer'],
+                session_labels['Oversteer']
+            )
+            ui.set_text(l_session_stats, session_text)
+            
+            # Telemetry
+            ui.set_text(l_yaw, "Yaw: {:.3f} rad/s".format(yaw_rate))
+            ui.set_text(l_lataccel, "Lat Accel: {:.2f} g".format(lateral_accel))
+            ui.set_text(l_speed, "Speed: {:.0f} km/h".format(speed))
+            ui.set_text(l_conditions, "Grip: {:.2f} | Road: {:.0f}°C".format(surface_grip, road_temp))
+            
+            # Real-time recommendation
+            recommendation = get_recommendation()
+            ui.set_text(l_recommendation, recommendation)
+            
+            if classifier is not None:
+                ui.set_text(l_model, classifier.status_text())
+            
+            if frame_timer is not None:
+                ui.set_text(l_timing, frame_timer.window_text())
         
-        # Current behavior with color coding
-        if label_str == "Oversteer":
-            behavior_text = "Current: 🔴 OVERSTEER"
-        elif label_str == "Understeer":
-            behavior_text = "Current: 🔵 UNDERSTEER"
-        else:
-            behavior_text = "Current: 🟢 Neutral"
-        ac.setText(l_slip_diff, behavior_text)
+    else:
+        # Still on out-lap - discard sampled frames
+        if sampler is not None:
+            sampler.drain()
         
-        # Current lap distribution
-        lap_text = "This Lap: N:{} U:{} O:{}".format(
-            current_lap_labels['Neutral'],
-            current_lap_labels['Understeer'],
-            current_lap_labels['Oversteer']
-        )
-        ac.setText(l_lap_stats, lap_text)
+        ui.set_text(l_status, "Out-Lap (Not Recording)")
+        ui.set_text(l_lapcount, "Laps: 0 (Out-Lap)")
+    
+    if frame_timer is not None:
+        frame_timer.mark(UI)
+        frame_timer.end_frame()
+
+
+def save_lap_data(lap_num, data, car_model, track_name, complete=True, final=True):
+    """
+    Saves lap data with automatic labels to CSV/binary logs (runs on the LapWriter thread)
+    data is one chunk of the lap; final marks the lap's last chunk, complete
+    whether the lap actually finished (False: shutdown mid-lap)
+    """
+    started = time.perf_counter()
+    try:
+        if lap_num == 0:
+            return
         
-        # Session total distribution
-        session_text = "Session: N:{} U:{} O:{}".format(
-            session_labels['Neutral'],
-            session_labels['Understeer'],
-            session_labels['Oversteer']
-        )
-        ac.setText(l_session_stats, session_text)
+        if "csv" in log_formats:
+            if data:
+                prefix = [lap_num, car_model, track_name]
+                with open(partial_log_file(), "a", newline="") as file:
+                    writer = csv.writer(file, delimiter=";")
+                    
+                    # Channels in CHANNELS order, label code mapped back to its name
+                    writer.writerows(
+                        prefix + list(entry[:-1]) + [LABELS[entry[-1]]]
+                        for entry in data.rows()
+                    )
+            if final:
+                finish_partial_lap(complete)
         
-        # Telemetry
-        ac.setText(l_yaw, "Yaw: {:.3f} rad/s".format(yaw_rate))
-        ac.setText(l_lataccel, "Lat Accel: {:.2f} g".format(lateral_accel))
-        ac.setText(l_speed, "Speed: {:.0f} km/h".format(speed))
-        ac.setText(l_conditions, "Grip: {:.2f} | Road: {:.0f}°C".format(surface_grip, road_temp))
+        if "binary" in log_formats:
+            # Typed columns written as-is, car/track stored once per chunk
+            flags = binlog.LAP_COMPLETE if final and complete else 0
+            if data:
+                binlog.append_lap(
+                    binary_log_file, CHANNELS, LABELS, data.columns, len(data),
+                    lap_num, session_id, car_model, track_name, flags
+                )
+            elif flags:
+                binlog.mark_lap_complete(binary_log_file, lap_num, session_id)
         
-        # Real-time recommendation
-        recommendation = get_recommendation()
-        ac.setText(l_recommendation, recommendation)
+        if final:
+            ac.log("Saved Lap {} ({})".format(lap_num, "complete" if complete else "incomplete"))
+    finally:
+        # Hand the buffer back to acUpdate for the next lap
+        data.reset()
+        spare_lap_buffers.append(data)
         
-    else:
-        # Still on out-lap
-        ac.setText(l_status, "Out-Lap (Not Recording)")
-        ac.setText(l_lapcount, "Laps: 0 (Out-Lap)")
+        if frame_timer is not None:
+            frame_timer.record(SAVE, time.perf_counter() - started)
+
 
+# Background writer - created here so it can reference save_lap_data
+lap_writer = LapWriter(save_lap_data, max_pending=8, log_fn=ac.log)
 
-def save_lap_data(lap_num, data, car_model, track_name):
-    """Saves lap data with automatic labels to CSV file"""
-    if not data or lap_num == 0:
+
+def load_reference(car_model, track_name):
+    """Load the saved best lap of this car/track (runs on the reference worker)"""
+    global reference_lap, best_lap_time
+    reference = ReferenceLap.load(reference_path(reference_dir, car_model, track_name))
+    if reference is None or (reference_lap is not None and reference_lap.lap_time <= reference.lap_time):
         return
-    
-    with open(log_file, "a", newline="") as file:
-        writer = csv.writer(file, delimiter=";")
-        
-        for entry in data:
-            writer.writerow([
-                lap_num, car_model, track_name,
-                entry[0], entry[1],  # TrackPos, CurrentTime
-                entry[2], entry[3], entry[4], entry[5],  # Yaw, Accels
-                entry[6], entry[7], entry[8], entry[9], entry[10],  # Steer, Speed, Velocity
-                entry[11], entry[12], entry[13], entry[14],  # Wheel Slip
-                entry[15], entry[16], entry[17],  # Throttle, Brake, Gear
-                entry[18], entry[19], entry[20],  # Conditions
-                entry[21], entry[22], entry[23],  # Heading, Pitch, Roll
-                entry[24], entry[25], entry[26],  # Car Position
-                entry[27], entry[28], entry[29]  # SlipDiff, YawGradient, Label
-            ])
-    
-    ac.log("Saved {} labeled data points for Lap {}".format(len(data), lap_num))
+    if best_lap_time is None or reference.lap_time < best_lap_time:
+        best_lap_time = reference.lap_time
+    reference_lap = reference
+    ac.log("Reference lap {:.3f} s loaded for {} @ {}".format(reference.lap_time / 1000.0, car_model, track_name))
+
+
+def finish_reference(trace, lap_time, car_model, track_name):
+    """Build the lookup table of a new best lap, publish and save it (runs on the reference worker)"""
+    global reference_lap
+    if reference_lap is not None and reference_lap.lap_time <= lap_time:
+        return
+    reference = build_reference(trace, lap_time)
+    reference_lap = reference
+    reference.save(reference_path(reference_dir, car_model, track_name))
+    ac.log("New reference lap {:.3f} s".format(lap_time / 1000.0))
+
+
+# Reference tables are loaded and built off the game thread
+# (dropped rather than blocking acUpdate if it falls behind)
+reference_worker = LapWriter(lambda task, *args: task(*args), max_pending=4, log_fn=ac.log,
+                             name="ReferenceWorker", drop_when_full=True)
 
 
 def acShutdown():
     """Saves remaining lap data and prints final statistics"""
-    if lapcount > 0 and current_lap_data:
+    if sampler is not None:
+        sampler.stop()
+        if sampler.dropped:
+            ac.log("PhysicsSampler dropped {} frames (acUpdate fell behind)".format(sampler.dropped))
+        if sampler.missed:
+            ac.log("PhysicsSampler missed {} of {} physics ticks between polls (timer too coarse?)".format(
+                sampler.missed, sampler.missed + sampler.sampled))
+    
+    if lapcount > 0:
         car_model = sim_info.info.static.carModel
         track_name = sim_info.info.static.track
-        save_lap_data(lapcount, current_lap_data, car_model, track_name)
+        # Lap still in progress - stored, but not marked complete
+        lap_writer.submit(lapcount, current_lap_data, car_model, track_name, False, True)
+    
+    # Flush pending laps and stop the writer threads
+    lap_writer.close()
+    reference_worker.close()
+    
+    if frame_timer is not None:
+        for line in frame_timer.report():
+            ac.log(line)
+    
+    if classifier is not None:
+        for line in classifier.report():
+            ac.log(line)
     
     # Log final session statistics
     total = sum(session_labels.values())
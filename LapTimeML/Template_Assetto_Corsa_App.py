@@ -3,6 +3,7 @@ import os
 from third_party import sim_info
 import ac
 import acsys
+from throttled_ui import ThrottledUI
 
 # Labels for telemetry data display
 l_lapcount = 0
@@ -19,9 +20,14 @@ l_recommendation = 0
 
 lapcount = 0
 
+# Window redraws per second (labeling still runs every frame)
+ui_refresh_hz = 10
+ui = ThrottledUI(ui_refresh_hz)
+
 # REAL-TIME LABEL TRACKING
 session_labels = {'Neutral': 0, 'Understeer': 0, 'Oversteer': 0}
 current_lap_labels = {'Neutral': 0, 'Understeer': 0, 'Oversteer': 0}
+session_total = 0  # Running sum of session_labels
 
 # LABELING THRESHOLDS (Based on Bergman 1966)
 UNDERSTEER_THRESHOLD = -0.05
@@ -114,7 +120,7 @@ def calculate_label(slip_diff):
 
 def get_recommendation():
     """Generate real-time recommendation based on current distribution"""
-    total = sum(session_labels.values())
+    total = session_total
     
     if total < 100:
         return "💡 Keep driving to collect data"
@@ -139,7 +145,7 @@ def get_recommendation():
 def acUpdate(deltaT):
     global l_lapcount, l_status, l_current_label, l_lap_stats, l_session_stats
     global l_yaw, l_lataccel, l_slip_diff, l_conditions, l_speed, l_recommendation
-    global lapcount, session_labels, current_lap_labels
+    global lapcount, session_labels, current_lap_labels, session_total
     
     # Fetch lap information
     laps = ac.getCarState(0, acsys.CS.LapCount)
@@ -172,65 +178,67 @@ def acUpdate(deltaT):
         # Update counters
         session_labels[label_str] += 1
         current_lap_labels[label_str] += 1
+        session_total += 1
         
         # === DETECT LAP COMPLETION ===
         if laps > lapcount:
             lapcount = laps
             current_lap_labels = {'Neutral': 0, 'Understeer': 0, 'Oversteer': 0}
-            ac.setText(l_status, "Lap {} Complete!".format(lapcount - 1))
-        
-        # === UPDATE UI ===
-        ac.setText(l_lapcount, "Laps: {}".format(lapcount))
-        
-        if lapcount > 0:
-            ac.setText(l_status, "Monitoring Lap {}".format(lapcount))
-        
-        # Current behavior with emoji indicators
-        if label_str == "Oversteer":
-            behavior_text = "Current: 🔴 OVERSTEER"
-        elif label_str == "Understeer":
-            behavior_text = "Current: 🔵 UNDERSTEER"
-        else:
-            behavior_text = "Current: 🟢 Neutral"
-        ac.setText(l_current_label, behavior_text)
+            ui.set_text(l_status, "Lap {} Complete!".format(lapcount - 1))
         
-        # Slip differential value
-        ac.setText(l_slip_diff, "Slip Diff: {:.2f}".format(slip_diff))
-        
-        # Current lap distribution
-        lap_text = "This Lap: N:{} U:{} O:{}".format(
-            current_lap_labels['Neutral'],
-            current_lap_labels['Understeer'],
-            current_lap_labels['Oversteer']
-        )
-        ac.setText(l_lap_stats, lap_text)
-        
-        # Session total distribution with percentages
-        total = sum(session_labels.values())
-        if total > 0:
-            session_text = "Session: N:{}({:.0f}%) U:{}({:.0f}%) O:{}({:.0f}%)".format(
-                session_labels['Neutral'], (session_labels['Neutral']/total)*100,
-                session_labels['Understeer'], (session_labels['Understeer']/total)*100,
-                session_labels['Oversteer'], (session_labels['Oversteer']/total)*100
+        # === UPDATE UI (rate-limited, telemetry above runs every frame) ===
+        if ui.tick(deltaT):
+            ui.set_text(l_lapcount, "Laps: {}".format(lapcount))
+            
+            if lapcount > 0:
+                ui.set_text(l_status, "Monitoring Lap {}".format(lapcount))
+            
+            # Current behavior with emoji indicators
+            if label_str == "Oversteer":
+                behavior_text = "Current: 🔴 OVERSTEER"
+            elif label_str == "Understeer":
+                behavior_text = "Current: 🔵 UNDERSTEER"
+            else:
+                behavior_text = "Current: 🟢 Neutral"
+            ui.set_text(l_current_label, behavior_text)
+            
+            # Slip differential value
+            ui.set_text(l_slip_diff, "Slip Diff: {:.2f}".format(slip_diff))
+            
+            # Current lap distribution
+            lap_text = "This Lap: N:{} U:{} O:{}".format(
+                current_lap_labels['Neutral'],
+                current_lap_labels['Understeer'],
+                current_lap_labels['Oversteer']
             )
-        else:
-            session_text = "Session: N:0 U:0 O:0"
-        ac.setText(l_session_stats, session_text)
-        
-        # Telemetry
-        ac.setText(l_yaw, "Yaw: {:.3f} rad/s".format(yaw_rate))
-        ac.setText(l_lataccel, "Lat Accel: {:.2f} g".format(lateral_accel))
-        ac.setText(l_speed, "Speed: {:.0f} km/h".format(speed))
-        ac.setText(l_conditions, "Grip: {:.2f} | Road: {:.0f}°C".format(surface_grip, road_temp))
-        
-        # Real-time recommendation
-        recommendation = get_recommendation()
-        ac.setText(l_recommendation, recommendation)
+            ui.set_text(l_lap_stats, lap_text)
+            
+            # Session total distribution with percentages
+            total = session_total
+            if total > 0:
+                session_text = "Session: N:{}({:.0f}%) U:{}({:.0f}%) O:{}({:.0f}%)".format(
+                    session_labels['Neutral'], (session_labels['Neutral']/total)*100,
+                    session_labels['Understeer'], (session_labels['Understeer']/total)*100,
+                    session_labels['Oversteer'], (session_labels['Oversteer']/total)*100
+                )
+            else:
+                session_text = "Session: N:0 U:0 O:0"
+            ui.set_text(l_session_stats, session_text)
+            
+            # Telemetry
+            ui.set_text(l_yaw, "Yaw: {:.3f} rad/s".format(yaw_rate))
+            ui.set_text(l_lataccel, "Lat Accel: {:.2f} g".format(lateral_accel))
+            ui.set_text(l_speed, "Speed: {:.0f} km/h".format(speed))
+            ui.set_text(l_conditions, "Grip: {:.2f} | Road: {:.0f}°C".format(surface_grip, road_temp))
+            
+            # Real-time recommendation
+            recommendation = get_recommendation()
+            ui.set_text(l_recommendation, recommendation)
         
     else:
         # Out-lap
-        ac.setText(l_status, "Out-Lap (Not Monitoring)")
-        ac.setText(l_lapcount, "Laps: 0 (Out-Lap)")
+        ui.set_text(l_status, "Out-Lap (Not Monitoring)")
+        ui.set_text(l_lapcount, "Laps: 0 (Out-Lap)")
 
 
 def acShutdown():
@@ -1,287 +1,1297 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-import warnings
-warnings.filterwarnings('ignore')
-
-"""
-UPDATED POST-SESSION ANALYSIS
-Handles both old (30 columns) and new (31 columns) CSV formats
-"""
-
-def analyze_labeled_data(file_path):
-    """Analyze pre-labeled telemetry data with improved error handling"""
-    
-    print("=" * 70)
-    print("ML TRAINING DATA ANALYSIS")
-    print("=" * 70)
-    print()
-    
-    # Load data with error handling for mixed column formats
-    print("Loading data...")
-    try:
-        # First, try to read with auto-detection
-        df = pd.read_csv(file_path, sep=';', on_bad_lines='skip')
-        
-        # Check if we have the new format with YawGradient
-        expected_cols_new = ['Lap', 'CarModel', 'Track', 'TrackPos', 'CurrentTime',
-                             'YawRate', 'LateralAccel', 'LongitudinalAccel', 'VerticalAccel',
-                             'SteerAngle', 'Speed', 'LocalVelX', 'LocalVelY', 'LocalVelZ',
-                             'WheelSlipFL', 'WheelSlipFR', 'WheelSlipRL', 'WheelSlipRR',
-                             'Throttle', 'Brake', 'Gear',
-                             'SurfaceGrip', 'RoadTemp', 'AirTemp',
-                             'Heading', 'Pitch', 'Roll',
-                             'CarX', 'CarY', 'CarZ',
-                             'SlipDiff', 'YawGradient', 'Label']
-        
-        expected_cols_old = ['Lap', 'CarModel', 'Track', 'TrackPos', 'CurrentTime',
-                             'YawRate', 'LateralAccel', 'LongitudinalAccel', 'VerticalAccel',
-                             'SteerAngle', 'Speed', 'LocalVelX', 'LocalVelY', 'LocalVelZ',
-                             'WheelSlipFL', 'WheelSlipFR', 'WheelSlipRL', 'WheelSlipRR',
-                             'Throttle', 'Brake', 'Gear',
-                             'SurfaceGrip', 'RoadTemp', 'AirTemp',
-                             'Heading', 'Pitch', 'Roll',
-                             'CarX', 'CarY', 'CarZ',
-                             'SlipDiff', 'Label']
-        
-        # Detect format
-        if len(df.columns) == 31:
-            print("✅ Detected new format (with YawGradient)")
-            df.columns = expected_cols_new
-        elif len(df.columns) == 30:
-            print("✅ Detected old format (without YawGradient)")
-            df.columns = expected_cols_old
-            df['YawGradient'] = 0.0  # Add dummy column for compatibility
-        else:
-            print(f"⚠️  Warning: Found {len(df.columns)} columns, expected 30 or 31")
-            print(f"   Columns found: {list(df.columns)}")
-            print("   Attempting to continue with available columns...")
-            
-        print(f"✅ Loaded {len(df):,} data points from {df['Lap'].nunique()} laps\n")
-        
-    except Exception as e:
-        print(f"❌ Error loading file: {e}")
-        print("\n💡 TIP: If you have mixed old/new data, start with a fresh CSV:")
-        print("   1. Delete or rename your old log.csv")
-        print("   2. Run a new session with the improved logger")
-        return
-    
-    # === OVERALL STATISTICS ===
-    print("=" * 70)
-    print("OVERALL DATASET STATISTICS")
-    print("=" * 70)
-    
-    total = len(df)
-    
-    # Check if Label column exists
-    if 'Label' not in df.columns:
-        print("❌ Error: 'Label' column not found in CSV")
-        print(f"   Available columns: {list(df.columns)}")
-        return
-    
-    label_counts = df['Label'].value_counts()
-    
-    print("\n📊 CLASS DISTRIBUTION:")
-    for label in ['Neutral', 'Understeer', 'Oversteer']:
-        count = label_counts.get(label, 0)
-        pct = (count / total) * 100
-        
-        # Visual bar
-        bar_length = int(pct / 2)
-        bar = "█" * bar_length
-        
-        if label == 'Neutral':
-            emoji = "🟢"
-        elif label == 'Understeer':
-            emoji = "🔵"
-        else:
-            emoji = "🔴"
-        
-        print(f"  {emoji} {label:12s}: {count:6,} ({pct:5.1f}%) {bar}")
-    
-    # === BALANCE CHECK ===
-    print("\n" + "=" * 70)
-    print("DATA QUALITY ASSESSMENT")
-    print("=" * 70)
-    
-    neutral_pct = (label_counts.get('Neutral', 0) / total) * 100
-    understeer_pct = (label_counts.get('Understeer', 0) / total) * 100
-    oversteer_pct = (label_counts.get('Oversteer', 0) / total) * 100
-    
-    issues = []
-    
-    # Check balance
-    if neutral_pct > 80:
-        issues.append("⚠️  Too much neutral data (>80%)")
-        issues.append("   → Need 5-10 more laps of aggressive driving")
-    elif neutral_pct < 50:
-        issues.append("⚠️  Too little neutral data (<50%)")
-        issues.append("   → Need 5 more laps of smooth, controlled driving")
-    else:
-        print("✅ Good neutral percentage (50-80%)")
-    
-    if understeer_pct < 8:
-        issues.append("⚠️  Need more understeer data (<8%)")
-        issues.append("   → Do 5 laps: brake late, turn hard, throttle early")
-    else:
-        print(f"✅ Good understeer percentage ({understeer_pct:.1f}%)")
-    
-    if oversteer_pct < 8:
-        issues.append("⚠️  Need more oversteer data (<8%)")
-        issues.append("   → Do 5 laps: trail brake, sudden throttle")
-    else:
-        print(f"✅ Good oversteer percentage ({oversteer_pct:.1f}%)")
-    
-    # === TRACK CONDITIONS ===
-    print("\n" + "=" * 70)
-    print("TRACK CONDITIONS")
-    print("=" * 70)
-    
-    avg_grip = df['SurfaceGrip'].mean()
-    min_grip = df['SurfaceGrip'].min()
-    max_grip = df['SurfaceGrip'].max()
-    grip_range = max_grip - min_grip
-    
-    print(f"\n🌦️  Surface Grip:")
-    print(f"   Average: {avg_grip:.3f}")
-    print(f"   Range:   {min_grip:.3f} - {max_grip:.3f} (Δ {grip_range:.3f})")
-    
-    if grip_range < 0.15:
-        issues.append("⚠️  CRITICAL: Need wet track testing!")
-        issues.append("   → Your RQ asks about 'varying track conditions'")
-        issues.append("   → Collect 10-15 laps in WET conditions")
-    else:
-        print("✅ Good grip variation (tested multiple conditions)")
-    
-    # === LAP ANALYSIS ===
-    print("\n" + "=" * 70)
-    print("LAP-BY-LAP BREAKDOWN")
-    print("=" * 70)
-    print()
-    
-    lap_summary = df.groupby(['Lap', 'Label']).size().unstack(fill_value=0)
-    
-    # Ensure all label columns exist
-    for label in ['Neutral', 'Understeer', 'Oversteer']:
-        if label not in lap_summary.columns:
-            lap_summary[label] = 0
-    
-    lap_summary['Total'] = lap_summary.sum(axis=1)
-    
-    # Add percentages
-    for col in ['Neutral', 'Understeer', 'Oversteer']:
-        lap_summary[f'{col}%'] = (lap_summary[col] / lap_summary['Total'] * 100).round(1)
-    
-    # Add grip info
-    lap_summary['AvgGrip'] = df.groupby('Lap')['SurfaceGrip'].mean().round(3)
-    
-    # Identify lap types
-    def classify_lap(row):
-        if row.get('Neutral%', 0) > 75:
-            return "🟢 Neutral"
-        elif row.get('Understeer%', 0) > 30:
-            return "🔵 Understeer"
-        elif row.get('Oversteer%', 0) > 30:
-            return "🔴 Oversteer"
-        else:
-            return "🟡 Mixed"
-    
-    lap_summary['Type'] = lap_summary.apply(classify_lap, axis=1)
-    
-    print(lap_summary[['Type', 'Neutral', 'Understeer', 'Oversteer', 'AvgGrip']].to_string())
-    
-    # === FINAL RECOMMENDATIONS ===
-    print("\n" + "=" * 70)
-    print("RECOMMENDATIONS")
-    print("=" * 70)
-    print()
-    
-    if not issues:
-        print("dataset looks ready for ML training!")
-        print()
-        print("Next steps:")
-        print("  1. Use this CSV for LSTM training")
-        print("  2. Split data: 70% train, 15% validation, 15% test")
-        print("  3. Consider collecting 10 more laps for robustness")
-    else:
-        print("Action items before ML training:\n")
-        for i, issue in enumerate(issues, 1):
-            print(f"{i}. {issue}")
-    
-    # === CREATE VISUALIZATIONS ===
-    print("\n" + "=" * 70)
-    print("Creating visualizations...")
-    print("=" * 70)
-    
-    try:
-        fig, axes = plt.subplots(2, 2, figsize=(14, 10))
-        
-        # Plot 1: Overall distribution
-        colors = {'Neutral': 'green', 'Understeer': 'blue', 'Oversteer': 'red'}
-        label_counts_sorted = label_counts.reindex(['Neutral', 'Understeer', 'Oversteer'], fill_value=0)
-        bars = axes[0, 0].bar(label_counts_sorted.index, label_counts_sorted.values, 
-                               color=[colors[l] for l in label_counts_sorted.index])
-        axes[0, 0].set_title('Overall Class Distribution', fontsize=14, fontweight='bold')
-        axes[0, 0].set_ylabel('Count')
-        for bar, (label, count) in zip(bars, label_counts_sorted.items()):
-            pct = (count / total) * 100
-            axes[0, 0].text(bar.get_x() + bar.get_width()/2, bar.get_height(), 
-                           f'{pct:.1f}%', ha='center', va='bottom', fontweight='bold')
-        
-        # Plot 2: Distribution by lap
-        lap_labels = df.groupby(['Lap', 'Label']).size().unstack(fill_value=0)
-        lap_labels = lap_labels.reindex(columns=['Neutral', 'Understeer', 'Oversteer'], fill_value=0)
-        lap_labels.plot(kind='bar', stacked=True, ax=axes[0, 1], 
-                        color=colors, width=0.8)
-        axes[0, 1].set_title('Class Distribution by Lap', fontsize=14, fontweight='bold')
-        axes[0, 1].set_xlabel('Lap')
-        axes[0, 1].set_ylabel('Count')
-        axes[0, 1].legend(title='Label', loc='upper left')
-        axes[0, 1].tick_params(axis='x', rotation=0)
-        
-        # Plot 3: Slip differential distribution
-        axes[1, 0].hist(df['SlipDiff'], bins=50, edgecolor='black', alpha=0.7, color='gray')
-        axes[1, 0].axvline(-0.08, color='blue', linestyle='--', linewidth=2, label='Understeer threshold')
-        axes[1, 0].axvline(0.08, color='red', linestyle='--', linewidth=2, label='Oversteer threshold')
-        axes[1, 0].axvline(0, color='green', linestyle='--', linewidth=1, alpha=0.5, label='Neutral')
-        axes[1, 0].set_title('Slip Differential Distribution\n(Improved Bergman Implementation)', 
-                            fontsize=14, fontweight='bold')
-        axes[1, 0].set_xlabel('Slip Differential (Rear - Front)')
-        axes[1, 0].set_ylabel('Frequency')
-        axes[1, 0].legend()
-        axes[1, 0].grid(True, alpha=0.3)
-        
-        # Plot 4: Track conditions over time
-        axes[1, 1].plot(df.index, df['SurfaceGrip'], alpha=0.6, linewidth=0.5, color='purple')
-        axes[1, 1].set_title('Surface Grip Over Session', fontsize=14, fontweight='bold')
-        axes[1, 1].set_xlabel('Data Point Index')
-        axes[1, 1].set_ylabel('Surface Grip')
-        axes[1, 1].axhline(1.0, color='green', linestyle='--', alpha=0.5, label='Perfect Dry (1.0)')
-        axes[1, 1].axhline(0.7, color='orange', linestyle='--', alpha=0.5, label='Typical Wet (~0.7)')
-        axes[1, 1].legend()
-        axes[1, 1].grid(True, alpha=0.3)
-        axes[1, 1].set_ylim(0, 1.1)
-        
-        plt.tight_layout()
-        plt.savefig('ml_training_analysis.png', dpi=150, bbox_inches='tight')
-        print("Saved: ml_training_analysis.png\n")
-        plt.show()
-    except Exception as e:
-        print(f"Could not create visualizations: {e}")
-    
-    print("=" * 70)
-    print("ANALYSIS COMPLETE!")
-    print("=" * 70)
-
-
-if __name__ == "__main__":
-    # Run analysis on your labeled data
-    import sys
-    
-    # Check if file path provided as argument
-    if len(sys.argv) > 1:
-        file_path = sys.argv[1]
-    else:
-        file_path = "third_party/log.csv"  # Default path
-    
-    analyze_labeled_data(file_path)
\ No newline at end of file
+import numpy as np
+import pandas as pd
+import os
+import io
+import sys
+import json
+import contextlib
+import hashlib
+import glob
+import fnmatch
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import warnings
+warnings.filterwarnings('ignore')
+
+import log_cache
+import corners
+from lap_buffer import CHANNELS
+
+"""
+UPDATED POST-SESSION ANALYSIS
+Handles both old (30 columns) and new (31 columns) CSV formats
+"""
+
+LABELS = ['Neutral', 'Understeer', 'Oversteer']
+
+EXPECTED_COLS_NEW = ['Lap', 'CarModel', 'Track', 'TrackPos', 'CurrentTime',
+                     'YawRate', 'LateralAccel', 'LongitudinalAccel', 'VerticalAccel',
+                     'SteerAngle', 'Speed', 'LocalVelX', 'LocalVelY', 'LocalVelZ',
+                     'WheelSlipFL', 'WheelSlipFR', 'WheelSlipRL', 'WheelSlipRR',
+                     'Throttle', 'Brake', 'Gear',
+                     'SurfaceGrip', 'RoadTemp', 'AirTemp',
+                     'Heading', 'Pitch', 'Roll',
+                     'CarX', 'CarY', 'CarZ',
+                     'SlipDiff', 'YawGradient', 'Label']
+
+# Layout the logger writes now (LapTimeML.CSV_HEADER)
+EXPECTED_COLS_CURRENT = ['Lap', 'CarModel', 'Track'] + [name for name, _ in CHANNELS]
+
+EXPECTED_COLS_OLD = ['Lap', 'CarModel', 'Track', 'TrackPos', 'CurrentTime',
+                     'YawRate', 'LateralAccel', 'LongitudinalAccel', 'VerticalAccel',
+                     'SteerAngle', 'Speed', 'LocalVelX', 'LocalVelY', 'LocalVelZ',
+                     'WheelSlipFL', 'WheelSlipFR', 'WheelSlipRL', 'WheelSlipRR',
+                     'Throttle', 'Brake', 'Gear',
+                     'SurfaceGrip', 'RoadTemp', 'AirTemp',
+                     'Heading', 'Pitch', 'Roll',
+                     'CarX', 'CarY', 'CarZ',
+                     'SlipDiff', 'Label']
+
+# Corner intervals per track (see corners.py)
+CORNERS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'third_party', 'track_corners.json')
+
+# Columns the aggregates are built from
+AGG_COLUMNS = ['Lap', 'Label', 'SurfaceGrip', 'CarModel', 'Track', 'TrackPos', 'Speed', 'LateralAccel', 'SlipDiff']
+
+# Per (Track, Corner, Lap) statistics and how two partial results combine
+CORNER_KEYS = ['Track', 'Corner', 'Lap']
+CORNER_REDUCTIONS = {
+    'Frames': 'sum', 'Neutral': 'sum', 'Understeer': 'sum', 'Oversteer': 'sum',
+    'MinSpeed': 'min', 'PeakLatG': 'max', 'SlipDiffSum': 'sum', 'PeakSlipDiff': 'max',
+}
+
+# Per (CarModel, Track, Lap) statistics for the car/track breakdown
+CAR_TRACK_KEYS = ['CarModel', 'Track', 'Lap']
+CAR_TRACK_REDUCTIONS = {
+    'Frames': 'sum', 'Neutral': 'sum', 'Understeer': 'sum', 'Oversteer': 'sum',
+    'GripSum': 'sum', 'GripCount': 'sum', 'GripMin': 'min', 'GripMax': 'max',
+}
+
+# Rows per chunk in streaming mode
+DEFAULT_CHUNKSIZE = 200_000
+
+# Incremental mode: watermark + aggregates persisted next to the log
+STATE_VERSION = 3
+TAIL_CHECK_BYTES = 4096  # Bytes before the watermark hashed to detect a rewritten log
+
+# Multi-log mode: log names a directory argument is searched for (recursively):
+# log.csv and logs rotated aside (log.<date>.csv). Laps that never finished
+# (log_incomplete*.csv) are only included on request.
+LOG_PATTERNS = ('log.csv', 'log.*.csv')
+INCOMPLETE_LOG_PATTERNS = ('log_incomplete.csv', 'log_incomplete.*.csv')
+LOG_HEADER_START = ['Lap', 'CarModel', 'Track']  # First columns of every LapTimeML CSV layout
+
+# Summary figure (matplotlib is only imported when it is drawn)
+PLOT_FILE = 'ml_training_analysis.png'
+PLOT_DPI = 150
+HIST_BINS = 50
+
+
+def apply_format(df, verbose=True):
+    """Detect old/new column layout and normalise column names (in place)"""
+    header = [str(c) for c in df.columns]
+    if header == EXPECTED_COLS_CURRENT:
+        if verbose:
+            print(f"✅ Detected current format ({len(header)} columns)")
+    elif header[:3] == EXPECTED_COLS_CURRENT[:3] and 'Label' in header and len(header) not in (30, 31):
+        # Logs rotated aside by an earlier logger version: the header names are authoritative
+        if verbose:
+            print(f"✅ Detected earlier logger format ({len(header)} columns)")
+    elif len(df.columns) == 31:
+        if verbose:
+            print("✅ Detected new format (with YawGradient)")
+        df.columns = EXPECTED_COLS_NEW
+    elif len(df.columns) == 30:
+        if verbose:
+            print("✅ Detected old format (without YawGradient)")
+        df.columns = EXPECTED_COLS_OLD
+        df['YawGradient'] = 0.0  # Add dummy column for compatibility
+    elif verbose:
+        print(f"⚠️  Warning: Found {len(df.columns)} columns, expected 30 or 31")
+        print(f"   Columns found: {list(df.columns)}")
+        print("   Attempting to continue with available columns...")
+    return df
+
+
+class LogAggregates:
+    """
+    Running aggregates the report is built from
+    Folded chunk by chunk (update) and combinable across runs/files (merge)
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.label_counts = pd.Series(dtype='int64')
+        self.lap_labels = pd.DataFrame(dtype='int64')  # Lap x Label counts
+        self.lap_grip_sum = pd.Series(dtype='float64')
+        self.lap_grip_count = pd.Series(dtype='int64')
+        self.grip_sum = 0.0
+        self.grip_count = 0
+        self.grip_min = float('inf')
+        self.grip_max = float('-inf')
+        self.corner_stats = _empty_corner_stats()  # (Track, Corner, Lap) x CORNER_REDUCTIONS
+        self.car_track_stats = _empty_stats(CAR_TRACK_KEYS, CAR_TRACK_REDUCTIONS)  # (CarModel, Track, Lap)
+
+    def update(self, df):
+        """Fold one chunk of rows into the aggregates"""
+        self.rows += len(df)
+        self.label_counts = self.label_counts.add(df['Label'].value_counts(), fill_value=0)
+        self.lap_labels = self.lap_labels.add(
+            df.groupby(['Lap', 'Label']).size().unstack(fill_value=0), fill_value=0)
+
+        grip = df['SurfaceGrip']
+        by_lap = grip.groupby(df['Lap'])
+        self.lap_grip_sum = self.lap_grip_sum.add(by_lap.sum(), fill_value=0)
+        self.lap_grip_count = self.lap_grip_count.add(by_lap.count(), fill_value=0)
+        count = grip.count()
+        if count:
+            self.grip_sum += grip.sum()
+            self.grip_count += count
+            self.grip_min = min(self.grip_min, grip.min())
+            self.grip_max = max(self.grip_max, grip.max())
+
+        if all(c in df.columns for c in ('Track', 'TrackPos', 'Speed', 'LateralAccel', 'SlipDiff')):
+            self.corner_stats = _merge_stats(self.corner_stats, corner_stats(df), CORNER_REDUCTIONS)
+        if 'CarModel' in df.columns and 'Track' in df.columns:
+            self.car_track_stats = _merge_stats(self.car_track_stats, car_track_stats(df), CAR_TRACK_REDUCTIONS)
+        return self
+
+    def merge(self, other):
+        """Combine with aggregates of another chunk, file or run"""
+        self.rows += other.rows
+        self.label_counts = self.label_counts.add(other.label_counts, fill_value=0)
+        self.lap_labels = self.lap_labels.add(other.lap_labels, fill_value=0)
+        self.lap_grip_sum = self.lap_grip_sum.add(other.lap_grip_sum, fill_value=0)
+        self.lap_grip_count = self.lap_grip_count.add(other.lap_grip_count, fill_value=0)
+        self.grip_sum += other.grip_sum
+        self.grip_count += other.grip_count
+        self.grip_min = min(self.grip_min, other.grip_min)
+        self.grip_max = max(self.grip_max, other.grip_max)
+        self.corner_stats = _merge_stats(self.corner_stats, other.corner_stats, CORNER_REDUCTIONS)
+        self.car_track_stats = _merge_stats(self.car_track_stats, other.car_track_stats, CAR_TRACK_REDUCTIONS)
+        return self
+
+    @classmethod
+    def combined(cls, parts):
+        """
+        One LogAggregates from many (e.g. one per log file)
+        Same result as merging them one by one, but every table is concatenated
+        and grouped once instead of re-grouping a growing table per part.
+        """
+        parts = [part for part in parts if part.rows]
+        aggs = cls()
+        if not parts:
+            return aggs
+
+        def total(tables):
+            tables = [t for t in tables if len(t)]
+            if not tables:
+                return None
+            table = pd.concat(tables)
+            return table.groupby(level=list(range(table.index.nlevels))).sum()
+
+        aggs.rows = sum(part.rows for part in parts)
+        aggs.label_counts = total([part.label_counts for part in parts])
+        aggs.lap_labels = total([part.lap_labels for part in parts]).fillna(0)
+        aggs.lap_grip_sum = total([part.lap_grip_sum for part in parts])
+        aggs.lap_grip_count = total([part.lap_grip_count for part in parts])
+        aggs.grip_sum = sum(part.grip_sum for part in parts)
+        aggs.grip_count = sum(part.grip_count for part in parts)
+        aggs.grip_min = min(part.grip_min for part in parts)
+        aggs.grip_max = max(part.grip_max for part in parts)
+        aggs.corner_stats = _combine_stats([part.corner_stats for part in parts], CORNER_REDUCTIONS,
+                                           aggs.corner_stats)
+        aggs.car_track_stats = _combine_stats([part.car_track_stats for part in parts], CAR_TRACK_REDUCTIONS,
+                                              aggs.car_track_stats)
+        return aggs
+
+    def tag_laps(self, log_name):
+        """
+        Key every per-lap table by (Log, Lap) instead of Lap (in place)
+        Lap numbers restart in every log, so logs are tagged before they are combined.
+        """
+        def tagged(obj):
+            index = obj.index.to_frame(index=False)
+            index.insert(index.columns.get_loc('Lap'), 'Log', log_name)
+            obj = obj.copy()
+            obj.index = pd.MultiIndex.from_frame(index)
+            return obj
+
+        self.lap_labels = tagged(self.lap_labels.rename_axis(index='Lap'))
+        self.lap_grip_sum = tagged(self.lap_grip_sum.rename_axis(index='Lap'))
+        self.lap_grip_count = tagged(self.lap_grip_count.rename_axis(index='Lap'))
+        self.corner_stats = tagged(self.corner_stats)
+        self.car_track_stats = tagged(self.car_track_stats)
+        return self
+
+    def to_dict(self):
+        """JSON-serialisable form (for the incremental-analysis state file)"""
+        return {
+            'rows': self.rows,
+            'label_counts': _series_to_dict(self.label_counts),
+            'lap_labels': self.lap_labels.to_dict(orient='split'),
+            'lap_grip_sum': _series_to_dict(self.lap_grip_sum),
+            'lap_grip_count': _series_to_dict(self.lap_grip_count),
+            'grip_sum': self.grip_sum, 'grip_count': self.grip_count,
+            'grip_min': self.grip_min, 'grip_max': self.grip_max,
+            'corner_stats': self.corner_stats.reset_index().to_dict(orient='list'),
+            'car_track_stats': self.car_track_stats.reset_index().to_dict(orient='list'),
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        aggs = cls()
+        aggs.rows = d['rows']
+        aggs.label_counts = _series_from_dict(d['label_counts'])
+        aggs.lap_labels = pd.DataFrame(**d['lap_labels']).rename_axis(index='Lap')
+        aggs.lap_grip_sum = _series_from_dict(d['lap_grip_sum'])
+        aggs.lap_grip_count = _series_from_dict(d['lap_grip_count'])
+        aggs.grip_sum, aggs.grip_count = d['grip_sum'], d['grip_count']
+        aggs.grip_min, aggs.grip_max = d['grip_min'], d['grip_max']
+        if d['corner_stats'][CORNER_KEYS[0]]:
+            aggs.corner_stats = pd.DataFrame(d['corner_stats']).set_index(CORNER_KEYS)
+        if d['car_track_stats'][CAR_TRACK_KEYS[0]]:
+            aggs.car_track_stats = pd.DataFrame(d['car_track_stats']).set_index(CAR_TRACK_KEYS)
+        return aggs
+
+    @property
+    def lap_count(self):
+        return len(self.lap_labels.index)
+
+    def counts(self):
+        """Label -> count (int)"""
+        return self.label_counts.astype('int64')
+
+    def grip_stats(self):
+        """(mean, min, max) surface grip"""
+        if not self.grip_count:
+            return float('nan'), float('nan'), float('nan')
+        return self.grip_sum / self.grip_count, self.grip_min, self.grip_max
+
+    def lap_summary(self):
+        """Per-lap label counts, percentages, average grip and lap type"""
+        lap_summary = self.lap_labels.sort_index().fillna(0).astype('int64')
+        lap_summary.columns.name = 'Label'
+
+        # Ensure all label columns exist
+        for label in LABELS:
+            if label not in lap_summary.columns:
+                lap_summary[label] = 0
+
+        lap_summary['Total'] = lap_summary.sum(axis=1)
+
+        # Add percentages
+        for col in LABELS:
+            lap_summary[f'{col}%'] = (lap_summary[col] / lap_summary['Total'] * 100).round(1)
+
+        # Add grip info
+        lap_summary['AvgGrip'] = (self.lap_grip_sum / self.lap_grip_count).round(3)
+
+        lap_summary['Type'] = lap_summary.apply(classify_lap, axis=1)
+        return lap_summary
+
+    def corner_laps(self):
+        """Per (Track, Corner, Lap): corner name, label percentages, min speed, peak lateral G, slip difference"""
+        stats = self.corner_stats.sort_index()
+        table = pd.DataFrame(index=stats.index)
+        table['Name'] = _corner_names(stats.index)
+        table['Frames'] = stats['Frames'].astype('int64')
+        for label in LABELS:
+            table[f'{label}%'] = (stats[label] / stats['Frames'] * 100).round(1)
+        table['MinSpeed'] = stats['MinSpeed'].round(1)
+        table['PeakLatG'] = stats['PeakLatG'].round(2)
+        table['SlipDiff'] = (stats['SlipDiffSum'] / stats['Frames']).round(4)
+        table['PeakSlipDiff'] = stats['PeakSlipDiff'].round(4)
+        return table
+
+    def corner_summary(self):
+        """Per (Track, Corner) over all laps; ApexSpeed is the average of the laps' minimum speeds"""
+        stats = self.corner_stats
+        by_corner = stats.groupby(level=['Track', 'Corner'])
+        totals = by_corner.agg(CORNER_REDUCTIONS)
+        table = pd.DataFrame(index=totals.index)
+        table['Name'] = _corner_names(totals.index)
+        table['Laps'] = by_corner.size()
+        table['Frames'] = totals['Frames'].astype('int64')
+        for label in LABELS:
+            table[f'{label}%'] = (totals[label] / totals['Frames'] * 100).round(1)
+        table['ApexSpeed'] = by_corner['MinSpeed'].mean().round(1)
+        table['MinSpeed'] = totals['MinSpeed'].round(1)
+        table['PeakLatG'] = totals['PeakLatG'].round(2)
+        table['SlipDiff'] = (totals['SlipDiffSum'] / totals['Frames']).round(4)
+        return table.sort_index()
+
+    def car_track_summary(self):
+        """Per (CarModel, Track): logs, laps, frames, label percentages and grip"""
+        stats = self.car_track_stats
+        by_combo = stats.groupby(level=['CarModel', 'Track'])
+        totals = by_combo.agg(CAR_TRACK_REDUCTIONS)
+        table = pd.DataFrame(index=totals.index)
+        if 'Log' in stats.index.names:
+            table['Logs'] = by_combo.apply(lambda group: group.index.get_level_values('Log').nunique())
+        table['Laps'] = by_combo.size()
+        table['Frames'] = totals['Frames'].astype('int64')
+        for label in LABELS:
+            table[f'{label}%'] = (totals[label] / totals['Frames'] * 100).round(1)
+        table['AvgGrip'] = (totals['GripSum'] / totals['GripCount']).round(3)
+        table['MinGrip'] = totals['GripMin'].round(3)
+        table['MaxGrip'] = totals['GripMax'].round(3)
+        return table.sort_index()
+
+
+_corner_indexes = {}
+
+
+def track_corners(track_name):
+    """CornerIndex of a track (loaded once per track), None if it has no corner data"""
+    if track_name not in _corner_indexes:
+        _corner_indexes[track_name] = corners.load_corners(CORNERS_FILE, track_name)
+    return _corner_indexes[track_name]
+
+
+def assign_corners(tracks, positions):
+    """Corner index of every row - one np.searchsorted per track present (NO_CORNER outside corners)"""
+    positions = np.asarray(positions, dtype=np.float64)
+    codes = np.full(len(positions), corners.NO_CORNER, dtype=np.int16)
+    track_codes, names = pd.factorize(tracks)
+    for t, name in enumerate(names):
+        index = track_corners(name)
+        if index is None:
+            continue
+        if len(names) == 1:
+            return corners.corner_codes(index, positions)
+        rows = track_codes == t
+        codes[rows] = corners.corner_codes(index, positions[rows])
+    return codes
+
+
+def _empty_stats(keys, reductions):
+    index = pd.MultiIndex.from_arrays([[] for _ in keys], names=keys)
+    return pd.DataFrame({name: pd.Series(dtype='float64') for name in reductions}, index=index)
+
+
+def _empty_corner_stats():
+    return _empty_stats(CORNER_KEYS, CORNER_REDUCTIONS)
+
+
+def corner_stats(df):
+    """Grouped reductions of the rows inside a corner, indexed by (Track, Corner, Lap)"""
+    tracks = df['Track'].fillna('').astype(str).to_numpy()
+    codes = assign_corners(tracks, df['TrackPos'].to_numpy())
+    inside = codes != corners.NO_CORNER
+    if not inside.any():
+        return _empty_corner_stats()
+
+    rows = pd.DataFrame({
+        'Track': tracks[inside], 'Corner': codes[inside], 'Lap': df['Lap'].to_numpy()[inside],
+        'Label': df['Label'].to_numpy()[inside],
+        'Speed': df['Speed'].to_numpy(dtype=np.float64)[inside],
+        'LatG': np.abs(df['LateralAccel'].to_numpy(dtype=np.float64)[inside]),
+        'SlipDiff': df['SlipDiff'].to_numpy(dtype=np.float64)[inside],
+    })
+    rows['AbsSlipDiff'] = rows['SlipDiff'].abs()
+    grouped = rows.groupby(CORNER_KEYS)
+    stats = grouped.agg(Frames=('Speed', 'size'), MinSpeed=('Speed', 'min'), PeakLatG=('LatG', 'max'),
+                        SlipDiffSum=('SlipDiff', 'sum'), PeakSlipDiff=('AbsSlipDiff', 'max'))
+    labels = rows.groupby(CORNER_KEYS + ['Label']).size().unstack(fill_value=0)
+    for label in LABELS:
+        stats[label] = labels[label] if label in labels.columns else 0
+    return stats[list(CORNER_REDUCTIONS)].astype('float64')
+
+
+def car_track_stats(df):
+    """Label counts and grip of the rows, indexed by (CarModel, Track, Lap)"""
+    rows = pd.DataFrame({
+        'CarModel': df['CarModel'].fillna('').astype(str).to_numpy(),
+        'Track': df['Track'].fillna('').astype(str).to_numpy(),
+        'Lap': df['Lap'].to_numpy(), 'Label': df['Label'].to_numpy(),
+        'Grip': df['SurfaceGrip'].to_numpy(dtype=np.float64),
+    })
+    grouped = rows.groupby(CAR_TRACK_KEYS)
+    stats = grouped.agg(Frames=('Grip', 'size'), GripSum=('Grip', 'sum'), GripCount=('Grip', 'count'),
+                        GripMin=('Grip', 'min'), GripMax=('Grip', 'max'))
+    labels = rows.groupby(CAR_TRACK_KEYS + ['Label']).size().unstack(fill_value=0)
+    for label in LABELS:
+        stats[label] = labels[label] if label in labels.columns else 0
+    return stats[list(CAR_TRACK_REDUCTIONS)].astype('float64')
+
+
+def _merge_stats(a, b, reductions):
+    """Combine two grouped-statistics tables with the same index levels"""
+    if b.empty:
+        return a
+    if a.empty:
+        return b
+    return pd.concat([a, b]).groupby(level=list(range(a.index.nlevels))).agg(reductions)
+
+
+def _combine_stats(tables, reductions, empty):
+    tables = [t for t in tables if not t.empty]
+    if not tables:
+        return empty
+    table = pd.concat(tables)
+    return table.groupby(level=list(range(table.index.nlevels))).agg(reductions)
+
+
+def _corner_names(index):
+    """Corner name for every (Track, Corner, ...) index entry"""
+    return [track_corners(track).name(int(corner)) if track_corners(track) is not None else str(corner)
+            for track, corner in zip(index.get_level_values('Track'), index.get_level_values('Corner'))]
+
+
+def _series_to_dict(series):
+    return {'index': series.index.tolist(), 'data': series.tolist()}
+
+
+def _series_from_dict(d):
+    return pd.Series(d['data'], index=d['index'], dtype='float64')
+
+
+def classify_lap(row):
+    """Identify lap type from its label percentages"""
+    if row.get('Neutral%', 0) > 75:
+        return "🟢 Neutral"
+    elif row.get('Understeer%', 0) > 30:
+        return "🔵 Understeer"
+    elif row.get('Oversteer%', 0) > 30:
+        return "🔴 Oversteer"
+    else:
+        return "🟡 Mixed"
+
+
+def open_cached(file_path, use_cache):
+    """Parsed-log cache for file_path if enabled and still valid"""
+    if not use_cache:
+        return None
+    cached = log_cache.open_cache(file_path)
+    if cached is not None:
+        print(f"⚡ Using parsed-log cache ({log_cache.cache_dir(file_path)})")
+    return cached
+
+
+def new_cache_writer(file_path, use_cache):
+    if not use_cache:
+        return None
+    try:
+        return log_cache.CacheWriter(file_path)
+    except OSError as e:
+        print(f"⚠️  Could not create parsed-log cache: {e}")
+        return None
+
+
+def cache_chunk(writer, df):
+    """Append parsed rows to the cache being built; drop the cache on failure"""
+    if writer is None:
+        return None
+    try:
+        writer.append(df)
+        return writer
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Parsed-log cache disabled: {e}")
+        writer.abort()
+        return None
+
+
+def commit_cache(writer):
+    if writer is not None and writer.commit() is not None:
+        print(f"💾 Saved parsed-log cache ({writer.directory})")
+
+
+def load_full(file_path, use_cache=True):
+    """Load the whole log into one DataFrame (from the parsed-log cache when valid)"""
+    cached = open_cached(file_path, use_cache)
+    if cached is not None:
+        return cached.frame()
+
+    df = pd.read_csv(file_path, sep=';', on_bad_lines='skip')
+    apply_format(df)
+    commit_cache(cache_chunk(new_cache_writer(file_path, use_cache), df))
+    return df
+
+
+def aggregate_stream(file_path, chunksize=DEFAULT_CHUNKSIZE, use_cache=True):
+    """Fold the log into LogAggregates chunk by chunk - memory bounded by chunksize"""
+    aggs = LogAggregates()
+
+    cached = open_cached(file_path, use_cache)
+    if cached is not None:
+        if 'Label' not in cached.columns:
+            return cached.columns, None
+        for chunk in cached.chunks(chunksize, [c for c in AGG_COLUMNS if c in cached.columns]):
+            aggs.update(chunk)
+        return None, aggs
+
+    writer = new_cache_writer(file_path, use_cache)
+    reader = pd.read_csv(file_path, sep=';', on_bad_lines='skip', chunksize=chunksize)
+    for i, chunk in enumerate(reader):
+        apply_format(chunk, verbose=(i == 0))
+        writer = cache_chunk(writer, chunk)
+        if 'Label' not in chunk.columns:
+            if writer is not None:
+                writer.abort()
+            return chunk.columns, None
+        aggs.update(chunk[[c for c in AGG_COLUMNS if c in chunk.columns]])
+    commit_cache(writer)
+    return None, aggs
+
+
+class _BoundedReader(io.RawIOBase):
+    """File view that stops at a fixed byte offset (the last complete line)"""
+
+    def __init__(self, file, end):
+        self._file = file
+        self._end = end
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        remaining = self._end - self._file.tell()
+        if remaining <= 0:
+            return 0
+        data = self._file.read(min(len(buffer), remaining))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def state_path(file_path):
+    return file_path + '.state.json'
+
+
+def _tail_hash(file, offset):
+    file.seek(max(0, offset - TAIL_CHECK_BYTES))
+    return hashlib.sha1(file.read(min(offset, TAIL_CHECK_BYTES))).hexdigest()
+
+
+def _load_state(file_path, file, header, size):
+    """Stored state if it still describes a prefix of this log, else None"""
+    try:
+        with open(state_path(file_path)) as state_file:
+            state = json.load(state_file)
+    except (OSError, ValueError):
+        return None
+    if (state.get('version') != STATE_VERSION or state.get('header') != header
+            or not 0 < state.get('offset', 0) <= size
+            or _tail_hash(file, state['offset']) != state.get('tail_hash')):
+        return None
+    return state
+
+
+def _save_state(file_path, state):
+    tmp = state_path(file_path) + '.tmp'
+    with open(tmp, 'w') as state_file:
+        # NumPy scalars (counts, lap numbers) -> plain Python numbers
+        json.dump(state, state_file, default=lambda value: value.item())
+    os.replace(tmp, state_path(file_path))
+
+
+def aggregate_incremental(file_path, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Fold only the rows appended since the last run into the stored aggregates
+    The watermark is the byte offset after the last complete line parsed;
+    a log that was rewritten or truncated is detected and re-parsed from scratch.
+    """
+    with open(file_path, 'rb') as file:
+        header = file.readline().decode('utf-8').rstrip('\r\n')
+        names = header.split(';')
+        size = os.fstat(file.fileno()).st_size
+
+        # Only parse up to the last complete line - the logger may be mid-write
+        file.seek(max(0, size - 65536))
+        tail = file.read()
+        end = size - len(tail) + tail.rfind(b'\n') + 1
+
+        state = _load_state(file_path, file, header, size)
+        if state is not None:
+            aggs = LogAggregates.from_dict(state['aggregates'])
+            start = state['offset']
+            last_lap = state['last_lap']
+        else:
+            aggs = LogAggregates()
+            start = file.seek(0) + len(file.readline())
+            last_lap = None
+
+        new_rows = 0
+        if end > start:
+            file.seek(start)
+            reader = pd.read_csv(io.BufferedReader(_BoundedReader(file, end)), sep=';',
+                                 header=None, names=names, on_bad_lines='skip', chunksize=chunksize)
+            for i, chunk in enumerate(reader):
+                apply_format(chunk, verbose=(state is None and i == 0))
+                if 'Label' not in chunk.columns:
+                    return chunk.columns, None
+                aggs.update(chunk[[c for c in AGG_COLUMNS if c in chunk.columns]])
+                new_rows += len(chunk)
+                last_lap = chunk['Lap'].iloc[-1] if len(chunk) else last_lap
+
+        _save_state(file_path, {
+            'version': STATE_VERSION, 'path': os.path.abspath(file_path), 'header': header,
+            'offset': max(end, start), 'tail_hash': _tail_hash(file, max(end, start)),
+            'last_lap': last_lap, 'aggregates': aggs.to_dict(),
+        })
+
+    if state is None:
+        print(f"🔁 Incremental: no usable state, parsed the whole log ({new_rows:,} rows)")
+    else:
+        print(f"🔁 Incremental: parsed {new_rows:,} new rows ({(end - start) / 1e6:.1f} MB) "
+              f"after lap {state['last_lap']}")
+    return None, aggs
+
+
+def load_log(file_path, stream=False, chunksize=DEFAULT_CHUNKSIZE, use_cache=True, incremental=False):
+    """(full DataFrame or None, LogAggregates), or None if the log can't be analyzed"""
+    print("Loading data...")
+    df = None
+    missing_label_columns = None
+    try:
+        if incremental:
+            # Only rows appended since the last run are parsed
+            missing_label_columns, aggs = aggregate_incremental(file_path, chunksize)
+            if aggs is not None:
+                print(f"✅ Loaded {aggs.rows:,} data points from {aggs.lap_count} laps\n")
+        elif stream:
+            # Constant-memory path: only the running aggregates are kept
+            missing_label_columns, aggs = aggregate_stream(file_path, chunksize, use_cache)
+            if aggs is not None:
+                print(f"✅ Loaded {aggs.rows:,} data points from {aggs.lap_count} laps\n")
+        else:
+            df = load_full(file_path, use_cache)
+            print(f"✅ Loaded {len(df):,} data points from {df['Lap'].nunique()} laps\n")
+
+    except Exception as e:
+        print(f"❌ Error loading file: {e}")
+        print("\n💡 TIP: If you have mixed old/new data, start with a fresh CSV:")
+        print("   1. Delete or rename your old log.csv")
+        print("   2. Run a new session with the improved logger")
+        return None
+
+    # Check if Label column exists
+    if df is not None and 'Label' not in df.columns:
+        missing_label_columns = df.columns
+    if missing_label_columns is not None:
+        print("❌ Error: 'Label' column not found in CSV")
+        print(f"   Available columns: {list(missing_label_columns)}")
+        return None
+
+    if df is not None:
+        aggs = LogAggregates().update(df)
+    return df, aggs
+
+
+def analyze_labeled_data(file_path, stream=False, chunksize=DEFAULT_CHUNKSIZE, use_cache=True,
+                         incremental=False, plot=True, show=True, dpi=PLOT_DPI, output_format='text'):
+    """
+    Analyze pre-labeled telemetry data with improved error handling
+    output_format 'json' prints only the statistics (summary_dict) as JSON on
+    stdout - progress and errors go to stderr - and never plots.
+    Returns the LogAggregates, or None if the log couldn't be analyzed.
+    """
+    if output_format == 'json':
+        with contextlib.redirect_stdout(sys.stderr):
+            loaded = load_log(file_path, stream, chunksize, use_cache, incremental)
+        if loaded is None:
+            return None
+        json.dump(summary_dict(loaded[1]), sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return loaded[1]
+
+    print("=" * 70)
+    print("ML TRAINING DATA ANALYSIS")
+    print("=" * 70)
+    print()
+
+    # Load data with error handling for mixed column formats
+    loaded = load_log(file_path, stream, chunksize, use_cache, incremental)
+    if loaded is None:
+        return None
+    df, aggs = loaded
+
+    # === OVERALL STATISTICS ===
+    print("=" * 70)
+    print("OVERALL DATASET STATISTICS")
+    print("=" * 70)
+
+    print_report(aggs)
+
+    # === CREATE VISUALIZATIONS ===
+    if plot:
+        print("\n" + "=" * 70)
+        print("Creating visualizations...")
+        print("=" * 70)
+
+        if df is None:
+            print("Skipped: per-row plots need the full data (run without --stream/--incremental)\n")
+        else:
+            plot_analysis(df, aggs, show=show, dpi=dpi)
+    else:
+        print()
+
+    print("=" * 70)
+    print("ANALYSIS COMPLETE!")
+    print("=" * 70)
+    return aggs
+
+
+def is_multi_log(path):
+    """True if path names several logs: a directory or a glob pattern"""
+    return os.path.isdir(path) or glob.has_magic(path)
+
+
+def is_incomplete_log(file_path):
+    return any(fnmatch.fnmatch(os.path.basename(file_path), pattern) for pattern in INCOMPLETE_LOG_PATTERNS)
+
+
+def find_logs(path, include_incomplete=False):
+    """
+    Log files of a directory (searched recursively for LOG_PATTERNS) or glob pattern, sorted
+    Incomplete-lap logs are left out unless include_incomplete, also when a glob matches them.
+    """
+    if os.path.isdir(path):
+        patterns = LOG_PATTERNS + (INCOMPLETE_LOG_PATTERNS if include_incomplete else ())
+        found = []
+        for directory, _, names in os.walk(path):
+            found.extend(os.path.join(directory, name) for name in names
+                         if any(fnmatch.fnmatch(name, pattern) for pattern in patterns))
+    else:
+        found = [p for p in glob.glob(path, recursive=True) if os.path.isfile(p)]
+    return sorted(p for p in found if include_incomplete or not is_incomplete_log(p))
+
+
+def is_lap_log(file_path):
+    """True if the file starts with a LapTimeML CSV header"""
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
+            header = file.readline().rstrip('\r\n').split(';')
+    except OSError:
+        return False
+    return header[:len(LOG_HEADER_START)] == LOG_HEADER_START
+
+
+def aggregate_log(file_path, root, chunksize=DEFAULT_CHUNKSIZE, use_cache=True, incremental=False):
+    """
+    (log name, LogAggregates or None, error) of one log in a multi-log run
+    Runs in a worker process: the log is streamed (memory bounded by chunksize),
+    progress output is dropped and laps are tagged with the log's path relative to root.
+    """
+    name = os.path.relpath(os.path.abspath(file_path), root)
+    if not is_lap_log(file_path):
+        return name, None, "not a LapTimeML log (unexpected header)"
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            if incremental:
+                missing_label_columns, aggs = aggregate_incremental(file_path, chunksize)
+            else:
+                missing_label_columns, aggs = aggregate_stream(file_path, chunksize, use_cache)
+    except Exception as e:
+        return name, None, str(e)
+    if aggs is None:
+        return name, None, "no 'Label' column"
+    if not aggs.rows:
+        return name, None, "no rows"
+    return name, aggs.tag_laps(name), None
+
+
+def aggregate_logs(paths, jobs=None, chunksize=DEFAULT_CHUNKSIZE, use_cache=True, incremental=False):
+    """
+    [(log name, LogAggregates or None, error)] for every path, in order
+    Each log is parsed by one worker process, which only sends back its
+    aggregates (a few KB), so the work scales with the cores up to the number
+    of logs. Largest logs are submitted first to keep the workers busy to the end.
+    """
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(p)) for p in paths])
+    work = partial(aggregate_log, root=root, chunksize=chunksize, use_cache=use_cache, incremental=incremental)
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(paths)))
+    if jobs == 1:
+        return [work(p) for p in paths]
+
+    order = sorted(paths, key=os.path.getsize, reverse=True)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = dict(zip(order, pool.map(work, order)))
+    return [results[p] for p in paths]
+
+
+def log_table(results):
+    """Per analyzed log: rows, laps, cars and tracks"""
+    records = []
+    for name, aggs, error in results:
+        if aggs is None:
+            continue
+        index = aggs.car_track_stats.index
+        records.append({
+            'Log': name, 'Rows': aggs.rows, 'Laps': aggs.lap_count,
+            'Cars': ', '.join(sorted(set(index.get_level_values('CarModel')))),
+            'Tracks': ', '.join(sorted(set(index.get_level_values('Track')))),
+        })
+    return pd.DataFrame(records, columns=['Log', 'Rows', 'Laps', 'Cars', 'Tracks']).set_index('Log')
+
+
+def analyze_logs(path, jobs=None, chunksize=DEFAULT_CHUNKSIZE, use_cache=True, incremental=False,
+                 output_format='text', include_incomplete=False):
+    """
+    Analyze every log in a directory or matching a glob as one dataset
+    Logs are aggregated in parallel (aggregate_logs) and combined into a single
+    report; laps are keyed by (Log, Lap) and broken down per car/track. Report
+    only - the per-row plots would need every row of every log in memory.
+    include_incomplete: also count the laps in log_incomplete*.csv
+    Returns the combined LogAggregates, or None if no log could be analyzed.
+    """
+    out = sys.stderr if output_format == 'json' else sys.stdout
+    paths = find_logs(path, include_incomplete)
+    if not paths:
+        print(f"❌ No logs found for {path}", file=out)
+        return None
+
+    jobs = max(1, min(jobs or os.cpu_count() or 1, len(paths)))
+    print(f"Loading {len(paths)} logs with {jobs} worker process{'es' if jobs > 1 else ''}...", file=out)
+    start = time.perf_counter()
+    results = aggregate_logs(paths, jobs, chunksize, use_cache, incremental)
+    aggs = LogAggregates.combined([part for _, part, _ in results if part is not None])
+    elapsed = time.perf_counter() - start
+    skipped = [(name, error) for name, part, error in results if part is None]
+    logs = log_table(results)
+
+    if not aggs.rows:
+        print("❌ None of the logs could be analyzed", file=out)
+        for name, error in skipped:
+            print(f"   {name}: {error}", file=out)
+        return None
+    print(f"✅ Loaded {aggs.rows:,} data points from {aggs.lap_count} laps in {len(logs)} logs "
+          f"({elapsed:.2f} s)\n", file=out)
+
+    if output_format == 'json':
+        summary = summary_dict(aggs)
+        summary['logs'] = _table_records(logs)
+        summary['skipped'] = [{'log': name, 'error': error} for name, error in skipped]
+        json.dump(summary, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+        return aggs
+
+    print("=" * 70)
+    print("ML TRAINING DATA ANALYSIS")
+    print("=" * 70)
+    print()
+
+    # === LOGS ===
+    print("=" * 70)
+    print("LOGS")
+    print("=" * 70)
+    print()
+
+    print(logs.to_string())
+    if skipped:
+        print(f"\n⚠️  Skipped {len(skipped)} log(s):")
+        for name, error in skipped:
+            print(f"   {name}: {error}")
+
+    # === OVERALL STATISTICS ===
+    print("\n" + "=" * 70)
+    print("OVERALL DATASET STATISTICS")
+    print("=" * 70)
+
+    print_report(aggs)
+    print()
+
+    print("=" * 70)
+    print("ANALYSIS COMPLETE!")
+    print("=" * 70)
+    return aggs
+
+
+def print_corner_report(aggs):
+    """Per-corner table for every track with corner data, plus the worst corners"""
+    if aggs.corner_stats.empty:
+        print("No corner data (track not in third_party/track_corners.json)")
+        return
+
+    summary = aggs.corner_summary()
+    for track, table in summary.groupby(level='Track'):
+        print(f"🏁 {track}")
+        table = table.droplevel('Track')
+        print(table[['Name', 'Laps', 'Understeer%', 'Oversteer%', 'ApexSpeed', 'PeakLatG', 'SlipDiff']]
+              .to_string())
+        for label, emoji in (('Understeer', '🔵'), ('Oversteer', '🔴')):
+            worst = table[f'{label}%'].idxmax()
+            if table.loc[worst, f'{label}%'] > 0:
+                print(f"   {emoji} Most {label.lower()}: {table.loc[worst, 'Name']} "
+                      f"({table.loc[worst, f'{label}%']:.1f}% of frames)")
+        print()
+
+
+def check_balance(label_counts, total):
+    """(passed checks, issues) for the class balance"""
+    neutral_pct = (label_counts.get('Neutral', 0) / total) * 100
+    understeer_pct = (label_counts.get('Understeer', 0) / total) * 100
+    oversteer_pct = (label_counts.get('Oversteer', 0) / total) * 100
+
+    passed = []
+    issues = []
+
+    # Check balance
+    if neutral_pct > 80:
+        issues.append("⚠️  Too much neutral data (>80%)")
+        issues.append("   → Need 5-10 more laps of aggressive driving")
+    elif neutral_pct < 50:
+        issues.append("⚠️  Too little neutral data (<50%)")
+        issues.append("   → Need 5 more laps of smooth, controlled driving")
+    else:
+        passed.append("✅ Good neutral percentage (50-80%)")
+
+    if understeer_pct < 8:
+        issues.append("⚠️  Need more understeer data (<8%)")
+        issues.append("   → Do 5 laps: brake late, turn hard, throttle early")
+    else:
+        passed.append(f"✅ Good understeer percentage ({understeer_pct:.1f}%)")
+
+    if oversteer_pct < 8:
+        issues.append("⚠️  Need more oversteer data (<8%)")
+        issues.append("   → Do 5 laps: trail brake, sudden throttle")
+    else:
+        passed.append(f"✅ Good oversteer percentage ({oversteer_pct:.1f}%)")
+
+    return passed, issues
+
+
+def check_grip(grip_range):
+    """(passed checks, issues) for the track conditions"""
+    if grip_range < 0.15:
+        return [], ["⚠️  CRITICAL: Need wet track testing!",
+                    "   → Your RQ asks about 'varying track conditions'",
+                    "   → Collect 10-15 laps in WET conditions"]
+    return ["✅ Good grip variation (tested multiple conditions)"], []
+
+
+def _json_number(value):
+    """Plain int/float for json, None for NaN"""
+    value = value.item() if hasattr(value, 'item') else value
+    return None if isinstance(value, float) and value != value else value
+
+
+def _issue_list(lines):
+    """Report issue lines -> [{'issue': ..., 'advice': [...]}] (advice lines are indented)"""
+    grouped = []
+    for line in lines:
+        if line.startswith(' ') and grouped:
+            grouped[-1]['advice'].append(line.strip().lstrip('→').strip())
+        else:
+            grouped.append({'issue': line.lstrip('⚠️').strip(), 'advice': []})
+    return grouped
+
+
+def _table_records(table):
+    """Rows of a (multi-)indexed table as JSON-ready dicts, index levels first"""
+    table = table.reset_index()
+    return [{name: _json_number(value) for name, value in row.items()} for row in table.to_dict(orient='records')]
+
+
+def summary_dict(aggs):
+    """The report's statistics as plain JSON-serialisable values"""
+    total = aggs.rows
+    label_counts = aggs.counts()
+    avg_grip, min_grip, max_grip = aggs.grip_stats()
+    passed, issues = check_balance(label_counts, total)
+    grip_passed, grip_issues = check_grip(max_grip - min_grip)
+
+    lap_summary = aggs.lap_summary()
+    keys = [name or 'Lap' for name in lap_summary.index.names]  # (Log, Lap) when several logs are combined
+    laps = []
+    for key, row in lap_summary.iterrows():
+        key = key if isinstance(key, tuple) else (key,)
+        entry = {name: _json_number(value) for name, value in zip(keys, key)}
+        entry['Type'] = row['Type'].split(' ', 1)[-1]
+        for col in LABELS + ['Total'] + [f'{label}%' for label in LABELS] + ['AvgGrip']:
+            entry[col] = _json_number(row[col])
+        laps.append(entry)
+
+    return {
+        'rows': total,
+        'laps': aggs.lap_count,
+        'classes': {label: {'count': _json_number(label_counts.get(label, 0)),
+                            'pct': _json_number(label_counts.get(label, 0) / total * 100)}
+                    for label in LABELS},
+        'grip': {'mean': _json_number(avg_grip), 'min': _json_number(min_grip),
+                 'max': _json_number(max_grip), 'range': _json_number(max_grip - min_grip)},
+        'passed': [line.lstrip('✅').strip() for line in passed + grip_passed],
+        'issues': _issue_list(issues + grip_issues),
+        'lap_breakdown': laps,
+        'corners': _table_records(aggs.corner_summary()),
+        'corner_laps': _table_records(aggs.corner_laps()),
+        'cars_tracks': _table_records(aggs.car_track_summary()),
+    }
+
+
+def print_report(aggs):
+    """Print statistics, quality checks, lap breakdown and recommendations"""
+    total = aggs.rows
+    label_counts = aggs.counts()
+
+    print("\n📊 CLASS DISTRIBUTION:")
+    for label in LABELS:
+        count = label_counts.get(label, 0)
+        pct = (count / total) * 100
+
+        # Visual bar
+        bar_length = int(pct / 2)
+        bar = "█" * bar_length
+
+        if label == 'Neutral':
+            emoji = "🟢"
+        elif label == 'Understeer':
+            emoji = "🔵"
+        else:
+            emoji = "🔴"
+
+        print(f"  {emoji} {label:12s}: {count:6,} ({pct:5.1f}%) {bar}")
+
+    # === BALANCE CHECK ===
+    print("\n" + "=" * 70)
+    print("DATA QUALITY ASSESSMENT")
+    print("=" * 70)
+
+    passed, issues = check_balance(label_counts, total)
+    for line in passed:
+        print(line)
+
+    # === TRACK CONDITIONS ===
+    print("\n" + "=" * 70)
+    print("TRACK CONDITIONS")
+    print("=" * 70)
+
+    avg_grip, min_grip, max_grip = aggs.grip_stats()
+    grip_range = max_grip - min_grip
+
+    print(f"\n🌦️  Surface Grip:")
+    print(f"   Average: {avg_grip:.3f}")
+    print(f"   Range:   {min_grip:.3f} - {max_grip:.3f} (Δ {grip_range:.3f})")
+
+    passed, grip_issues = check_grip(grip_range)
+    for line in passed:
+        print(line)
+    issues.extend(grip_issues)
+
+    # === LAP ANALYSIS ===
+    print("\n" + "=" * 70)
+    print("LAP-BY-LAP BREAKDOWN")
+    print("=" * 70)
+    print()
+
+    lap_summary = aggs.lap_summary()
+
+    print(lap_summary[['Type', 'Neutral', 'Understeer', 'Oversteer', 'AvgGrip']].to_string())
+
+    # === CORNER ANALYSIS ===
+    print("\n" + "=" * 70)
+    print("CORNER BREAKDOWN")
+    print("=" * 70)
+    print()
+
+    print_corner_report(aggs)
+
+    # === CAR / TRACK ANALYSIS ===
+    if not aggs.car_track_stats.empty:
+        print("\n" + "=" * 70)
+        print("CAR / TRACK BREAKDOWN")
+        print("=" * 70)
+        print()
+
+        print(aggs.car_track_summary().to_string())
+
+    # === FINAL RECOMMENDATIONS ===
+    print("\n" + "=" * 70)
+    print("RECOMMENDATIONS")
+    print("=" * 70)
+    print()
+
+    if not issues:
+        print("dataset looks ready for ML training!")
+        print()
+        print("Next steps:")
+        print("  1. Use this CSV for LSTM training")
+        print("  2. Split data: 70% train, 15% validation, 15% test")
+        print("  3. Consider collecting 10 more laps for robustness")
+        print("  4. Try the in-game classifier: python train_model.py LOG --out third_party/handling_model.bin")
+    else:
+        print("Action items before ML training:\n")
+        for i, issue in enumerate(issues, 1):
+            print(f"{i}. {issue}")
+
+    return issues
+
+
+def minmax_downsample(values, buckets):
+    """
+    (indices, values) keeping the min and max of each of at most `buckets` equal slices,
+    in their original order - the drawn line has the same envelope as the full
+    series but at most 2 * buckets points. Short series are returned unchanged.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    if n <= 2 * buckets:
+        return np.arange(n), values
+
+    # Whole buckets as rows of a 2-D view; the remainder is one last short bucket
+    size = -(-n // buckets)
+    whole = n // size * size
+    edges = [values[:whole].reshape(-1, size)]
+    if n > whole:
+        edges.append(values[whole:].reshape(1, -1))
+
+    picked = []
+    offset = 0
+    for block in edges:
+        # NaN never wins; an all-NaN bucket keeps a NaN (drawn as a gap)
+        nan = np.isnan(block)
+        low = np.where(nan, np.inf, block).argmin(axis=1)
+        high = np.where(nan, -np.inf, block).argmax(axis=1)
+        starts = offset + np.arange(block.shape[0]) * block.shape[1]
+        picked.append(np.sort(np.stack([starts + low, starts + high], axis=1), axis=1).ravel())
+        offset += block.size
+
+    indices = np.concatenate(picked)
+    # A bucket whose min and max are the same sample contributes it once
+    keep = np.ones(len(indices), dtype=bool)
+    keep[1:] = indices[1:] != indices[:-1]
+    indices = indices[keep]
+    return indices, values[indices]
+
+
+def binned_counts(values, bins=HIST_BINS):
+    """(counts, edges) of the finite values - what ax.hist would draw, without handing it every row"""
+    values = np.asarray(values, dtype=np.float64)
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return np.zeros(bins, dtype=np.int64), np.linspace(0.0, 1.0, bins + 1)
+    return np.histogram(values, bins=bins)
+
+
+def axes_width_px(fig, ax, dpi):
+    """Width of ax in pixels of the saved figure"""
+    return max(1, int(ax.get_position().width * fig.get_figwidth() * dpi))
+
+
+def plot_analysis(df, aggs, show=True, path=PLOT_FILE, dpi=PLOT_DPI):
+    """
+    Render the 2x2 summary figure to path
+    Counts come from the aggregates; df is only read for the SlipDiff and
+    SurfaceGrip columns, binned/downsampled so drawing cost doesn't grow with
+    the number of rows.
+    show=False draws with the non-interactive Agg backend and never opens a window
+    """
+    try:
+        import matplotlib
+        if not show:
+            matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError as e:
+        print(f"Could not create visualizations: {e}")
+        return
+
+    try:
+        fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+
+        # Plot 1: Overall distribution
+        colors = {'Neutral': 'green', 'Understeer': 'blue', 'Oversteer': 'red'}
+        total = aggs.rows
+        label_counts_sorted = aggs.counts().reindex(LABELS, fill_value=0)
+        bars = axes[0, 0].bar(label_counts_sorted.index, label_counts_sorted.values,
+                               color=[colors[l] for l in label_counts_sorted.index])
+        axes[0, 0].set_title('Overall Class Distribution', fontsize=14, fontweight='bold')
+        axes[0, 0].set_ylabel('Count')
+        for bar, (label, count) in zip(bars, label_counts_sorted.items()):
+            pct = (count / total) * 100
+            axes[0, 0].text(bar.get_x() + bar.get_width()/2, bar.get_height(),
+                           f'{pct:.1f}%', ha='center', va='bottom', fontweight='bold')
+
+        # Plot 2: Distribution by lap
+        lap_labels = aggs.lap_labels.sort_index().reindex(columns=LABELS, fill_value=0)
+        lap_labels = lap_labels.fillna(0).astype('int64')
+        lap_labels.plot(kind='bar', stacked=True, ax=axes[0, 1],
+                        color=colors, width=0.8)
+        axes[0, 1].set_title('Class Distribution by Lap', fontsize=14, fontweight='bold')
+        axes[0, 1].set_xlabel('Lap')
+        axes[0, 1].set_ylabel('Count')
+        axes[0, 1].legend(title='Label', loc='upper left')
+        axes[0, 1].tick_params(axis='x', rotation=0)
+
+        # Plot 3: Slip differential distribution (counts binned once, drawn as 50 weighted bars)
+        counts, edges = binned_counts(df['SlipDiff'].to_numpy())
+        axes[1, 0].hist(edges[:-1], bins=edges, weights=counts, edgecolor='black', alpha=0.7, color='gray')
+        axes[1, 0].axvline(-0.08, color='blue', linestyle='--', linewidth=2, label='Understeer threshold')
+        axes[1, 0].axvline(0.08, color='red', linestyle='--', linewidth=2, label='Oversteer threshold')
+        axes[1, 0].axvline(0, color='green', linestyle='--', linewidth=1, alpha=0.5, label='Neutral')
+        axes[1, 0].set_title('Slip Differential Distribution\n(Improved Bergman Implementation)',
+                            fontsize=14, fontweight='bold')
+        axes[1, 0].set_xlabel('Slip Differential (Rear - Front)')
+        axes[1, 0].set_ylabel('Frequency')
+        axes[1, 0].legend()
+        axes[1, 0].grid(True, alpha=0.3)
+
+        # Plot 4: Track conditions over time (min/max per pixel column, same envelope as every row)
+        indices, grip = minmax_downsample(df['SurfaceGrip'].to_numpy(), axes_width_px(fig, axes[1, 1], dpi))
+        axes[1, 1].plot(df.index.to_numpy()[indices], grip, alpha=0.6, linewidth=0.5, color='purple')
+        axes[1, 1].set_title('Surface Grip Over Session', fontsize=14, fontweight='bold')
+        axes[1, 1].set_xlabel('Data Point Index')
+        axes[1, 1].set_ylabel('Surface Grip')
+        axes[1, 1].axhline(1.0, color='green', linestyle='--', alpha=0.5, label='Perfect Dry (1.0)')
+        axes[1, 1].axhline(0.7, color='orange', linestyle='--', alpha=0.5, label='Typical Wet (~0.7)')
+        axes[1, 1].legend()
+        axes[1, 1].grid(True, alpha=0.3)
+        axes[1, 1].set_ylim(0, 1.1)
+
+        plt.tight_layout()
+        fig.savefig(path, dpi=dpi, bbox_inches='tight')
+        print(f"Saved: {path}\n")
+        if show:
+            plt.show()
+        plt.close(fig)
+    except Exception as e:
+        print(f"Could not create visualizations: {e}")
+
+
+if __name__ == "__main__":
+    # Run analysis on your labeled data
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Analyze labeled ML training telemetry")
+    parser.add_argument("file_path", nargs="?", default="third_party/log.csv",
+                        help="semicolon-separated log (default: third_party/log.csv), or a directory / "
+                             f"quoted glob of logs to analyze together (directories are searched for "
+                             f"{' / '.join(LOG_PATTERNS)})")
+    parser.add_argument("--stream", action="store_true",
+                        help="read in chunks with bounded memory (report only, no per-row plots)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE,
+                        help=f"rows per chunk in --stream mode (default: {DEFAULT_CHUNKSIZE:,})")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always re-parse the CSV (don't read or write the parsed-log cache)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only parse rows appended since the last --incremental run "
+                             "(state kept in <log>.state.json; report only)")
+    parser.add_argument("--no-plot", action="store_true",
+                        help="statistics only: don't import matplotlib or draw the figure")
+    parser.add_argument("--no-show", action="store_true",
+                        help=f"save {PLOT_FILE} with the non-interactive Agg backend, "
+                             "without opening a window (batch runs)")
+    parser.add_argument("--dpi", type=int, default=PLOT_DPI, help=f"figure resolution (default: {PLOT_DPI})")
+    parser.add_argument("--format", choices=("text", "json"), default="text",
+                        help="json: print only the statistics as JSON on stdout (implies --no-plot)")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count(),
+                        help="worker processes when analyzing several logs (default: one per CPU core)")
+    parser.add_argument("--include-incomplete", action="store_true",
+                        help="with several logs: also count laps that never finished (log_incomplete*.csv)")
+    parser.add_argument("--corners-csv", metavar="OUT",
+                        help="also write the per-corner, per-lap table to a semicolon-separated CSV")
+    args = parser.parse_args()
+
+    if is_multi_log(args.file_path):
+        aggs = analyze_logs(args.file_path, jobs=args.jobs, chunksize=args.chunksize,
+                            use_cache=not args.no_cache, incremental=args.incremental,
+                            output_format=args.format, include_incomplete=args.include_incomplete)
+    else:
+        aggs = analyze_labeled_data(args.file_path, stream=args.stream, chunksize=args.chunksize,
+                                    use_cache=not args.no_cache, incremental=args.incremental,
+                                    plot=not args.no_plot, show=not args.no_show, dpi=args.dpi,
+                                    output_format=args.format)
+    if aggs is not None and args.corners_csv:
+        aggs.corner_laps().to_csv(args.corners_csv, sep=';')
+        print(f"Saved: {args.corners_csv}", file=sys.stderr if args.format == 'json' else sys.stdout)
+    raise SystemExit(0 if aggs is not None else 1)
@@ -0,0 +1,55 @@
+"""
+Repeat-run load time of analyze.py with the parsed-log cache
+
+    python benchmarks/bench_analyze_cache.py --rows 1000000
+"""
+
+import os
+import sys
+import time
+import tempfile
+import contextlib
+import io
+
+from synthetic_log import write_synthetic_log
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import analyze  # noqa: E402
+
+
+def timed(fn):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn()
+    return result, time.perf_counter() - start
+
+
+def main(rows, rows_per_lap):
+    with tempfile.TemporaryDirectory() as workdir:
+        log_path = os.path.join(workdir, "log.csv")
+        size = write_synthetic_log(log_path, laps=max(1, rows // rows_per_lap), rows_per_lap=rows_per_lap)
+        print(f"log: {rows:,} rows, {size / 1e6:.1f} MB")
+
+        _, parse_s = timed(lambda: analyze.load_full(log_path, use_cache=False))
+        _, cold_s = timed(lambda: analyze.load_full(log_path))
+        _, warm_s = timed(lambda: analyze.load_full(log_path))
+        _, stream_s = timed(lambda: analyze.aggregate_stream(log_path))
+        print(f"  parse CSV (no cache):       {parse_s:6.2f} s")
+        print(f"  parse CSV + write cache:    {cold_s:6.2f} s")
+        print(f"  full load from cache:       {warm_s:6.2f} s")
+        print(f"  --stream aggregates, cache: {stream_s:6.2f} s")
+
+        # Touching the log invalidates the cache
+        os.utime(log_path)
+        _, rebuilt_s = timed(lambda: analyze.load_full(log_path))
+        print(f"  after log change (rebuild): {rebuilt_s:6.2f} s")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--rows-per-lap", type=int, default=5000)
+    args = parser.parse_args()
+    main(args.rows, args.rows_per_lap)
@@ -0,0 +1,64 @@
+"""
+analyze.py --incremental: cost of a run after a few laps were appended
+
+    python benchmarks/bench_analyze_incremental.py --rows 1000000 --new-laps 2
+"""
+
+import os
+import sys
+import time
+import tempfile
+import contextlib
+import io
+
+import numpy as np
+
+from synthetic_log import write_synthetic_log, synthetic_lap
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import analyze  # noqa: E402
+
+
+def timed(fn):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn()
+    return result, time.perf_counter() - start
+
+
+def main(rows, rows_per_lap, new_laps):
+    laps = max(1, rows // rows_per_lap)
+    with tempfile.TemporaryDirectory() as workdir:
+        log_path = os.path.join(workdir, "log.csv")
+        size = write_synthetic_log(log_path, laps=laps, rows_per_lap=rows_per_lap)
+        print(f"log: {laps * rows_per_lap:,} rows, {size / 1e6:.1f} MB")
+
+        _, first_s = timed(lambda: analyze.aggregate_incremental(log_path))
+
+        rng = np.random.default_rng(1)
+        for lap_num in range(laps + 1, laps + new_laps + 1):
+            lap = synthetic_lap(rng, lap_num, rows_per_lap, "ks_mazda_mx5_cup", "ks_laguna_seca")
+            lap.to_csv(log_path, sep=";", index=False, header=False, mode="a")
+
+        (_, aggs), tail_s = timed(lambda: analyze.aggregate_incremental(log_path))
+        (_, full), full_s = timed(lambda: analyze.aggregate_stream(log_path, use_cache=False))
+        _, idle_s = timed(lambda: analyze.aggregate_incremental(log_path))
+        print(f"  first run (whole log):         {first_s:6.2f} s")
+        print(f"  after {new_laps} new laps (tail only):  {tail_s:6.2f} s")
+        print(f"  nothing new:                   {idle_s:6.2f} s")
+        print(f"  --stream from scratch:         {full_s:6.2f} s")
+
+        same = (aggs.counts().equals(full.counts())
+                and aggs.lap_summary().equals(full.lap_summary()))
+        print(f"  aggregates match a full recompute: {same}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--rows-per-lap", type=int, default=5000)
+    parser.add_argument("--new-laps", type=int, default=2)
+    args = parser.parse_args()
+    main(args.rows, args.rows_per_lap, args.new_laps)
@@ -0,0 +1,70 @@
+"""
+Peak memory of analyze.py: full load vs --stream
+
+Generates synthetic logs of increasing size and runs each analysis mode
+in a fresh subprocess, reporting its peak RSS and wall time.
+(Unix only - peak RSS comes from resource.getrusage.)
+
+    python benchmarks/bench_analyze_memory.py --rows 500000 2000000
+"""
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+from synthetic_log import write_synthetic_log
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ANALYZE = os.path.join(HERE, "..", "analyze.py")
+
+# Runs analyze.py as __main__ (with its directory importable, like `python analyze.py`)
+# and prints the child's own peak RSS (KiB on Linux) after its SystemExit
+RUNNER = (
+    "import os, resource, runpy, sys\n"
+    "sys.argv = [{analyze!r}] + {args!r}\n"
+    "sys.path.insert(0, os.path.dirname({analyze!r}))\n"
+    "try:\n"
+    "    runpy.run_path({analyze!r}, run_name='__main__')\n"
+    "except SystemExit as e:\n"
+    "    if e.code:\n"
+    "        raise\n"
+    "print('PEAK_RSS_KB', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+)
+
+
+def measure(log_path, extra_args, workdir):
+    code = RUNNER.format(analyze=ANALYZE, args=[log_path] + extra_args)
+    env = dict(os.environ, MPLBACKEND="Agg")
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], cwd=workdir, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    elapsed = time.perf_counter() - start
+    peak_kb = int(out.rsplit("PEAK_RSS_KB", 1)[1].split()[0])
+    return peak_kb / 1024, elapsed
+
+
+def main(row_counts, rows_per_lap, chunksize):
+    print(f"{'rows':>10} {'file MB':>8} | {'full RSS MB':>11} {'full s':>7} | {'stream RSS MB':>13} {'stream s':>8}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in row_counts:
+            log_path = os.path.join(workdir, f"log_{rows}.csv")
+            size = write_synthetic_log(log_path, laps=max(1, rows // rows_per_lap), rows_per_lap=rows_per_lap)
+            # No parsed-log cache: the full run would write one and the stream run read it instead of the CSV
+            full_mb, full_s = measure(log_path, ["--no-cache"], workdir)
+            stream_mb, stream_s = measure(log_path, ["--no-cache", "--stream", "--chunksize", str(chunksize)],
+                                          workdir)
+            print(f"{rows:>10,} {size / 1e6:>8.1f} | {full_mb:>11.1f} {full_s:>7.1f} | {stream_mb:>13.1f} {stream_s:>8.1f}")
+            os.remove(log_path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[250_000, 1_000_000, 4_000_000])
+    parser.add_argument("--rows-per-lap", type=int, default=5000)
+    parser.add_argument("--chunksize", type=int, default=200_000)
+    args = parser.parse_args()
+    main(args.rows, args.rows_per_lap, args.chunksize)
@@ -0,0 +1,71 @@
+"""
+Multi-log analysis time vs worker processes (analyze.py DIR --jobs N)
+
+    python benchmarks/bench_analyze_parallel.py --logs 16 --rows 200000
+"""
+
+import os
+import sys
+import time
+import tempfile
+import contextlib
+import io
+
+from synthetic_log import write_synthetic_log
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import analyze  # noqa: E402
+
+CARS = ["ks_mazda_mx5_cup", "bmw_m3_e30", "ks_porsche_911_gt3_r_2016"]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = fn()
+    return result, time.perf_counter() - start
+
+
+def job_counts(max_jobs):
+    counts = [1]
+    while counts[-1] * 2 <= max_jobs:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != max_jobs:
+        counts.append(max_jobs)
+    return counts
+
+
+def main(logs, rows, rows_per_lap, max_jobs):
+    with tempfile.TemporaryDirectory() as workdir:
+        size = 0
+        for i in range(logs):
+            path = os.path.join(workdir, f"session{i:03d}", "log.csv")
+            os.makedirs(os.path.dirname(path))
+            size += write_synthetic_log(path, laps=max(1, rows // rows_per_lap), rows_per_lap=rows_per_lap,
+                                        seed=i, car_model=CARS[i % len(CARS)])
+        paths = analyze.find_logs(workdir)
+        print(f"{logs} logs x {rows:,} rows, {size / 1e6:.1f} MB total, {os.cpu_count()} CPU cores")
+
+        baseline = None
+        expected = None
+        for jobs in job_counts(max_jobs):
+            results, elapsed = timed(lambda: analyze.aggregate_logs(paths, jobs, use_cache=False))
+            aggs = analyze.LogAggregates.combined([part for _, part, _ in results])
+            if expected is None:
+                baseline, expected = elapsed, aggs.counts()
+            assert aggs.counts().equals(expected), "results differ between job counts"
+            speedup = baseline / elapsed
+            print(f"  --jobs {jobs:<3} {elapsed:6.2f} s  {aggs.rows / elapsed / 1e6:5.2f} M rows/s  "
+                  f"speedup {speedup:4.2f}x  efficiency {speedup / jobs:4.0%}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logs", type=int, default=16)
+    parser.add_argument("--rows", type=int, default=200_000, help="rows per log")
+    parser.add_argument("--rows-per-lap", type=int, default=5000)
+    parser.add_argument("--max-jobs", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    main(args.logs, args.rows, args.rows_per_lap, args.max_jobs)
@@ -0,0 +1,83 @@
+"""
+analyze.plot_analysis: figure time as the session grows
+
+The time-series panel is drawn from a min/max-per-pixel downsample and the
+histogram from pre-binned counts, so drawing should stay roughly flat; only
+the O(n) binning/downsampling passes grow with the row count. --raw also
+times the old approach (every row handed to matplotlib) for comparison.
+
+    python benchmarks/bench_analyze_plot.py --rows 100000 1000000 10000000 --raw
+"""
+
+import os
+import sys
+import time
+import tempfile
+import contextlib
+import io
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+import analyze  # noqa: E402
+
+import matplotlib  # noqa: E402
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+
+
+def synthetic_frame(rows, rows_per_lap, seed=0):
+    """Just the columns the figure reads"""
+    rng = np.random.default_rng(seed)
+    laps = np.arange(rows) // rows_per_lap + 1
+    grip = np.repeat(rng.uniform(0.7, 1.0, laps[-1]), rows_per_lap)[:rows]
+    return pd.DataFrame({
+        "Lap": laps,
+        "Label": rng.choice(analyze.LABELS, rows, p=[0.7, 0.15, 0.15]),
+        "SurfaceGrip": grip + rng.normal(0, 0.005, rows),
+        "SlipDiff": rng.normal(0, 0.06, rows),
+    })
+
+
+def raw_panels(df, path):
+    """The two per-row panels drawn the old way, from every row"""
+    fig, axes = plt.subplots(1, 2, figsize=(14, 5))
+    axes[0].hist(df["SlipDiff"], bins=analyze.HIST_BINS, edgecolor="black", alpha=0.7, color="gray")
+    axes[1].plot(df.index, df["SurfaceGrip"], alpha=0.6, linewidth=0.5, color="purple")
+    fig.savefig(path, dpi=analyze.PLOT_DPI, bbox_inches="tight")
+    plt.close(fig)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn()
+    return time.perf_counter() - start
+
+
+def main(row_counts, rows_per_lap, raw):
+    print(f"{'rows':>12}{'prep s':>9}{'figure s':>10}" + (f"{'raw panels s':>14}" if raw else ""))
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "plot.png")
+        for rows in row_counts:
+            df = synthetic_frame(rows, rows_per_lap)
+            aggs = analyze.LogAggregates().update(df)
+            prep = timed(lambda: (analyze.binned_counts(df["SlipDiff"].to_numpy()),
+                                  analyze.minmax_downsample(df["SurfaceGrip"].to_numpy(), 1000)))
+            figure = timed(lambda: analyze.plot_analysis(df, aggs, show=False, path=path))
+            line = f"{rows:>12,}{prep:>9.2f}{figure:>10.2f}"
+            if raw:
+                line += f"{timed(lambda: raw_panels(df, path)):>14.2f}"
+            print(line)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000, 1_000_000, 5_000_000])
+    parser.add_argument("--rows-per-lap", type=int, default=5000)
+    parser.add_argument("--raw", action="store_true", help="also time drawing every row (slow)")
+    args = parser.parse_args()
+    main(args.rows, args.rows_per_lap, args.raw)
@@ -0,0 +1,110 @@
+"""
+analyze.py startup and end-to-end time per output mode, each in a fresh interpreter
+
+    import analyze                   module import only
+    --format json                    statistics only, as JSON
+    --no-plot                        text report, no figure
+    --no-show                        text report + figure drawn with Agg
+
+Every mode runs --repeat times in a new process (the fastest run counts),
+with the parsed-log cache warm so parsing does not dominate. Exits with
+status 1 if a statistics-only mode imports a plotting library or the import
+exceeds --import-budget.
+
+    python benchmarks/bench_analyze_startup.py --rows 200000
+"""
+
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+
+from synthetic_log import write_synthetic_log
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PLOTTING_MODULES = ("matplotlib", "seaborn")
+
+# Runs in a fresh interpreter, then reports which plotting modules got imported
+PROBE = """
+import sys
+sys.path.insert(0, {app_dir!r})
+{body}
+sys.stderr.write("\\nPLOTTING " + " ".join(m for m in {modules!r} if m in sys.modules) + "\\n")
+"""
+
+# The CLI, as `python analyze.py ARGS` would run it
+RUN_CLI = """
+import runpy
+sys.argv = ["analyze.py"] + sys.argv[1:]
+try:
+    runpy.run_path(sys.path[0] + "/analyze.py", run_name="__main__")
+except SystemExit:
+    pass
+"""
+
+
+def run(args, workdir):
+    """(seconds, plotting modules imported) for one fresh-interpreter run of analyze"""
+    body = "import analyze" if args is None else RUN_CLI
+    code = PROBE.format(app_dir=APP_DIR, body=body, modules=PLOTTING_MODULES)
+    env = dict(os.environ, MPLBACKEND="Agg")
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code] + (args or []), cwd=workdir, env=env,
+                            capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0 or "PLOTTING" not in result.stderr:
+        raise RuntimeError(f"analyze failed:\n{result.stderr}")
+    return elapsed, result.stderr.rsplit("PLOTTING", 1)[1].split()
+
+
+def main(rows, rows_per_lap, repeat, import_budget):
+    laps = max(1, rows // rows_per_lap)
+    failures = []
+    with tempfile.TemporaryDirectory() as workdir:
+        log_path = os.path.join(workdir, "log.csv")
+        size = write_synthetic_log(log_path, laps=laps, rows_per_lap=rows_per_lap)
+        print(f"log: {laps * rows_per_lap:,} rows, {size / 1e6:.1f} MB")
+
+        # Warm the parsed-log cache
+        run([log_path, "--format", "json"], workdir)
+
+        modes = [
+            ("import analyze", None, False),
+            ("--format json", [log_path, "--format", "json"], False),
+            ("--no-plot", [log_path, "--no-plot"], False),
+            ("--no-show (Agg)", [log_path, "--no-show"], True),
+        ]
+        results = {}
+        for name, args, plots in modes:
+            best = None
+            for _ in range(repeat):
+                elapsed, plotting = run(args, workdir)
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = best
+            note = f"imports {', '.join(plotting)}" if plotting else "no plotting imports"
+            print(f"  {name:<18}{best:8.2f} s   {note}")
+            if plotting and not plots:
+                failures.append(f"{name} imported {', '.join(plotting)}")
+
+    if import_budget is not None and results["import analyze"] > import_budget:
+        failures.append(f"import took {results['import analyze']:.2f} s (budget {import_budget:.2f} s)")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print(json.dumps({name: round(seconds, 4) for name, seconds in results.items()}))
+    return not failures
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--rows-per-lap", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per mode; the fastest counts")
+    parser.add_argument("--import-budget", type=float, metavar="SECONDS",
+                        help="fail if importing analyze takes longer")
+    args = parser.parse_args()
+    raise SystemExit(0 if main(args.rows, args.rows_per_lap, args.repeat, args.import_budget) else 1)
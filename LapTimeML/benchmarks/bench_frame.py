@@ -0,0 +1,267 @@
+"""
+Per-frame cost of the in-game code, measured headless through the replay harness
+
+Benchmarks (each call timed on its own; setup such as writing the frame
+into the shared memory pages is excluded):
+    LapTimeML.acUpdate          full frame of the logger (lap writes disabled)
+    FeatureEngine.push          rolling features of one frame (5-frame window)
+    calculate_label_improved    labeler on the engine's window changes
+    StreamingClassifier.push    one frame into the model's input window
+    StreamingClassifier.update  one prediction of a random model of train_model's default size
+    get_recommendation          window recommendation text
+    save_lap_data[N]            writing one N-frame lap to log.csv + log.bin
+    Template.acUpdate           full frame of the Template app
+
+Reports ns per call and memory per call: the peak traced allocation during
+the call and the bytes still held afterwards. Results are appended to
+benchmarks/results/bench_frame.json with the git commit, and compared with
+the latest run from a different commit to catch regressions.
+
+    python benchmarks/bench_frame.py
+    python benchmarks/bench_frame.py --frames 20000 --baseline 1a2b3c4
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import platform
+import tempfile
+import subprocess
+import tracemalloc
+import numpy as np
+import pandas as pd
+
+from synthetic_log import synthetic_lap
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, ".."))
+import replay  # noqa: E402
+import train_model  # noqa: E402
+
+RESULTS_FILE = os.path.join(HERE, "results", "bench_frame.json")
+
+# Relative slowdown reported as a regression
+DEFAULT_TOLERANCE = 0.15
+
+LAP_LENGTHS = (1000, 5000, 20000)
+
+
+def synthetic_frames(laps, rows_per_lap, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.concat([synthetic_lap(rng, lap, rows_per_lap, "ks_mazda_mx5_cup", "ks_laguna_seca")
+                    for lap in range(1, laps + 1)], ignore_index=True)
+    return {name: df[name].to_numpy() for name in df.columns}
+
+
+def random_model(app, window=train_model.DEFAULT_WINDOW, hidden=train_model.DEFAULT_HIDDEN, seed=0):
+    rng = np.random.default_rng(seed)
+    features = len(app.MODEL_FEATURES)
+    return app.HandlingModel(window, app.MODEL_FEATURES, [0.0] * features, [1.0] * features,
+                             rng.normal(0, 0.1, (hidden, window * features)).tolist(), [0.0] * hidden,
+                             rng.normal(0, 0.1, (len(app.LABELS), hidden)).tolist(), [0.0] * len(app.LABELS))
+
+
+def timer_overhead(samples=100000):
+    clock = time.perf_counter_ns
+    start = clock()
+    for _ in range(samples):
+        t0 = clock()
+        clock() - t0
+    return (clock() - start) / samples
+
+
+def measure(setup, call, n, overhead, repeat=3):
+    """
+    (ns per call, peak allocated bytes per call, retained bytes per call)
+    The time is the fastest of `repeat` passes over the n calls.
+    """
+    clock = time.perf_counter_ns
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        total = 0
+        for i in range(n):
+            setup(i)
+            t0 = clock()
+            call(i)
+            total += clock() - t0
+        best = total if best is None else min(best, total)
+
+    gc.collect()
+    tracemalloc.start()
+    peak_sum = 0
+    retained = 0
+    for i in range(n):
+        setup(i)
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        call(i)
+        current, peak = tracemalloc.get_traced_memory()
+        peak_sum += peak - before
+        retained += current - before
+    tracemalloc.stop()
+    return max(best / n - overhead, 0.0), peak_sum / n, retained / n
+
+
+def run_suite(frames, rows_per_lap):
+    laps = max(1, frames // rows_per_lap)
+    columns = synthetic_frames(laps, rows_per_lap)
+    n = len(columns["Lap"])
+    overhead = timer_overhead()
+    results = {}
+
+    workdir = tempfile.mkdtemp(prefix="bench_frame_")
+    logger = replay.Replay("LapTimeML", replay_dir=workdir)
+    app = logger.app
+    logger.load(columns)
+    app.acMain("1.16")
+
+    # Lap writes run on the writer thread; they are measured by save_lap_data below
+    app.log_formats = ()
+    results["LapTimeML.acUpdate"] = measure(logger.write_frame, lambda i: app.acUpdate(1 / 60.0), n, overhead)
+
+    label = app.calculate_label_improved
+    features = app.FeatureEngine(app.history_size)
+    inputs = list(zip(*(np.asarray(columns[c], dtype=float).tolist() for c in
+                        ("YawRate", "LateralAccel", "SteerAngle", "Speed", "SlipDiff"))))
+    times = np.asarray(columns["CurrentTime"]).tolist()
+    results["FeatureEngine.push"] = measure(lambda i: None, lambda i: features.push(inputs[i], times[i]),
+                                            n, overhead)
+
+    def push_features(i):
+        features.push(inputs[i], times[i])
+
+    def label_frame(i):
+        label(*inputs[i], features.change(app.YAW_RATE), features.change(app.LAT_ACCEL),
+              features.change(app.SPEED))
+
+    results["calculate_label_improved"] = measure(push_features, label_frame, n, overhead)
+
+    # Unlimited budget: every update predicts
+    classifier = app.StreamingClassifier(random_model(app), budget_ms=1e9)
+    model_rows = list(zip(*(np.asarray(columns[c], dtype=float).tolist() for c in app.MODEL_FEATURES)))
+    results["StreamingClassifier.push"] = measure(lambda i: None, lambda i: classifier.push(model_rows[i]),
+                                                  n, overhead)
+    results["StreamingClassifier.update"] = measure(lambda i: classifier.push(model_rows[i]),
+                                                    lambda i: classifier.update(), n, overhead)
+    results["get_recommendation"] = measure(lambda i: None, lambda i: app.get_recommendation(), n, overhead)
+
+    app.log_formats = ("csv", "binary")
+    app.ensure_log_file()
+    rows = [tuple(frame) for frame in zip(*(np.asarray(columns[name]).tolist() if name != "Label"
+                                            else [app.LABELS.index(v) for v in columns[name]]
+                                            for name, _ in app.CHANNELS))]
+    for length in LAP_LENGTHS:
+        buffers = []
+
+        def fill(i, length=length):
+            buffer = app.LapBuffer(app.lap_buffer_chunk)
+            for k in range(length):
+                buffer.append(rows[k % len(rows)])
+            buffers.append(buffer)
+
+        ns, peak, retained = measure(
+            fill, lambda i: app.save_lap_data(i + 1, buffers.pop(), "ks_mazda_mx5_cup", "ks_laguna_seca"),
+            3, overhead, repeat=1)
+        app.spare_lap_buffers.clear()
+        results[f"save_lap_data[{length}]"] = (ns, peak, retained)
+        results[f"save_lap_data[{length}] per frame"] = (ns / length, peak / length, retained / length)
+    app.log_formats = ()
+    app.acShutdown()
+
+    template = replay.Replay("Template_Assetto_Corsa_App", replay_dir=workdir)
+    template.load(columns)
+    template.app.acMain("1.16")
+    results["Template.acUpdate"] = measure(template.write_frame, lambda i: template.app.acUpdate(1 / 60.0),
+                                           n, overhead)
+    return {name: {"ns": ns, "peak_bytes": peak, "retained_bytes": retained}
+            for name, (ns, peak, retained) in results.items()}
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no", "--", ".."],
+                               cwd=HERE, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+
+def load_history():
+    try:
+        with open(RESULTS_FILE) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return []
+
+
+def save_run(history, run):
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+    tmp = RESULTS_FILE + ".tmp"
+    with open(tmp, "w") as file:
+        json.dump(history + [run], file, indent=1)
+    os.replace(tmp, RESULTS_FILE)
+
+
+def find_baseline(history, commit, wanted=None):
+    for run in reversed(history):
+        if wanted is not None:
+            if run["commit"].startswith(wanted):
+                return run
+        elif run["commit"] != commit:
+            return run
+    return None
+
+
+def report(results, baseline, tolerance):
+    """Print the results table; returns the names that regressed"""
+    regressions = []
+    header = f"{'benchmark':<36}{'ns/call':>12}{'peak B':>10}{'retained B':>12}"
+    if baseline:
+        header += f"   vs {baseline['commit']}"
+    print(header)
+    for name, result in results.items():
+        line = f"{name:<36}{result['ns']:>12,.0f}{result['peak_bytes']:>10,.0f}{result['retained_bytes']:>12,.1f}"
+        before = baseline["results"].get(name) if baseline else None
+        if before:
+            change = result["ns"] / before["ns"] - 1 if before["ns"] else 0.0
+            line += f"   {change:+7.1%}"
+            grew = result["retained_bytes"] > before["retained_bytes"] * (1 + tolerance) + 8
+            if change > tolerance or grew:
+                line += "  <-- REGRESSION" + (" (retains more memory)" if grew else "")
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=9000, help="replayed frames per benchmark")
+    parser.add_argument("--rows-per-lap", type=int, default=3000)
+    parser.add_argument("--baseline", metavar="COMMIT",
+                        help="stored run to compare with (default: latest run of another commit)")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"slowdown reported as a regression (default {DEFAULT_TOLERANCE * 100:.0f}%%)")
+    parser.add_argument("--no-save", action="store_true", help="do not store this run")
+    args = parser.parse_args()
+
+    commit = git_commit()
+    results = run_suite(args.frames, args.rows_per_lap)
+    history = load_history()
+    baseline = find_baseline(history, commit, args.baseline)
+    if args.baseline and baseline is None:
+        print(f"No stored run for commit {args.baseline}")
+    regressions = report(results, baseline, args.tolerance)
+
+    if not args.no_save:
+        save_run(history, {"commit": commit, "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                           "python": platform.python_version(), "frames": args.frames,
+                           "results": results})
+        print(f"\nStored as {commit} in {os.path.relpath(RESULTS_FILE)}")
+    raise SystemExit(1 if regressions else 0)
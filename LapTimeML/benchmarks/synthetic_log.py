@@ -0,0 +1,81 @@
+"""
+Synthetic log.csv generator for the benchmarks
+
+Writes plausible (not physically accurate) telemetry in the logger's
+exact CSV layout, one lap at a time so arbitrarily large logs can be
+generated in bounded memory.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from lap_buffer import CHANNELS, LABELS  # noqa: E402
+from corners import load_corners, corner_codes, NO_CORNER  # noqa: E402
+
+COLUMNS = ["Lap", "CarModel", "Track"] + [name for name, _ in CHANNELS]
+
+CORNERS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "third_party", "track_corners.json")
+
+
+def corner_column(track_name, pos):
+    """Corner index per position, as the logger tags it"""
+    index = load_corners(CORNERS_FILE, track_name)
+    if index is None:
+        return np.full(len(pos), NO_CORNER, dtype=np.int16)
+    return corner_codes(index, pos)
+
+
+def synthetic_lap(rng, lap_num, rows, car_model, track_name, start_time=0):
+    """One lap of telemetry as a DataFrame in log.csv column order"""
+    pos = np.linspace(0.0, 1.0, rows, endpoint=False)
+    speed = 120 + 60 * np.sin(pos * 2 * np.pi * 7) + rng.normal(0, 3, rows)
+    slip = np.abs(rng.normal(0.05, 0.05, (rows, 4)))
+    slip_diff = (slip[:, 2] + slip[:, 3]) / 2 - (slip[:, 0] + slip[:, 1]) / 2
+    lap = {
+        "Lap": lap_num, "CarModel": car_model, "Track": track_name,
+        "TrackPos": pos, "Corner": corner_column(track_name, pos), "CurrentTime": start_time + np.arange(rows) * 16,
+        "YawRate": rng.normal(0, 0.3, rows), "LateralAccel": rng.normal(0, 0.8, rows),
+        "LongitudinalAccel": rng.normal(0, 0.4, rows), "VerticalAccel": rng.normal(0, 0.05, rows),
+        "SteerAngle": rng.normal(0, 0.2, rows), "Speed": speed,
+        "LocalVelX": rng.normal(0, 0.5, rows), "LocalVelY": rng.normal(0, 0.1, rows), "LocalVelZ": speed / 3.6,
+        "WheelSlipFL": slip[:, 0], "WheelSlipFR": slip[:, 1], "WheelSlipRL": slip[:, 2], "WheelSlipRR": slip[:, 3],
+        "Throttle": rng.uniform(0, 100, rows), "Brake": rng.uniform(0, 100, rows) * (rng.random(rows) < 0.2),
+        "Gear": rng.integers(2, 7, rows),
+        "SurfaceGrip": np.full(rows, rng.uniform(0.7, 1.0)), "RoadTemp": 30.0, "AirTemp": 22.0,
+        "Heading": pos * 2 * np.pi - np.pi, "Pitch": rng.normal(0, 0.01, rows), "Roll": rng.normal(0, 0.01, rows),
+        "CarX": 500 * np.cos(pos * 2 * np.pi), "CarY": 10.0, "CarZ": 500 * np.sin(pos * 2 * np.pi),
+        "SlipDiff": slip_diff,
+        "YawGradient": rng.normal(0, 0.5, rows),
+        "YawAccel": rng.normal(0, 5, rows), "SteerRate": rng.normal(0, 2, rows),
+        "LatJerk": rng.normal(0, 10, rows), "SlipDiffEMA": pd.Series(slip_diff).ewm(span=15, adjust=False).mean().to_numpy(),
+        "YawRateStd": np.abs(rng.normal(0, 0.05, rows)),
+        "Label": rng.choice(LABELS, rows, p=[0.7, 0.15, 0.15]),
+    }
+    return pd.DataFrame(lap, columns=COLUMNS)
+
+
+def write_synthetic_log(path, laps=10, rows_per_lap=5000, seed=0,
+                        car_model="ks_mazda_mx5_cup", track_name="ks_laguna_seca"):
+    """Write a semicolon-separated log with `laps` laps; returns the file size in bytes"""
+    rng = np.random.default_rng(seed)
+    for lap_num in range(1, laps + 1):
+        df = synthetic_lap(rng, lap_num, rows_per_lap, car_model, track_name)
+        df.to_csv(path, sep=";", index=False, header=lap_num == 1, mode="w" if lap_num == 1 else "a")
+    return os.path.getsize(path)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic log.csv")
+    parser.add_argument("path")
+    parser.add_argument("--laps", type=int, default=10)
+    parser.add_argument("--rows-per-lap", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    size = write_synthetic_log(args.path, args.laps, args.rows_per_lap, args.seed)
+    print("Wrote {} ({:.1f} MB)".format(args.path, size / 1e6))
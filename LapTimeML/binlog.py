@@ -0,0 +1,343 @@
+"""
+Columnar binary telemetry log
+
+Layout (little-endian):
+    file header   MAGIC, u32 length, JSON {"channels": [[name, typecode], ...], "labels": [...]}
+    lap blocks    block header (lap, session, row count, flags, car model, track)
+                  followed by one contiguous typed column per channel
+    lap index     one fixed-size entry per block
+    trailer       offset of the lap index, END_MAGIC
+
+Every section starts on an 8-byte boundary. Blocks are self-describing, so
+a file whose index was lost (crash mid-append) is recovered by scanning.
+
+A lap may be stored as several blocks: the logger flushes fixed-size chunks
+while the lap is running. Blocks carry LAP_COMPLETE only once their lap
+finished, so the chunks of a lap cut short by a crash or shutdown stay
+incomplete, and readers skip them unless asked not to.
+
+The writing side (append_lap) only needs the standard library and runs
+inside the game. Reading (BinaryLog) memory-maps the file with NumPy and
+returns zero-copy arrays for a single block or channel; lap() joins the
+blocks of one lap in file order.
+"""
+
+import os
+import json
+import struct
+from collections import namedtuple
+
+MAGIC = b"ACBLOG01"
+END_MAGIC = b"ACBLEND1"
+BLOCK_MAGIC = b"LAPB"
+INDEX_MAGIC = b"LIDX"
+
+# Lap block flags
+LAP_COMPLETE = 1
+
+
+_LENGTH = struct.Struct("<I")
+_BLOCK = struct.Struct("<4sIQIIqI")      # magic, header_len, block_len, rows, lap, session, flags
+_STRING = struct.Struct("<H")
+_INDEX_HEADER = struct.Struct("<4sI")    # magic, entry count
+_INDEX_ENTRY = struct.Struct("<QQIIqI")  # offset, block_len, rows, lap, session, flags
+_TRAILER = struct.Struct("<Q8s")         # index offset, END_MAGIC
+_FLAGS = struct.Struct("<I")             # last field of _BLOCK, rewritten in place
+
+# array typecode -> NumPy dtype
+DTYPES = {"d": "<f8", "f": "<f4", "i": "<i4", "h": "<i2", "b": "i1"}
+
+LapEntry = namedtuple("LapEntry", "offset block_len rows lap session flags")
+
+
+def _pad(n):
+    return (-n) % 8
+
+
+# ------------------------------------
+# Writing (standard library only)
+
+def _file_header(channels, labels):
+    meta = json.dumps({"channels": [list(c) for c in channels], "labels": list(labels)}).encode("utf-8")
+    header = MAGIC + _LENGTH.pack(len(meta)) + meta
+    return header + b"\0" * _pad(len(header))
+
+
+def _encode_string(text):
+    data = text.encode("utf-8")
+    return _STRING.pack(len(data)) + data
+
+
+def _read_file_header(file):
+    """Returns (channels, labels, end offset of the header)"""
+    file.seek(0)
+    magic = file.read(len(MAGIC))
+    if magic != MAGIC:
+        raise ValueError("not a binary telemetry log")
+    length = _LENGTH.unpack(file.read(_LENGTH.size))[0]
+    meta = json.loads(file.read(length).decode("utf-8"))
+    end = len(MAGIC) + _LENGTH.size + length
+    return [tuple(c) for c in meta["channels"]], meta["labels"], end + _pad(end)
+
+
+def _read_index(file, file_size, data_start):
+    """
+    Returns (entries, end of the last block)
+    Uses the stored index when the trailer is intact, otherwise rebuilds
+    it by walking the block headers.
+    """
+    if file_size >= data_start + _TRAILER.size:
+        file.seek(file_size - _TRAILER.size)
+        index_offset, end_magic = _TRAILER.unpack(file.read(_TRAILER.size))
+        if end_magic == END_MAGIC and data_start <= index_offset < file_size:
+            file.seek(index_offset)
+            magic, count = _INDEX_HEADER.unpack(file.read(_INDEX_HEADER.size))
+            if magic == INDEX_MAGIC:
+                raw = file.read(count * _INDEX_ENTRY.size)
+                entries = [LapEntry(*_INDEX_ENTRY.unpack_from(raw, i * _INDEX_ENTRY.size))
+                           for i in range(count)]
+                return entries, index_offset
+    return _scan_blocks(file, file_size, data_start)
+
+
+def _scan_blocks(file, file_size, data_start):
+    entries = []
+    pos = data_start
+    while pos + _BLOCK.size <= file_size:
+        file.seek(pos)
+        magic, _, block_len, rows, lap, session, flags = _BLOCK.unpack(file.read(_BLOCK.size))
+        if magic != BLOCK_MAGIC or pos + block_len > file_size:
+            break
+        entries.append(LapEntry(pos, block_len, rows, lap, session, flags))
+        pos += block_len
+    return entries, pos
+
+
+def _mark_complete(file, entries, lap_num, session):
+    """Set LAP_COMPLETE on the earlier blocks (chunks) of a lap, in place"""
+    for i, entry in enumerate(entries):
+        if entry.lap == lap_num and entry.session == session and not entry.flags & LAP_COMPLETE:
+            flags = entry.flags | LAP_COMPLETE
+            file.seek(entry.offset + _BLOCK.size - _FLAGS.size)
+            file.write(_FLAGS.pack(flags))
+            entries[i] = entry._replace(flags=flags)
+
+
+def _write_index(file, entries, index_offset):
+    file.seek(index_offset)
+    file.truncate()
+    file.write(_INDEX_HEADER.pack(INDEX_MAGIC, len(entries)))
+    for entry in entries:
+        file.write(_INDEX_ENTRY.pack(*entry))
+    file.write(_TRAILER.pack(index_offset, END_MAGIC))
+
+
+def mark_lap_complete(path, lap_num, session):
+    """Flag every stored chunk of a lap as complete (its last chunk was empty)"""
+    if not os.path.exists(path):
+        return
+    with open(path, "r+b") as file:
+        _, _, data_start = _read_file_header(file)
+        file.seek(0, os.SEEK_END)
+        entries, end = _read_index(file, file.tell(), data_start)
+        _mark_complete(file, entries, lap_num, session)
+        _write_index(file, entries, end)
+
+
+def channel_layout(path):
+    """[(name, typecode), ...] of an existing log, or None if it is empty or not a binary log"""
+    try:
+        with open(path, "rb") as file:
+            return _read_file_header(file)[0]
+    except (OSError, ValueError, struct.error):
+        return None
+
+
+def append_lap(path, channels, labels, columns, rows, lap_num, session, car_model, track_name,
+               flags=LAP_COMPLETE):
+    """
+    Append one lap block (a whole lap or one chunk of it) and rewrite the lap index
+    columns: one array.array per channel (only the first `rows` values are written)
+    flags:   LAP_COMPLETE also marks the lap's earlier chunks complete
+    """
+    for (name, typecode), column in zip(channels, columns):
+        if column.typecode != typecode or typecode not in DTYPES:
+            raise ValueError("column {} has typecode {}, expected {}".format(name, column.typecode, typecode))
+
+    mode = "r+b" if os.path.exists(path) and os.path.getsize(path) > 0 else "w+b"
+    with open(path, mode) as file:
+        if mode == "w+b":
+            file.write(_file_header(channels, labels))
+            entries, end = [], file.tell()
+        else:
+            file_channels, _, data_start = _read_file_header(file)
+            if file_channels != [tuple(c) for c in channels]:
+                raise ValueError("channel layout differs from {}".format(path))
+            file.seek(0, os.SEEK_END)
+            entries, end = _read_index(file, file.tell(), data_start)
+
+        if flags & LAP_COMPLETE:
+            _mark_complete(file, entries, lap_num, session)
+
+        # Overwrite the old index (or a torn tail) with the new block
+        file.seek(end)
+        file.truncate()
+
+        strings = _encode_string(car_model) + _encode_string(track_name)
+        header_len = _BLOCK.size + len(strings)
+        header_len += _pad(header_len)
+        block_len = header_len
+        for column in columns:
+            size = rows * column.itemsize
+            block_len += size + _pad(size)
+
+        file.write(_BLOCK.pack(BLOCK_MAGIC, header_len, block_len, rows, lap_num, session, flags))
+        file.write(strings + b"\0" * (header_len - _BLOCK.size - len(strings)))
+        for column in columns:
+            data = memoryview(column)[:rows]
+            file.write(data)
+            file.write(b"\0" * _pad(rows * column.itemsize))
+
+        entries.append(LapEntry(end, block_len, rows, lap_num, session, flags))
+        _write_index(file, entries, end + block_len)
+
+
+# ------------------------------------
+# Reading (NumPy)
+
+class BinaryLog:
+    """Memory-mapped reader; block and channel accessors return zero-copy views"""
+
+    def __init__(self, path, include_incomplete=False):
+        """include_incomplete: also expose blocks of laps that never finished"""
+        import numpy as np
+        self._np = np
+        self.path = path
+        with open(path, "rb") as file:
+            self.channels, self.labels, data_start = _read_file_header(file)
+            file.seek(0, os.SEEK_END)
+            self.entries, _ = _read_index(file, file.tell(), data_start)
+        self.incomplete_rows = sum(e.rows for e in self.entries if not e.flags & LAP_COMPLETE)
+        if not include_incomplete:
+            self.entries = [e for e in self.entries if e.flags & LAP_COMPLETE]
+        self._map = np.memmap(path, dtype=np.uint8, mode="r")
+        self._channel_index = dict((name, i) for i, (name, _) in enumerate(self.channels))
+        self._dtypes = [np.dtype(DTYPES[typecode]) for _, typecode in self.channels]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def block_info(self, i):
+        """(lap, session, rows, complete, car_model, track) of block i"""
+        entry = self.entries[i]
+        car_model, track_name = self._strings(entry)
+        return entry.lap, entry.session, entry.rows, bool(entry.flags & LAP_COMPLETE), car_model, track_name
+
+    def block(self, i):
+        """All channels of block i (a whole lap or one flushed chunk of it) as {name: ndarray}"""
+        entry = self.entries[i]
+        return dict((name, self._column(entry, c)) for c, (name, _) in enumerate(self.channels))
+
+    def laps(self):
+        """[(session, lap), ...] of the laps in the log, in file order"""
+        seen = set()
+        keys = []
+        for entry in self.entries:
+            key = (entry.session, entry.lap)
+            if key not in seen:
+                seen.add(key)
+                keys.append(key)
+        return keys
+
+    def lap_blocks(self, session, lap_num):
+        """Indices of the blocks holding one lap, in file (= recording) order"""
+        return [i for i, entry in enumerate(self.entries) if entry.session == session and entry.lap == lap_num]
+
+    def lap(self, session, lap_num):
+        """
+        All channels of one lap as {name: ndarray}, its blocks concatenated
+        Incomplete laps are only found if the log was opened with include_incomplete.
+        A lap stored as a single block is returned without copying.
+        """
+        blocks = self.lap_blocks(session, lap_num)
+        if not blocks:
+            raise KeyError("no lap {} of session {} in {}".format(lap_num, session, self.path))
+        if len(blocks) == 1:
+            return self.block(blocks[0])
+        return dict((name, self._np.concatenate([self._column(self.entries[i], c) for i in blocks]))
+                    for c, (name, _) in enumerate(self.channels))
+
+    def channel(self, name, i=None):
+        """One channel - of block i, or concatenated over every block"""
+        c = self._channel_index[name]
+        if i is not None:
+            return self._column(self.entries[i], c)
+        return self._np.concatenate([self._column(entry, c) for entry in self.entries])
+
+    def label_names(self, codes):
+        return self._np.asarray(self.labels, dtype=object)[codes]
+
+    def _strings(self, entry):
+        pos = entry.offset + _BLOCK.size
+        strings = []
+        for _ in range(2):
+            length = _STRING.unpack_from(self._map, pos)[0]
+            pos += _STRING.size
+            strings.append(bytes(self._map[pos:pos + length]).decode("utf-8"))
+            pos += length
+        return strings
+
+    def _column(self, entry, c):
+        header_len = _BLOCK.unpack_from(self._map, entry.offset)[1]
+        pos = entry.offset + header_len
+        for dtype in self._dtypes[:c]:
+            size = entry.rows * dtype.itemsize
+            pos += size + _pad(size)
+        dtype = self._dtypes[c]
+        return self._np.frombuffer(self._map, dtype=dtype, count=entry.rows, offset=pos)
+
+
+def export_csv(bin_path, csv_path, include_incomplete=False):
+    """Convert a binary log into the semicolon-separated log.csv layout; returns blocks exported"""
+    import csv
+    log = BinaryLog(bin_path, include_incomplete)
+    names = [name for name, _ in log.channels]
+    label_column = names.index("Label") if "Label" in names else None
+    exported = 0
+    with open(csv_path, "w", newline="") as file:
+        writer = csv.writer(file, delimiter=";")
+        writer.writerow(["Lap", "CarModel", "Track"] + names)
+        for i in range(len(log)):
+            lap_num, _, rows, complete, car_model, track_name = log.block_info(i)
+            exported += 1
+            block = log.block(i)
+            columns = [block[name].tolist() for name in names]
+            if label_column is not None:
+                columns[label_column] = [log.labels[code] for code in columns[label_column]]
+            prefix = [lap_num, car_model, track_name]
+            writer.writerows(prefix + list(row) for row in zip(*columns))
+    return exported
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or convert a binary telemetry log")
+    parser.add_argument("log", help="binary log file (e.g. third_party/log.bin)")
+    parser.add_argument("--csv", metavar="OUT", help="export to a semicolon-separated CSV")
+    parser.add_argument("--include-incomplete", action="store_true",
+                        help="also use chunks of laps that never finished (crash or shutdown mid-lap)")
+    args = parser.parse_args()
+
+    if args.csv:
+        count = export_csv(args.log, args.csv, include_incomplete=args.include_incomplete)
+        print("Exported {} blocks to {}".format(count, args.csv))
+    else:
+        log = BinaryLog(args.log, include_incomplete=args.include_incomplete)
+        print("{}: {} blocks, channels: {}".format(args.log, len(log), ", ".join(n for n, _ in log.channels)))
+        if log.incomplete_rows and not args.include_incomplete:
+            print("  ({} rows of incomplete laps hidden, see --include-incomplete)".format(log.incomplete_rows))
+        for i in range(len(log)):
+            lap_num, session, rows, complete, car_model, track_name = log.block_info(i)
+            print("  session {} lap {:3d}: {:6d} rows  {}  {} @ {}".format(
+                session, lap_num, rows, "complete" if complete else "INCOMPLETE", car_model, track_name))
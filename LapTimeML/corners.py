@@ -0,0 +1,91 @@
+"""
+Corner lookup by normalized track position
+
+third_party/track_corners.json lists each track's corners as
+[start_pos, end_pos) intervals of graphics.normalizedCarPosition. A
+track's corners are loaded once into sorted start/end lists; locating the
+corner for a position is a bisect (O(log n)), and usually O(1) because the
+car is still in the corner found last time, or has just reached the next one.
+corner_codes does the same for a whole column of positions (NumPy, offline).
+
+Corners are identified by their index in the track's list in the JSON file
+(NO_CORNER between corners). A corner whose interval crosses the start/finish
+line (start_pos > end_pos) is split into two intervals with the same index.
+"""
+
+import json
+from bisect import bisect_right
+
+NO_CORNER = -1
+
+
+class CornerIndex:
+    def __init__(self, corners):
+        """corners: [(name, start_pos, end_pos), ...] in file order"""
+        self.names = [name for name, _, _ in corners]
+        intervals = []
+        for index, (_, start, end) in enumerate(corners):
+            if start <= end:
+                intervals.append((start, end, index))
+            else:
+                intervals.append((start, 1.0, index))
+                intervals.append((0.0, end, index))
+        intervals.sort()
+        self.starts = [start for start, _, _ in intervals]
+        self.ends = [end for _, end, _ in intervals]
+        self.indices = [index for _, _, index in intervals]
+        self._last = 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def lookup(self, pos):
+        """Index of the corner containing pos, or NO_CORNER"""
+        starts = self.starts
+        ends = self.ends
+        i = self._last
+        n = len(starts)
+        # Same interval as last time, or the one after it
+        if i < n and starts[i] <= pos < ends[i]:
+            return self.indices[i]
+        if i + 1 < n and starts[i + 1] <= pos < ends[i + 1]:
+            self._last = i + 1
+            return self.indices[i + 1]
+        i = bisect_right(starts, pos) - 1
+        if i >= 0 and pos < ends[i]:
+            self._last = i
+            return self.indices[i]
+        return NO_CORNER
+
+    def name(self, index):
+        return self.names[index] if index != NO_CORNER else ""
+
+
+def load_corners(path, track_name):
+    """
+    CornerIndex of track_name from a track_corners.json file
+    Returns None if the file is missing or unreadable or has no entry for the track
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            tracks = json.load(file)
+        entry = tracks[track_name]
+        corners = [(c["name"], float(c["start_pos"]), float(c["end_pos"])) for c in entry["corners"]]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return CornerIndex(corners) if corners else None
+
+
+# ------------------------------------
+# Whole logs at once (NumPy, analysis tools only)
+
+def corner_codes(index, positions):
+    """Corner index for every position with one np.searchsorted (NO_CORNER between corners)"""
+    import numpy as np
+    positions = np.asarray(positions, dtype=np.float64)
+    if not index.starts:
+        return np.full(len(positions), NO_CORNER, dtype=np.int16)
+    i = np.searchsorted(np.asarray(index.starts), positions, side="right") - 1
+    clipped = np.maximum(i, 0)
+    inside = (i >= 0) & (positions < np.asarray(index.ends)[clipped])
+    return np.where(inside, np.asarray(index.indices)[clipped], NO_CORNER).astype(np.int16)
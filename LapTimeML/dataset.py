@@ -0,0 +1,288 @@
+"""
+Sequence dataset builder for LSTM training
+
+Turns a log into (window, stride, horizon) samples without copying
+overlapping windows: a sample is a start frame into a lap's contiguous
+frames x channels array, and the windows themselves are strided views
+(frame_windows). A sample's label is the Label `horizon` frames after its
+last frame, and a window never crosses a lap boundary.
+
+Laps (or whole sessions) are assigned to train/val/test, and every split
+is written as plain .npy files:
+
+    OUT/meta.json               channels, window/stride/horizon, label source,
+                                per-split counts, training mean/std per channel
+    OUT/<split>/frames.npy      the split's laps, frames x channels (float32)
+    OUT/<split>/starts.npy      first frame of each sample (int64)
+    OUT/<split>/labels.npy      label code of each sample (int8, LABELS order)
+
+The output is built in a temporary directory and renamed into place, so
+readers never see a half-written dataset. SequenceShard opens a split with
+np.load(mmap_mode='r'): loading reads only the headers (constant time
+whatever the size), pages are shared between processes through the OS page
+cache, and read-only maps are safe to use from any number of workers.
+
+    python dataset.py third_party/log.csv --out dataset --window 60 --stride 10
+    python dataset.py third_party/log.bin --out dataset --labels relabel --split-by session
+"""
+
+import os
+import json
+import shutil
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import relabel
+from handling_model import MODEL_FEATURES
+from lap_buffer import LABELS
+from resample import load_log, lap_bounds
+
+SPLITS = ('train', 'val', 'test')
+
+DEFAULT_WINDOW = 60  # ~1 s at 60fps
+DEFAULT_STRIDE = 10
+DEFAULT_HORIZON = 0  # Label of the window's last frame
+DEFAULT_FRACTIONS = (0.70, 0.15, 0.15)  # As analyze.py recommends
+
+META_FILE = 'meta.json'
+META_VERSION = 1
+
+
+# ------------------------------------
+# Samples
+
+def sample_starts(length, window, stride=1, horizon=0):
+    """First frame of every sample of a lap `length` frames long"""
+    return np.arange(0, max(length - window - horizon + 1, 0), stride, dtype=np.int64)
+
+
+def frame_windows(frames, window):
+    """Every window x channels window of a frames x channels array, indexed by its first frame (a view)"""
+    if len(frames) < window:
+        return np.empty((0, window) + frames.shape[1:], dtype=frames.dtype)
+    return np.moveaxis(sliding_window_view(frames, window, axis=0), -1, 1)
+
+
+def valid_starts(starts, valid, window):
+    """The starts whose window holds only valid (finite) frames"""
+    invalid = np.concatenate([[0], np.cumsum(~valid)])
+    return starts[invalid[starts + window] - invalid[starts] == 0]
+
+
+def session_ids(laps, sessions=None):
+    """Session of every frame: the logged id, or a new one wherever the lap number goes down"""
+    if sessions is not None:
+        return np.asarray(sessions)
+    laps = np.asarray(laps)
+    return np.concatenate([[0], np.cumsum(laps[1:] < laps[:-1])])
+
+
+def assign_splits(units, sizes, fractions, seed=0):
+    """
+    Split name per unit (lap or session id), in shuffled order filled by frame count
+    Every split with a non-zero fraction gets at least one unit while there are enough.
+    """
+    order = np.random.default_rng(seed).permutation(len(units))
+    total = float(sum(sizes))
+    bounds = np.cumsum(fractions) / sum(fractions)
+    assigned = {}
+    done = 0.0
+    for i in order:
+        middle = (done + sizes[i] / 2.0) / total
+        assigned[units[i]] = SPLITS[min(int(np.searchsorted(bounds, middle, side='right')), len(SPLITS) - 1)]
+        done += sizes[i]
+    # Small logs: make sure validation/test are not empty
+    for split, fraction in zip(SPLITS[1:], fractions[1:]):
+        if fraction > 0 and split not in assigned.values():
+            donors = [u for u in (units[i] for i in order) if assigned[u] == 'train']
+            if len(donors) > 1:
+                assigned[donors[-1]] = split
+    return assigned
+
+
+# ------------------------------------
+# Building
+
+def load_inputs(file_path, channels, labels='log'):
+    """(columns, label codes as float with NaN for unknown) of a log"""
+    wanted = list(channels)
+    if labels == 'relabel':
+        wanted += [name for name in relabel.INPUT_COLUMNS if name != 'Lap' and name not in wanted]
+    else:
+        wanted.append('Label')
+    columns = load_log(file_path, wanted)
+    missing = [name for name in channels if name not in columns]
+    if missing:
+        raise ValueError(f"log has no {', '.join(missing)} column(s)")
+    if labels == 'relabel':
+        codes, _ = relabel.relabel(columns)
+        return columns, codes.astype(np.float64)
+    return columns, np.asarray(columns['Label'], dtype=np.float64)
+
+
+def build_dataset(columns, codes, out, channels=MODEL_FEATURES, window=DEFAULT_WINDOW, stride=DEFAULT_STRIDE,
+                  horizon=DEFAULT_HORIZON, split_by='lap', fractions=DEFAULT_FRACTIONS, seed=0,
+                  label_source='log', dtype=np.float32):
+    """Write the dataset directory `out` (replaced atomically); returns its metadata"""
+    features = np.column_stack([np.asarray(columns[name], dtype=dtype) for name in channels])
+    valid = np.isfinite(features).all(axis=1)
+    sessions = session_ids(columns['Lap'], columns.get('Session'))
+    bounds = lap_bounds(columns['Lap'], sessions)
+
+    # Unit of every lap run, and the split it goes to
+    if split_by == 'session':
+        lap_units = [int(sessions[start]) for start, _ in bounds]
+    else:
+        lap_units = list(range(len(bounds)))
+    units = sorted(set(lap_units))
+    sizes = [sum(end - start for (start, end), u in zip(bounds, lap_units) if u == unit) for unit in units]
+    assigned = assign_splits(units, sizes, fractions, seed)
+
+    # Samples per lap: starts relative to the lap, label `horizon` frames after the window
+    per_split = {split: [] for split in SPLITS}
+    for (start, end), unit in zip(bounds, lap_units):
+        starts = sample_starts(end - start, window, stride, horizon)
+        starts = valid_starts(starts, valid[start:end], window)
+        targets = codes[start + starts + window - 1 + horizon]
+        keep = np.isfinite(targets)
+        per_split[assigned[unit]].append((start, end, starts[keep], targets[keep].astype(np.int8)))
+
+    tmp = out.rstrip(os.sep) + '.tmp'
+    if os.path.exists(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(tmp)
+    meta = {
+        'version': META_VERSION, 'channels': list(channels), 'labels': list(LABELS),
+        'window': window, 'stride': stride, 'horizon': horizon, 'dtype': np.dtype(dtype).name,
+        'label_source': label_source, 'split_by': split_by, 'seed': seed, 'splits': {},
+    }
+    for split, laps in per_split.items():
+        directory = os.path.join(tmp, split)
+        os.makedirs(directory)
+        n_frames = sum(end - start for start, end, _, _ in laps)
+        frames = np.lib.format.open_memmap(os.path.join(directory, 'frames.npy'), mode='w+',
+                                           dtype=dtype, shape=(n_frames, len(channels)))
+        offset = 0
+        all_starts, all_labels = [], []
+        for start, end, starts, targets in laps:
+            frames[offset:offset + end - start] = features[start:end]
+            all_starts.append(starts + offset)
+            all_labels.append(targets)
+            offset += end - start
+        frames.flush()
+        del frames
+        starts = np.concatenate(all_starts) if all_starts else np.zeros(0, dtype=np.int64)
+        labels = np.concatenate(all_labels) if all_labels else np.zeros(0, dtype=np.int8)
+        np.save(os.path.join(directory, 'starts.npy'), starts.astype(np.int64))
+        np.save(os.path.join(directory, 'labels.npy'), labels.astype(np.int8))
+        meta['splits'][split] = {
+            'laps': len(laps), 'frames': n_frames, 'samples': int(len(starts)),
+            'class_counts': np.bincount(labels, minlength=len(LABELS)).tolist(),
+        }
+
+    # Normalisation statistics of the training frames (not applied to the stored frames)
+    train_frames = np.load(os.path.join(tmp, 'train', 'frames.npy'), mmap_mode='r')
+    if len(train_frames):
+        meta['mean'] = np.asarray(train_frames.mean(axis=0, dtype=np.float64)).tolist()
+        meta['std'] = np.asarray(train_frames.std(axis=0, dtype=np.float64)).tolist()
+    del train_frames
+    with open(os.path.join(tmp, META_FILE), 'w') as file:
+        json.dump(meta, file, indent=1)
+
+    if os.path.exists(out):
+        old = out.rstrip(os.sep) + '.old'
+        if os.path.exists(old):
+            shutil.rmtree(old)
+        os.replace(out, old)
+        os.replace(tmp, out)
+        shutil.rmtree(old)
+    else:
+        os.replace(tmp, out)
+    return meta
+
+
+# ------------------------------------
+# Loading
+
+class SequenceShard:
+    """
+    One split of a dataset, memory-mapped read-only
+    shard[i] is (window x channels view, label); batch() copies only the requested samples.
+    """
+
+    def __init__(self, directory, meta):
+        self.directory = directory
+        self.window = meta['window']
+        self.channels = meta['channels']
+        self.frames = np.load(os.path.join(directory, 'frames.npy'), mmap_mode='r')
+        self.starts = np.load(os.path.join(directory, 'starts.npy'), mmap_mode='r')
+        self.labels = np.load(os.path.join(directory, 'labels.npy'), mmap_mode='r')
+        self._windows = None
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def windows(self):
+        """Every window of the frames, indexed by its first frame (a view of the memory map)"""
+        if self._windows is None:
+            self._windows = frame_windows(self.frames, self.window)
+        return self._windows
+
+    def __getitem__(self, i):
+        start = int(self.starts[i])
+        return self.frames[start:start + self.window], int(self.labels[i])
+
+    def batch(self, indices):
+        """(samples x window x channels array, labels) of the given sample indices"""
+        indices = np.asarray(indices)
+        return self.windows[self.starts[indices]], np.asarray(self.labels[indices])
+
+
+def load_dataset(path):
+    """(metadata, {split: SequenceShard}) of a dataset directory - O(1), nothing is read eagerly"""
+    with open(os.path.join(path, META_FILE)) as file:
+        meta = json.load(file)
+    if meta.get('version') != META_VERSION:
+        raise ValueError(f"unsupported dataset version {meta.get('version')} in {path}")
+    return meta, {split: SequenceShard(os.path.join(path, split), meta) for split in SPLITS}
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Build train/val/test sequence shards from a log")
+    parser.add_argument("file_path", nargs="?", default=os.path.join("third_party", "log.csv"),
+                        help="log.csv or binary log (.bin)")
+    parser.add_argument("--out", required=True, metavar="DIR", help="dataset directory (replaced)")
+    parser.add_argument("--channels", nargs="+", metavar="NAME", default=list(MODEL_FEATURES),
+                        help="input channels (default: the in-game model's features)")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help=f"frames per sample (default {DEFAULT_WINDOW})")
+    parser.add_argument("--stride", type=int, default=DEFAULT_STRIDE,
+                        help=f"frames between sample starts (default {DEFAULT_STRIDE})")
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON,
+                        help="label this many frames after the window's last frame (default 0)")
+    parser.add_argument("--labels", choices=["log", "relabel"], default="log",
+                        help="Label column as logged, or recomputed with relabel.py")
+    parser.add_argument("--split-by", choices=["lap", "session"], default="lap")
+    parser.add_argument("--fractions", type=float, nargs=3, metavar=("TRAIN", "VAL", "TEST"),
+                        default=list(DEFAULT_FRACTIONS))
+    parser.add_argument("--seed", type=int, default=0, help="shuffle of the laps/sessions before splitting")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        columns, codes = load_inputs(args.file_path, args.channels, args.labels)
+    except ValueError as e:
+        print(f"❌ {e}")
+        raise SystemExit(1)
+    meta = build_dataset(columns, codes, args.out, args.channels, args.window, args.stride, args.horizon,
+                         args.split_by, args.fractions, args.seed, args.labels)
+    print(f"Built {args.out} in {time.perf_counter() - start:.2f} s "
+          f"({args.window}-frame windows, stride {args.stride}, horizon {args.horizon}, "
+          f"labels: {args.labels}, split by {args.split_by})")
+    for split, info in meta['splits'].items():
+        counts = ', '.join(f"{label} {n:,}" for label, n in zip(LABELS, info['class_counts']))
+        print(f"  {split:<6}{info['laps']:>4} laps {info['frames']:>11,} frames {info['samples']:>10,} samples  ({counts})")
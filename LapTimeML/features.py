@@ -0,0 +1,136 @@
+"""
+Rolling features of the telemetry stream
+
+One FeatureEngine replaces the per-signal history deques of log_frame.
+The last `window` frames are kept in a preallocated ring of row slots
+(push() stores the frame's values tuple, nothing is copied or shifted),
+next to running sums, so each frame is a fixed number of updates
+whatever the window length:
+
+    change    newest - oldest value of a full window (the labeler's rate terms)
+    rate      per-second derivative between the last two frames
+    mean/std  rolling mean and standard deviation over the window
+    ema       exponential moving average (EMA_FRAMES span)
+
+The logger feeds every frame through push() and resets the engine at each
+lap, so the labeler sees the same window the deques held. Standard
+library only (runs inside Assetto Corsa).
+"""
+
+from math import sqrt
+
+from labeling import HISTORY_SIZE
+
+# Tracked signals, in push() order
+SIGNALS = ("YawRate", "LateralAccel", "SteerAngle", "Speed", "SlipDiff")
+YAW_RATE, LAT_ACCEL, STEER, SPEED, SLIP_DIFF = range(len(SIGNALS))
+
+# Logged features, in row() order (lap_buffer.CHANNELS)
+FEATURES = ("YawAccel", "SteerRate", "LatJerk", "SlipDiffEMA", "YawRateStd")
+
+EMA_FRAMES = 15  # EMA span (~0.25 s at 60fps)
+DEFAULT_DT = 1 / 60.0  # Seconds between frames until two timestamps are known
+
+
+class FeatureEngine:
+    def __init__(self, window=HISTORY_SIZE, signals=len(SIGNALS), ema_frames=EMA_FRAMES):
+        self.window = window
+        self.signals = signals
+        self.alpha = 2.0 / (ema_frames + 1)
+        self.ring = [None] * window  # Values tuple of each frame in the window
+        self.reset()
+
+    def reset(self):
+        """Empty the window (new lap)"""
+        signals = self.signals
+        self.sums = [0.0] * signals
+        self.square_sums = [0.0] * signals
+        self.emas = [0.0] * signals
+        self.rates = [0.0] * signals
+        self.head = self.window - 1  # Slot of the newest frame
+        self.count = 0
+        self.last_time = None
+        self.dt = DEFAULT_DT
+
+    def push(self, values, current_time):
+        """
+        Add one frame: values holds one number per signal (SIGNALS order),
+        current_time is the lap time in ms (for the per-second rates)
+        The tuple is kept by reference, so it must not be modified afterwards.
+        """
+        ring = self.ring
+        head = self.head + 1 if self.head + 1 < self.window else 0
+        previous = ring[self.head] if self.count else None
+        old = ring[head] if self.count >= self.window else None  # Frame leaving the window
+
+        if self.last_time is not None and current_time > self.last_time:
+            self.dt = (current_time - self.last_time) / 1000.0
+        inv_dt = 1.0 / self.dt
+        alpha = self.alpha
+        sums = self.sums
+        square_sums = self.square_sums
+        emas = self.emas
+        rates = self.rates
+
+        if old is not None:
+            for i, value in enumerate(values):
+                leaving = old[i]
+                sums[i] += value - leaving
+                square_sums[i] += value * value - leaving * leaving
+                rates[i] = (value - previous[i]) * inv_dt
+                emas[i] += alpha * (value - emas[i])
+        elif previous is not None:
+            for i, value in enumerate(values):
+                sums[i] += value
+                square_sums[i] += value * value
+                rates[i] = (value - previous[i]) * inv_dt
+                emas[i] += alpha * (value - emas[i])
+        else:
+            for i, value in enumerate(values):
+                sums[i] += value
+                square_sums[i] += value * value
+                emas[i] = value
+        if old is None:
+            self.count += 1
+
+        ring[head] = values
+        self.head = head
+        self.last_time = current_time
+
+    def __len__(self):
+        return self.count
+
+    def full(self):
+        return self.count >= self.window
+
+    def change(self, signal):
+        """Newest - oldest value of the window, None until it holds `window` frames"""
+        if self.count < self.window:
+            return None
+        oldest = self.head + 1 if self.head + 1 < self.window else 0
+        return self.ring[self.head][signal] - self.ring[oldest][signal]
+
+    def rate(self, signal):
+        return self.rates[signal]
+
+    def mean(self, signal):
+        return self.sums[signal] / self.count if self.count else 0.0
+
+    def variance(self, signal):
+        if not self.count:
+            return 0.0
+        mean = self.sums[signal] / self.count
+        # Running sums can leave a tiny negative rounding residue
+        return max(self.square_sums[signal] / self.count - mean * mean, 0.0)
+
+    def std(self, signal):
+        return sqrt(self.variance(signal))
+
+    def ema(self, signal):
+        return self.emas[signal]
+
+    def row(self):
+        """Logged features in FEATURES order"""
+        rates = self.rates
+        return (rates[YAW_RATE], rates[STEER], rates[LAT_ACCEL],
+                self.emas[SLIP_DIFF], self.std(YAW_RATE))
@@ -0,0 +1,130 @@
+"""
+Per-phase frame timing for the logger
+
+acUpdate marks the end of each phase it runs; the time since the previous
+mark is charged to that phase. end_frame() files the frame's phase times
+and total into fixed-size log-scale histograms, so memory stays constant
+however long the session runs, and checks the total against the budget.
+
+Everything is skipped by the caller when timing is disabled
+(`if frame_timer is not None:`), so the disabled cost is one check per mark.
+"""
+
+import math
+import time
+
+clock = time.perf_counter
+
+# Histogram bins: BINS_PER_OCTAVE per doubling, from MIN_SECONDS up
+BINS_PER_OCTAVE = 4
+MIN_SECONDS = 1e-6
+BIN_COUNT = 24 * BINS_PER_OCTAVE  # 1 us .. ~16 s
+
+
+def _bin(seconds):
+    if seconds <= MIN_SECONDS:
+        return 0
+    index = int(math.log(seconds / MIN_SECONDS, 2) * BINS_PER_OCTAVE) + 1
+    return index if index < BIN_COUNT else BIN_COUNT - 1
+
+
+def _bin_upper(index):
+    return MIN_SECONDS * 2 ** (index / float(BINS_PER_OCTAVE))
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * BIN_COUNT
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.counts[_bin(seconds)] += 1
+        self.count += 1
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, q):
+        """Upper edge of the bin holding the q-th percentile (capped at the exact max)"""
+        if not self.count:
+            return 0.0
+        target = q / 100.0 * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if n and seen >= target:
+                return min(_bin_upper(index), self.max)
+        return self.max
+
+    def summary(self):
+        """(p50, p99, max) in milliseconds"""
+        return self.percentile(50) * 1000, self.percentile(99) * 1000, self.max * 1000
+
+
+class FrameTimer:
+    def __init__(self, phases, budget_ms=1.0, warn_interval=10.0, log_fn=None):
+        """
+        phases:         phase names; mark() takes their index
+        budget_ms:      frame total above this counts as an overrun
+        warn_interval:  minimum seconds between overrun log messages
+        """
+        self.phases = tuple(phases)
+        self.budget = budget_ms / 1000.0
+        self.warn_interval = warn_interval
+        self.log_fn = log_fn
+        self.histograms = [Histogram() for _ in self.phases]
+        self.total = Histogram()
+        self.overruns = 0
+        self._frame = [0.0] * len(self.phases)
+        self._start = self._last = clock()
+        self._last_warning = None
+
+    def start(self):
+        self._start = self._last = clock()
+
+    def mark(self, phase):
+        now = clock()
+        self._frame[phase] += now - self._last
+        self._last = now
+
+    def end_frame(self):
+        total = self._last - self._start
+        frame = self._frame
+        for phase, seconds in enumerate(frame):
+            if seconds:
+                self.histograms[phase].add(seconds)
+                frame[phase] = 0.0
+        self.total.add(total)
+        if total > self.budget:
+            self.overruns += 1
+            self._warn(total)
+
+    def record(self, phase, seconds):
+        """Time spent outside acUpdate (e.g. on the writer thread)"""
+        self.histograms[phase].add(seconds)
+
+    def _warn(self, total):
+        now = self._last
+        if self.log_fn is None or (self._last_warning is not None and now - self._last_warning < self.warn_interval):
+            return
+        self._last_warning = now
+        self.log_fn("Logger frame took {:.2f} ms (budget {:.2f} ms, {} overruns so far)".format(
+            total * 1000, self.budget * 1000, self.overruns))
+
+    def window_text(self):
+        p50, p99, worst = self.total.summary()
+        text = "Logger: {:.2f}/{:.2f}/{:.2f} ms (p50/p99/max)".format(p50, p99, worst)
+        if self.overruns:
+            text += " ⚠️ {} over".format(self.overruns)
+        return text
+
+    def report(self):
+        """Summary lines for the session log"""
+        lines = ["Frame time over {} frames, budget {:.2f} ms, {} overruns ({:.1f}%)".format(
+            self.total.count, self.budget * 1000, self.overruns,
+            100.0 * self.overruns / self.total.count if self.total.count else 0.0)]
+        for name, histogram in zip(("total",) + self.phases, [self.total] + self.histograms):
+            if histogram.count:
+                lines.append("  {:<8} p50 {:.3f} ms  p99 {:.3f} ms  max {:.3f} ms  (n={})".format(
+                    name, *(histogram.summary() + (histogram.count,))))
+        return lines
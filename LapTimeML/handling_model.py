@@ -0,0 +1,288 @@
+"""
+Streaming handling classifier (in-game inference)
+
+Runs a small trained model (train_model.py) next to the rule-based labeler.
+The model is an MLP over the last `window` frames of MODEL_FEATURES:
+standardised inputs -> ReLU hidden layer -> softmax over LABELS.
+
+StreamingClassifier keeps the window in one preallocated array. Every frame
+is written twice, `window` slots apart, so the last `window` frames are
+always one contiguous slice (no reordering before the matrix product).
+log_frame pushes each frame (O(features)); acUpdate calls update().
+
+The budget holds for every single update call, not just on average: a
+prediction is split into steps of a few hidden units (the output layer is
+the last step), and each update runs only as many steps as fit in the
+budget. A slow model therefore predicts every few frames instead of
+stalling one. The cost per step is measured when the classifier is created
+and tracked while it runs; a model whose smallest step (one hidden unit)
+does not fit is refused or switched off. Updates that still go over the
+budget (e.g. the OS preempting the game thread) are counted and logged.
+Update times go into a frame_timer.Histogram.
+
+Model file (little-endian; float32 unless noted):
+    magic "ACMDL001", window, features, hidden, classes (uint32)
+    feature names: byte length (uint32) + ';'-joined UTF-8
+    mean[features], scale[features]                input standardisation
+    w1[hidden][window * features], b1[hidden]      oldest frame first
+    w2[classes][hidden], b2[classes]               logits in LABELS order
+
+Standard library only (runs inside Assetto Corsa).
+"""
+
+import os
+import math
+import struct
+import time
+from array import array
+from operator import mul
+
+from frame_timer import Histogram
+from lap_buffer import LABELS
+
+# Per-frame model inputs, by log column name (features.FEATURES included)
+MODEL_FEATURES = ("YawRate", "LateralAccel", "SteerAngle", "Speed", "SlipDiff",
+                  "YawAccel", "SteerRate", "LatJerk", "SlipDiffEMA", "YawRateStd")
+
+MAGIC = b"ACMDL001"
+_HEADER = struct.Struct("<8s4I")
+_LENGTH = struct.Struct("<I")
+
+CALIBRATION_RUNS = 5  # Full predictions timed at start-up (the median sets the initial step size)
+COST_SMOOTHING = 0.1  # EMA weight of the newest update in the cost estimate
+WARMUP_PREDICTIONS = 10  # Predictions before a model can be switched off (first runs are slow)
+BUDGET_MARGIN = 0.8  # Share of the budget the steps are sized for (headroom for jitter)
+
+clock = time.perf_counter
+
+
+def _floats(data, offset, count):
+    values = array("f")
+    values.frombytes(data[offset:offset + 4 * count])
+    if len(values) != count:
+        raise ValueError("model file is truncated")
+    return values.tolist(), offset + 4 * count
+
+
+class HandlingModel:
+    def __init__(self, window, feature_names, mean, scale, w1, b1, w2, b2):
+        """w1/w2: lists of weight rows; everything else flat lists of floats"""
+        self.window = window
+        self.feature_names = tuple(feature_names)
+        self.mean = mean
+        self.scale = scale
+        self.w1 = w1
+        self.b1 = b1
+        self.w2 = w2
+        self.b2 = b2
+
+    @property
+    def features(self):
+        return len(self.feature_names)
+
+    def predict(self, x):
+        """(class index, probability) for one flattened, standardised window"""
+        hidden = [max(sum(map(mul, row, x)) + bias, 0.0) for row, bias in zip(self.w1, self.b1)]
+        logits = [sum(map(mul, row, hidden)) + bias for row, bias in zip(self.w2, self.b2)]
+        best = max(range(len(logits)), key=logits.__getitem__)
+        top = logits[best]
+        return best, 1.0 / sum(math.exp(logit - top) for logit in logits)
+
+    def save(self, path):
+        names = ";".join(self.feature_names).encode("utf-8")
+        parts = [_HEADER.pack(MAGIC, self.window, self.features, len(self.b1), len(self.b2)),
+                 _LENGTH.pack(len(names)), names]
+        for values in [self.mean, self.scale] + list(self.w1) + [self.b1] + list(self.w2) + [self.b2]:
+            parts.append(array("f", values).tobytes())
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as file:
+            file.write(b"".join(parts))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """The model in path, or None if the file is missing or not a model file"""
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            magic, window, features, hidden, classes = _HEADER.unpack_from(data, 0)
+            if magic != MAGIC or classes != len(LABELS):
+                return None
+            offset = _HEADER.size
+            length, = _LENGTH.unpack_from(data, offset)
+            offset += _LENGTH.size
+            names = data[offset:offset + length].decode("utf-8").split(";")
+            offset += length
+            if len(names) != features:
+                return None
+            mean, offset = _floats(data, offset, features)
+            scale, offset = _floats(data, offset, features)
+            w1 = []
+            for _ in range(hidden):
+                row, offset = _floats(data, offset, window * features)
+                w1.append(row)
+            b1, offset = _floats(data, offset, hidden)
+            w2 = []
+            for _ in range(classes):
+                row, offset = _floats(data, offset, hidden)
+                w2.append(row)
+            b2, offset = _floats(data, offset, classes)
+        except (OSError, ValueError, struct.error, UnicodeDecodeError):
+            return None
+        return cls(window, names, mean, scale, w1, b1, w2, b2)
+
+
+class StreamingClassifier:
+    def __init__(self, model, budget_ms=0.5, log_fn=None, warn_interval=10.0):
+        """
+        budget_ms:      inference time allowed in any one acUpdate call
+        warn_interval:  minimum seconds between over-budget log messages
+        """
+        self.model = model
+        self.budget = budget_ms / 1000.0
+        self.log_fn = log_fn
+        self.warn_interval = warn_interval
+        self.width = model.window * model.features
+        self.units = len(model.b1) + 1  # Steps of a prediction: one per hidden unit, then the output layer
+        self.buffer = array("d", [0.0]) * (2 * self.width)
+        self.inv_scale = [1.0 / s if s else 1.0 for s in model.scale]
+        self.latency = Histogram()  # Inference time per update call
+        self.enabled = True
+        self.predictions = 0
+        self.overruns = 0  # Updates over the budget
+        self.agreed = 0  # Predictions equal to the rule-based label
+        self.label = None  # Latest prediction (LABELS index) and its probability
+        self.confidence = 0.0
+        self._last_warning = None
+        self.unit_cost = self.calibrate()  # Smoothed seconds per step
+        self.units_per_update = self._units_per_update()
+        if self.unit_cost > self.budget:
+            self._disable("one hidden unit takes {:.3f} ms".format(self.unit_cost * 1000))
+        self.reset()
+
+    def calibrate(self, runs=CALIBRATION_RUNS):
+        """Median seconds per step over a few full predictions"""
+        x = [0.0] * self.width
+        times = []
+        for _ in range(runs):
+            started = clock()
+            self.model.predict(x)
+            times.append(clock() - started)
+        return sorted(times)[len(times) // 2] / self.units
+
+    def _units_per_update(self):
+        return max(1, int(self.budget * BUDGET_MARGIN / self.unit_cost)) if self.unit_cost > 0 else self.units
+
+    def reset(self):
+        """Empty the window and drop any half-done prediction (new lap, like the feature engine)"""
+        self.slot = 0  # Ring position of the next frame (= oldest frame once the window is full)
+        self.count = 0
+        self.pending = None  # Window snapshot of the prediction in progress
+        self.hidden = []
+        self.pending_label = None
+
+    def push(self, row):
+        """Store one frame's MODEL_FEATURES values (standardised on the way in)"""
+        features = self.model.features
+        slot = self.slot
+        buffer = self.buffer
+        start = slot * features
+        other = start + self.width
+        for i, (value, mean, inv_scale) in enumerate(zip(row, self.model.mean, self.inv_scale)):
+            value = (value - mean) * inv_scale
+            buffer[start + i] = value
+            buffer[other + i] = value
+        self.slot = slot + 1 if slot + 1 < self.model.window else 0
+        if self.count < self.model.window:
+            self.count += 1
+
+    @property
+    def steps(self):
+        """Update calls per prediction at the current step size"""
+        return -(-self.units // self.units_per_update)
+
+    def update(self, rule_label=None):
+        """
+        Run the next steps of the current prediction, starting one from the
+        current window if none is in progress
+        rule_label: the rule-based label name of the same frame (agreement stats)
+        Returns True if a prediction completed; label/confidence hold the latest result.
+        """
+        if not self.enabled or self.count < self.model.window:
+            return False
+
+        started = clock()
+        model = self.model
+        if self.pending is None:
+            start = self.slot * model.features  # Oldest frame of the window
+            self.pending = self.buffer[start:start + self.width]
+            self.hidden = []
+            self.pending_label = rule_label
+        x = self.pending
+        hidden = self.hidden
+        units = self.units_per_update
+        done = False
+        first = len(hidden)
+        for row, bias in zip(model.w1[first:first + units], model.b1[first:first + units]):
+            hidden.append(max(sum(map(mul, row, x)) + bias, 0.0))
+        steps = len(hidden) - first
+        if steps < units and len(hidden) == len(model.b1):
+            logits = [sum(map(mul, row, hidden)) + bias for row, bias in zip(model.w2, model.b2)]
+            best = max(range(len(logits)), key=logits.__getitem__)
+            top = logits[best]
+            self.label, self.confidence = best, 1.0 / sum(math.exp(logit - top) for logit in logits)
+            steps += 1
+            done = True
+        elapsed = clock() - started
+
+        self.latency.add(elapsed)
+        # A preempted update moves the estimate by at most COST_SMOOTHING; a lasting slowdown still catches up
+        self.unit_cost += COST_SMOOTHING * (min(elapsed / steps, 2 * self.unit_cost) - self.unit_cost)
+        self.units_per_update = self._units_per_update()
+        if elapsed > self.budget:
+            self.overruns += 1
+            self._warn(elapsed)
+        if done:
+            self.predictions += 1
+            if self.pending_label is not None and LABELS[self.label] == self.pending_label:
+                self.agreed += 1
+            self.pending = None
+        if self.unit_cost > self.budget and self.predictions >= WARMUP_PREDICTIONS:
+            self._disable("{:.3f} ms per hidden unit".format(self.unit_cost * 1000))
+        return done
+
+    def _warn(self, elapsed):
+        now = clock()
+        if self.log_fn is None or (self._last_warning is not None and now - self._last_warning < self.warn_interval):
+            return
+        self._last_warning = now
+        self.log_fn("Handling model update took {:.3f} ms (budget {:.3f} ms, {} overruns so far)".format(
+            elapsed * 1000, self.budget * 1000, self.overruns))
+
+    def _disable(self, reason):
+        self.enabled = False
+        if self.log_fn is not None:
+            self.log_fn("Handling model disabled: {}, budget {:.3f} ms per frame".format(reason, self.budget * 1000))
+
+    def status_text(self):
+        """One line for the app window"""
+        if not self.enabled:
+            return "🧠 Model: off (over budget)"
+        if self.label is None:
+            return "🧠 Model: warming up"
+        p50, p99, _ = self.latency.summary()
+        return "🧠 Model: {} {:.0f}% | {:.2f}/{:.2f} ms 1/{}".format(
+            LABELS[self.label], self.confidence * 100, p50, p99, self.steps)
+
+    def report(self):
+        """Summary lines for the session log"""
+        runs = self.predictions
+        lines = ["Handling model: {} predictions, one per {} frames at the end{}".format(
+            runs, self.steps, "" if self.enabled else " (disabled: over budget)")]
+        if self.latency.count:
+            lines.append("  per update p50 {:.3f} ms  p99 {:.3f} ms  max {:.3f} ms, budget {:.3f} ms, "
+                         "{} overruns".format(*(self.latency.summary() + (self.budget * 1000, self.overruns))))
+        if runs:
+            lines.append("  agrees with the rule-based label on {:.1f}% of predictions".format(
+                100.0 * self.agreed / runs))
+        return lines
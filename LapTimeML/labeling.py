@@ -0,0 +1,84 @@
+"""
+Handling labels (Neutral / Understeer / Oversteer) for one telemetry frame
+
+Used by LapTimeML.py for every logged frame, and by relabel.py as the
+reference for the vectorized offline re-labeler. Standard library only.
+"""
+
+# Frames of history for the rate-of-change terms (~0.08 seconds at 60fps)
+HISTORY_SIZE = 5
+
+
+def calculate_label_improved(yaw_rate, lat_accel, steer_angle, speed, slip_diff,
+                             yaw_change, lat_accel_change, speed_change):
+    """
+    PROPER implementation of Bergman's (1966) definition
+    The changes are newest - oldest value over the last HISTORY_SIZE frames
+    of the current lap (features.FeatureEngine.change), None while fewer
+    frames exist. Returns (label name, label code, yaw gradient).
+    """
+    
+    # STRICTER minimum speed threshold - low speed handling is unreliable
+    if speed < 50:  # Below 50 km/h (~30 mph), can't judge handling reliably
+        return "Neutral", 0, 0.0
+    
+    # Need enough history to calculate rate of change
+    if yaw_change is None or lat_accel_change is None:
+        return "Neutral", 0, 0.0
+    
+    # === FILTER OUT LOSS OF CONTROL (SPINNING/CRASHING) ===
+    if speed_change is None:
+        speed_change = 0
+    
+    if abs(yaw_rate) > 1.0:  # Spinning out
+        return "Neutral", 0, 0.0
+    if speed_change < -15:  # Crash/major deceleration
+        return "Neutral", 0, 0.0
+    
+    # Avoid division by zero
+    if abs(lat_accel_change) < 0.01:
+        if abs(lat_accel) < 0.3:
+            return "Neutral", 0, 0.0
+        if slip_diff > 0.15:
+            return "Oversteer", 2, 0.0
+        elif slip_diff < -0.15:
+            return "Understeer", 1, 0.0
+        else:
+            return "Neutral", 0, 0.0
+    
+    yaw_gradient = yaw_change / lat_accel_change
+    
+    # Calculate expected yaw - BUT scale by speed (more lenient at medium speeds)
+    steer_magnitude = abs(steer_angle)
+    
+    # Speed factor: less strict at medium speeds
+    if speed < 80:  # 50-80 km/h: very lenient
+        speed_factor = 0.3
+    elif speed < 120:  # 80-120 km/h: moderate
+        speed_factor = 0.5
+    else:  # >120 km/h: full strictness
+        speed_factor = 0.7
+        
+    expected_yaw_magnitude = steer_magnitude * (speed / 100.0) * speed_factor
+    actual_yaw_magnitude = abs(yaw_rate)
+    
+    if expected_yaw_magnitude > 0.05:
+        yaw_response_ratio = actual_yaw_magnitude / expected_yaw_magnitude
+        
+        # STRICTER thresholds to reduce false positives
+        if yaw_response_ratio > 1.5 or yaw_gradient > 1.0:  # Was 1.3/0.8
+            if slip_diff > 0.10:  # Was 0.08
+                return "Oversteer", 2, yaw_gradient
+        
+        elif yaw_response_ratio < 0.6 or yaw_gradient < 0.15:  # Was 0.7/0.2
+            if slip_diff < -0.10:  # Was -0.08
+                return "Understeer", 1, yaw_gradient
+    
+    # Active cornering check - only at higher speeds
+    if abs(lat_accel) > 0.5 and speed > 80:
+        if slip_diff > 0.25:  # Was 0.20
+            return "Oversteer", 2, yaw_gradient
+        elif slip_diff < -0.25:  # Was -0.20
+            return "Understeer", 1, yaw_gradient
+    
+    return "Neutral", 0, yaw_gradient
@@ -0,0 +1,72 @@
+"""
+Compact per-lap telemetry buffer
+
+One preallocated, typed array per channel instead of a Python list per
+frame. Columns grow in whole chunks and are reused across laps, so the
+steady-state cost of logging a frame is a handful of in-place stores.
+"""
+
+from array import array
+from itertools import islice
+
+LABELS = ("Neutral", "Understeer", "Oversteer")
+
+# Logged channels in log.csv order (after Lap, CarModel, Track)
+# 'd' = double, 'i' = int, 'b' = label code (index into LABELS),
+# 'h' = corner index (corners.py, -1 between corners)
+# YawAccel .. YawRateStd are the rolling features of features.FeatureEngine
+CHANNELS = (
+    ("TrackPos", "d"), ("Corner", "h"), ("CurrentTime", "i"),
+    ("YawRate", "d"), ("LateralAccel", "d"), ("LongitudinalAccel", "d"), ("VerticalAccel", "d"),
+    ("SteerAngle", "d"), ("Speed", "d"), ("LocalVelX", "d"), ("LocalVelY", "d"), ("LocalVelZ", "d"),
+    ("WheelSlipFL", "d"), ("WheelSlipFR", "d"), ("WheelSlipRL", "d"), ("WheelSlipRR", "d"),
+    ("Throttle", "d"), ("Brake", "d"), ("Gear", "i"),
+    ("SurfaceGrip", "d"), ("RoadTemp", "d"), ("AirTemp", "d"),
+    ("Heading", "d"), ("Pitch", "d"), ("Roll", "d"),
+    ("CarX", "d"), ("CarY", "d"), ("CarZ", "d"),
+    ("SlipDiff", "d"), ("YawGradient", "d"),
+    ("YawAccel", "d"), ("SteerRate", "d"), ("LatJerk", "d"), ("SlipDiffEMA", "d"), ("YawRateStd", "d"),
+    ("Label", "b"),
+)
+
+CHANNEL_INDEX = dict((name, i) for i, (name, _) in enumerate(CHANNELS))
+
+
+class LapBuffer:
+    def __init__(self, chunk_size=4096):
+        self.chunk_size = chunk_size
+        self.columns = [array(typecode, [0]) * chunk_size for _, typecode in CHANNELS]
+        self.capacity = chunk_size
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def __bool__(self):
+        return self.length > 0
+
+    def append(self, row):
+        """Store one frame; row holds one value per channel in CHANNELS order"""
+        n = self.length
+        if n == self.capacity:
+            self._grow()
+        for column, value in zip(self.columns, row):
+            column[n] = value
+        self.length = n + 1
+
+    def column(self, name):
+        """Filled part of a single channel as a zero-copy memoryview"""
+        return memoryview(self.columns[CHANNEL_INDEX[name]])[:self.length]
+
+    def rows(self):
+        """Iterate stored frames as tuples (CHANNELS order)"""
+        return islice(zip(*self.columns), self.length)
+
+    def reset(self):
+        """Forget stored frames but keep the allocated columns"""
+        self.length = 0
+
+    def _grow(self):
+        for column, (_, typecode) in zip(self.columns, CHANNELS):
+            column.extend(array(typecode, [0]) * self.chunk_size)
+        self.capacity += self.chunk_size
@@ -0,0 +1,129 @@
+"""
+Live delta to a reference lap
+
+The reference is a lookup table over normalizedCarPosition: the lap is cut
+into `points` equal slices and the table holds the lap time (ms) at which
+the reference lap reached each slice boundary. The delta for a frame is
+then one index computation, two table reads and a linear interpolation.
+
+While a lap is driven, LapTrace keeps the first frame that entered each
+slice - O(1) per frame in fixed memory. If the finished lap is a new best,
+build_reference() turns its trace into the lookup table; the logger runs
+that off the game thread. Tables are saved per car/track as a small flat
+file (header + int32 times) and loaded again next session.
+"""
+
+import os
+import re
+import struct
+from array import array
+
+REFERENCE_POINTS = 1000  # Table slices (~5 m on a 5 km track)
+MIN_COVERAGE = 0.9  # Fraction of slices a lap must have visited to become the reference
+
+MAGIC = b"ACREF001"
+_HEADER = struct.Struct("<8sIi")  # magic, points, lap time (ms)
+
+
+class LapTrace:
+    def __init__(self, points=REFERENCE_POINTS):
+        self.points = points
+        self.positions = array("d", [-1.0]) * points
+        self.times = array("d", [0.0]) * points
+        self.furthest = -1  # Furthest slice reached this lap
+        self.filled = 0
+
+    def add(self, pos, current_time):
+        """
+        Record a frame; returns True if it lies within the lap's progress so far
+        Frames still before the line at the start of a lap, or already past it
+        at the end, are far from the furthest slice and are ignored.
+        """
+        points = self.points
+        slice_ = int(pos * points)
+        if not 0 <= slice_ < points:
+            return False
+        furthest = self.furthest
+        if slice_ > furthest:
+            if slice_ - furthest > points // 2:
+                return False
+            self.furthest = slice_
+            if self.positions[slice_] < 0:
+                self.positions[slice_] = pos
+                self.times[slice_] = current_time
+                self.filled += 1
+            return True
+        return furthest - slice_ < points // 2
+
+    def coverage(self):
+        return self.filled / float(self.points)
+
+
+class ReferenceLap:
+    def __init__(self, times, lap_time):
+        """times: array('i') of points + 1 boundary times in ms; lap_time in ms"""
+        self.times = times
+        self.points = len(times) - 1
+        self.lap_time = lap_time
+
+    def delta(self, pos, current_time):
+        """Seconds behind (+) or ahead (-) of the reference at pos, None off the table"""
+        x = pos * self.points
+        slice_ = int(x)
+        if not 0 <= slice_ < self.points:
+            return None
+        times = self.times
+        start = times[slice_]
+        return (current_time - start - (times[slice_ + 1] - start) * (x - slice_)) / 1000.0
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as file:
+            file.write(_HEADER.pack(MAGIC, self.points, self.lap_time))
+            file.write(self.times.tobytes())
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path):
+        """The saved reference, or None if there is none (or it is unreadable)"""
+        try:
+            with open(path, "rb") as file:
+                magic, points, lap_time = _HEADER.unpack(file.read(_HEADER.size))
+                times = array("i")
+                times.frombytes(file.read())
+        except (OSError, struct.error):
+            return None
+        if magic != MAGIC or len(times) != points + 1:
+            return None
+        return cls(times, lap_time)
+
+
+def build_reference(trace, lap_time):
+    """ReferenceLap from a finished lap's trace: boundary times interpolated between visited slices"""
+    points = trace.points
+    # Known (position, time) pairs from the line (0, 0) to the line again (1, lap_time)
+    known = [(0.0, 0.0)]
+    for slice_ in range(points):
+        pos = trace.positions[slice_]
+        if pos >= 0 and pos > known[-1][0]:
+            known.append((pos, trace.times[slice_]))
+    known.append((1.0, float(lap_time)))
+
+    times = array("i", [0]) * (points + 1)
+    k = 0
+    for boundary in range(points + 1):
+        x = boundary / float(points)
+        while k < len(known) - 2 and known[k + 1][0] < x:
+            k += 1
+        (x0, t0), (x1, t1) = known[k], known[k + 1]
+        times[boundary] = int(round(t0 + (t1 - t0) * (x - x0) / (x1 - x0))) if x1 > x0 else int(t0)
+    return ReferenceLap(times, int(lap_time))
+
+
+def reference_path(directory, car_model, track_name):
+    """File of the car/track combination's reference lap"""
+    name = "{}__{}".format(car_model or "unknown", track_name or "unknown")
+    return os.path.join(directory, re.sub(r"[^A-Za-z0-9_.-]", "_", name) + ".ref")
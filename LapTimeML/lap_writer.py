@@ -0,0 +1,69 @@
+"""
+Background lap writer
+
+Finished laps are handed over from acUpdate with a single enqueue and
+written to disk on a separate thread, so the game thread never pays for
+CSV formatting or file I/O at the lap line.
+"""
+
+import threading
+import queue
+
+# Stop marker pushed by close()
+_STOP = object()
+
+
+class LapWriter(threading.Thread):
+    def __init__(self, write_fn, max_pending=8, log_fn=None, name="LapWriter", drop_when_full=False):
+        """
+        write_fn:       called on the writer thread with the submitted arguments
+        max_pending:    bound of the hand-over queue (laps, not rows)
+        log_fn:         optional logger for errors, e.g. ac.log
+        name:           thread name, also used in log messages
+        drop_when_full: drop work submitted while the queue is full instead of blocking the caller
+        """
+        threading.Thread.__init__(self, name=name)
+        self.daemon = True
+        self._write_fn = write_fn
+        self._log_fn = log_fn
+        self._drop_when_full = drop_when_full
+        self._queue = queue.Queue(maxsize=max_pending)
+
+    def submit(self, *args):
+        """Queue one unit of work - O(1) regardless of lap length"""
+        try:
+            self._queue.put_nowait(args)
+        except queue.Full:
+            if self._drop_when_full:
+                self._log("{} queue full, dropping task".format(self.name))
+                return
+            # Disk is far behind; block rather than drop a lap
+            self._log("{} queue full, waiting for disk".format(self.name))
+            self._queue.put(args)
+
+    def run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                self._write_fn(*item)
+            except Exception as e:
+                self._log("{} failed: {}".format(self.name, e))
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until everything queued so far has been written"""
+        if self.is_alive():
+            self._queue.join()
+
+    def close(self, timeout=10.0):
+        """Write all pending laps and stop the thread"""
+        if self.is_alive():
+            self._queue.put(_STOP)
+            self.join(timeout)
+
+    def _log(self, message):
+        if self._log_fn is not None:
+            self._log_fn(message)
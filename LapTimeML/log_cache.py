@@ -0,0 +1,156 @@
+"""
+Parsed-log cache for the analysis tools
+
+Parsing a large log.csv dominates every analysis run. The first run writes
+the parsed, typed columns next to the log (log.csv.cache/), one raw
+binary file per column plus meta.json. Later runs memory-map those files
+instead of re-parsing.
+
+The cache is keyed on the log's absolute path, size and mtime plus
+SCHEMA_VERSION; any mismatch means the log changed (or the cache layout
+did) and the cache is rebuilt.
+"""
+
+import os
+import json
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Bump whenever the cache layout or the column normalisation changes
+SCHEMA_VERSION = 2
+
+# Columns stored as int64 / dictionary-encoded strings; all others are float64
+INT_COLUMNS = {'Lap', 'Corner', 'CurrentTime', 'Gear'}
+STRING_COLUMNS = {'CarModel', 'Track', 'Label'}
+
+META_FILE = 'meta.json'
+
+
+def cache_dir(log_path):
+    return log_path + '.cache'
+
+
+def file_key(log_path):
+    """Identity of the log file the cache was built from"""
+    stat = os.stat(log_path)
+    return {'path': os.path.abspath(log_path), 'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns, 'schema': SCHEMA_VERSION}
+
+
+def _column_file(directory, name):
+    return os.path.join(directory, name + '.bin')
+
+
+class CachedLog:
+    """Read side: typed columns memory-mapped from a valid cache"""
+
+    def __init__(self, directory, meta):
+        self.directory = directory
+        self.rows = meta['rows']
+        self.columns = meta['columns']
+        self._dtypes = meta['dtypes']
+        self._categories = meta['categories']
+
+    def column(self, name, start=0, stop=None):
+        """Rows [start, stop) of one column (strings decoded to an object array)"""
+        dtype = self._dtypes[name]
+        if self.rows == 0:
+            values = np.empty(0, dtype=dtype)
+        else:
+            values = np.memmap(_column_file(self.directory, name), dtype=dtype, mode='r',
+                               shape=(self.rows,))[start:stop]
+        if name in self._categories:
+            # Code -1 (missing) picks the trailing NaN
+            return np.asarray(self._categories[name] + [np.nan], dtype=object)[values]
+        return np.asarray(values)
+
+    def frame(self, columns=None, start=0, stop=None):
+        columns = self.columns if columns is None else columns
+        return pd.DataFrame({name: self.column(name, start, stop) for name in columns},
+                            columns=columns)
+
+    def chunks(self, chunksize, columns=None):
+        """Yield the log as DataFrames of at most chunksize rows"""
+        for start in range(0, self.rows, chunksize):
+            yield self.frame(columns, start, start + chunksize)
+
+
+class CacheWriter:
+    """Write side: append parsed chunks, then commit() to publish the cache"""
+
+    def __init__(self, log_path):
+        self.log_path = log_path
+        self.key = file_key(log_path)
+        self.directory = cache_dir(log_path)
+        self._tmp = self.directory + '.tmp'
+        shutil.rmtree(self._tmp, ignore_errors=True)
+        os.makedirs(self._tmp)
+        self.rows = 0
+        self.columns = None
+        self._dtypes = {}
+        self._categories = {}  # column -> {value: code}
+
+    def append(self, df):
+        if self.columns is None:
+            self.columns = [str(c) for c in df.columns]
+            for name in self.columns:
+                if name in STRING_COLUMNS or df[name].dtype == object:
+                    self._dtypes[name] = 'int32'
+                    self._categories[name] = {}
+                elif name in INT_COLUMNS:
+                    self._dtypes[name] = 'int64'
+                else:
+                    self._dtypes[name] = 'float64'
+        elif [str(c) for c in df.columns] != self.columns:
+            raise ValueError("column layout changed between chunks")
+
+        for name in self.columns:
+            values = df[name]
+            if name in self._categories:
+                mapping = self._categories[name]
+                # Missing values keep code -1
+                codes, uniques = pd.factorize(values)
+                remap = np.array([mapping.setdefault(str(u), len(mapping)) for u in uniques] + [-1],
+                                 dtype='int32')
+                data = remap[codes]
+            elif self._dtypes[name] == 'int64':
+                if not pd.api.types.is_integer_dtype(values.dtype):
+                    raise ValueError(f"column {name} is not integer")
+                data = values.to_numpy(dtype='int64')
+            else:
+                data = values.to_numpy(dtype='float64')
+            with open(_column_file(self._tmp, name), 'ab') as file:
+                file.write(np.ascontiguousarray(data).tobytes())
+        self.rows += len(df)
+
+    def commit(self):
+        """Publish the cache; a log modified while parsing leaves no cache behind"""
+        if self.columns is None or file_key(self.log_path) != self.key:
+            self.abort()
+            return None
+        meta = dict(self.key, rows=self.rows, columns=self.columns, dtypes=self._dtypes,
+                    categories={name: list(mapping) for name, mapping in self._categories.items()})
+        with open(os.path.join(self._tmp, META_FILE), 'w') as file:
+            json.dump(meta, file)
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.replace(self._tmp, self.directory)
+        return CachedLog(self.directory, meta)
+
+    def abort(self):
+        shutil.rmtree(self._tmp, ignore_errors=True)
+
+
+def open_cache(log_path):
+    """CachedLog if a cache matching the log's current identity exists, else None"""
+    meta_path = os.path.join(cache_dir(log_path), META_FILE)
+    try:
+        with open(meta_path) as file:
+            meta = json.load(file)
+        key = file_key(log_path)
+    except (OSError, ValueError):
+        return None
+    if any(meta.get(k) != v for k, v in key.items()):
+        return None
+    return CachedLog(cache_dir(log_path), meta)
@@ -0,0 +1,110 @@
+"""
+High-rate physics sampler
+
+Polls the shared memory on its own thread, independent of the render
+frame rate, and keeps only snapshots carrying a new physics packetId.
+acUpdate drains the collected frames, so logging follows the real
+physics tick instead of logging duplicates at high FPS or skipping
+ticks at low FPS.
+
+Limits:
+- Timer resolution. The poll interval is a timed wait, and Windows rounds
+  waits up to its timer period (~15.6 ms by default), so a 500 Hz sampler
+  would really poll at ~64 Hz and miss most of the 333 Hz physics ticks.
+  While running, the sampler asks Windows for a 1 ms timer period
+  (timeBeginPeriod) and counts ticks that still fall between two polls
+  (`missed`, from packetId gaps) so a short-sampled log shows up in the
+  session log.
+- Label history. The labeler's window is a number of frames, tuned for
+  game frames (HISTORY_SIZE = 5, ~80 ms at 60fps). Fed physics ticks, the
+  same 5 frames would span only ~15 ms and Label/YawGradient would mean
+  something else; scaled_frames() converts frame counts to ticks of the
+  same duration, and the logger sizes its feature window with it.
+  relabel.py assumes game-frame logs, so it does not reproduce labels of
+  logs recorded with the sampler.
+"""
+
+import threading
+from collections import deque
+
+PHYSICS_HZ = 333  # Assetto Corsa's physics rate
+GAME_FPS = 60  # Frame rate the frame-count settings (label history, EMA span) were tuned for
+
+
+def scaled_frames(frames, fps=GAME_FPS, tick_hz=PHYSICS_HZ):
+    """Physics ticks covering the same time as `frames` game frames"""
+    return max(frames, int(round(frames * tick_hz / float(fps))))
+
+
+def _fine_timer():
+    """
+    Raise the Windows timer resolution to 1 ms; returns the function that
+    restores it, or None where there is nothing to change (not Windows)
+    """
+    try:
+        import ctypes
+        winmm = ctypes.windll.winmm
+    except (ImportError, AttributeError, OSError):
+        return None
+    if winmm.timeBeginPeriod(1) != 0:  # TIMERR_NOERROR
+        return None
+    return lambda: winmm.timeEndPeriod(1)
+
+
+class PhysicsSampler(threading.Thread):
+    def __init__(self, info, physics_layout, graphics_layout, rate_hz=500, capacity=2048):
+        """
+        info:      sim_info.SimInfo to snapshot
+        rate_hz:   polling rate - should exceed the physics rate (333 Hz in AC)
+        capacity:  ring buffer size in frames; oldest frames are dropped if
+                   acUpdate stops draining
+        """
+        threading.Thread.__init__(self, name="PhysicsSampler")
+        self.daemon = True
+        self._info = info
+        self._layouts = (physics_layout, graphics_layout)
+        self._interval = 1.0 / rate_hz
+        self._frames = deque(maxlen=capacity)
+        self._stop_event = threading.Event()
+        self.dropped = 0
+        self.sampled = 0  # Physics ticks collected
+        self.missed = 0  # Ticks that came and went between two polls (packetId gaps)
+
+    def run(self):
+        frames = self._frames
+        capacity = frames.maxlen
+        snapshot = self._info.snapshot
+        physics_layout, graphics_layout = self._layouts
+        last_packet = None
+        restore_timer = _fine_timer()
+        try:
+            while not self._stop_event.is_set():
+                physics, graphics = snapshot(physics_layout, graphics_layout)
+                # packetId is value 0 of every snapshot; only keep new physics ticks
+                packet = physics[0]
+                if packet != last_packet:
+                    if last_packet is not None and packet > last_packet + 1:
+                        self.missed += packet - last_packet - 1
+                    last_packet = packet
+                    if len(frames) == capacity:
+                        self.dropped += 1
+                    frames.append((physics, graphics))
+                    self.sampled += 1
+                self._stop_event.wait(self._interval)
+        finally:
+            if restore_timer is not None:
+                restore_timer()
+
+    def drain(self):
+        """All frames collected since the last call, oldest first"""
+        frames = self._frames
+        drained = []
+        # popleft is atomic, so this is safe against the sampler appending
+        while frames:
+            drained.append(frames.popleft())
+        return drained
+
+    def stop(self, timeout=1.0):
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
@@ -0,0 +1,279 @@
+"""
+Vectorized offline re-labeler
+
+Re-computes Label and YawGradient for a whole log with NumPy, so label
+thresholds can be tuned on recorded data instead of driving again.
+label_frames() reproduces labeling.calculate_label_improved frame for frame:
+the 5-frame history becomes a lagged difference, and it restarts after the
+first frame of every lap exactly like the FeatureEngine window in
+LapTimeML.log_frame. Logs recorded with the physics sampler label over a
+window of physics ticks (physics_sampler.scaled_frames) and are not
+reproduced.
+
+    python relabel.py third_party/log.csv --verify
+    python relabel.py third_party/log.csv --out relabeled.csv
+"""
+
+import os
+import time
+import numpy as np
+import pandas as pd
+
+from labeling import calculate_label_improved, HISTORY_SIZE
+from features import FeatureEngine, YAW_RATE, LAT_ACCEL, SPEED
+
+LABELS = ['Neutral', 'Understeer', 'Oversteer']
+
+# Columns the labeler reads
+INPUT_COLUMNS = ['Lap', 'YawRate', 'LateralAccel', 'SteerAngle', 'Speed', 'SlipDiff']
+
+# Thresholds of calculate_label_improved; label_frames accepts overrides
+DEFAULT_THRESHOLDS = {
+    'min_speed': 50.0,             # km/h, below: Neutral
+    'spin_yaw_rate': 1.0,          # |yaw rate| above: spinning, Neutral
+    'crash_speed_drop': -15.0,     # speed change over the window below: Neutral
+    'flat_lat_accel_change': 0.01,
+    'flat_min_lat_accel': 0.3,
+    'flat_slip': 0.15,
+    'medium_speed': 80.0,          # low_speed_factor below, medium_speed_factor up to high_speed
+    'high_speed': 120.0,           # high_speed_factor above
+    'low_speed_factor': 0.3,
+    'medium_speed_factor': 0.5,
+    'high_speed_factor': 0.7,
+    'min_expected_yaw': 0.05,
+    'oversteer_ratio': 1.5,
+    'oversteer_gradient': 1.0,
+    'understeer_ratio': 0.6,
+    'understeer_gradient': 0.15,
+    'response_slip': 0.10,
+    'cornering_lat_accel': 0.5,
+    'cornering_speed': 80.0,
+    'cornering_slip': 0.25,
+}
+
+
+# ------------------------------------
+# Lap boundaries
+
+def history_starts(laps, sessions=None):
+    """
+    Boolean mask of frames where the label history starts empty
+
+    LapTimeML.log_frame labels the first frame of a lap with the history it
+    has so far and only then clears it, so the frame after each lap change
+    starts a new history. A new session (lap number not increasing, or a
+    different session id) starts with an empty history as well.
+    """
+    laps = np.asarray(laps)
+    n = len(laps)
+    starts = np.zeros(n, dtype=bool)
+    if n == 0:
+        return starts
+    lap_change = np.empty(n, dtype=bool)
+    lap_change[0] = True
+    lap_change[1:] = laps[1:] != laps[:-1]
+    new_session = np.empty(n, dtype=bool)
+    new_session[0] = True
+    new_session[1:] = laps[1:] < laps[:-1]
+    if sessions is not None:
+        sessions = np.asarray(sessions)
+        session_change = sessions[1:] != sessions[:-1]
+        lap_change[1:] |= session_change
+        new_session[1:] |= session_change
+    starts |= lap_change & new_session
+    starts[1:] |= lap_change[:-1]
+    return starts
+
+
+def lagged(values, starts, lag=HISTORY_SIZE - 1):
+    """
+    (values[i] - values[i - lag], valid) per frame
+    valid is False while fewer than lag + 1 frames of history exist
+    """
+    values = np.asarray(values, dtype=np.float64)
+    index = np.arange(len(values))
+    start_index = np.maximum.accumulate(np.where(starts, index, 0))
+    valid = index - start_index >= lag
+    previous = np.where(valid, index - lag, index)
+    return values - values[previous], valid
+
+
+# ------------------------------------
+# Labeling
+
+def label_frames(yaw_rate, lat_accel, steer_angle, speed, slip_diff, starts, thresholds=None, deltas=None):
+    """
+    Vectorized calculate_label_improved over whole columns
+    starts:  history_starts() of the same frames
+    deltas:  precomputed (yaw, lat_accel, speed changes, valid) to reuse across calls
+    Returns (label codes as int8, yaw gradient as float64)
+    """
+    t = dict(DEFAULT_THRESHOLDS)
+    if thresholds:
+        unknown = set(thresholds) - set(t)
+        if unknown:
+            raise ValueError(f"unknown thresholds: {sorted(unknown)}")
+        t.update(thresholds)
+
+    yaw_rate = np.asarray(yaw_rate, dtype=np.float64)
+    lat_accel = np.asarray(lat_accel, dtype=np.float64)
+    steer_angle = np.asarray(steer_angle, dtype=np.float64)
+    speed = np.asarray(speed, dtype=np.float64)
+    slip_diff = np.asarray(slip_diff, dtype=np.float64)
+    if deltas is None:
+        deltas = frame_deltas(yaw_rate, lat_accel, speed, starts)
+    yaw_change, lat_accel_change, speed_change, valid = deltas
+
+    codes = np.zeros(len(speed), dtype=np.int8)
+    gradient = np.zeros(len(speed), dtype=np.float64)
+
+    # Early exits: Neutral with zero gradient
+    active = (~(speed < t['min_speed']) & valid
+              & ~(np.abs(yaw_rate) > t['spin_yaw_rate'])
+              & ~(speed_change < t['crash_speed_drop']))
+
+    # Almost constant lateral acceleration: slip difference alone decides
+    flat = active & (np.abs(lat_accel_change) < t['flat_lat_accel_change'])
+    flat_labeled = flat & ~(np.abs(lat_accel) < t['flat_min_lat_accel'])
+    codes[flat_labeled & (slip_diff > t['flat_slip'])] = 2
+    codes[flat_labeled & ~(slip_diff > t['flat_slip']) & (slip_diff < -t['flat_slip'])] = 1
+
+    graded = active & ~flat
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gradient[graded] = yaw_change[graded] / lat_accel_change[graded]
+        speed_factor = np.where(speed < t['medium_speed'], t['low_speed_factor'],
+                                np.where(speed < t['high_speed'], t['medium_speed_factor'],
+                                         t['high_speed_factor']))
+        expected_yaw = np.abs(steer_angle) * (speed / 100.0) * speed_factor
+        response = graded & (expected_yaw > t['min_expected_yaw'])
+        ratio = np.abs(yaw_rate) / expected_yaw
+
+    over_response = response & ((ratio > t['oversteer_ratio']) | (gradient > t['oversteer_gradient']))
+    under_response = (response & ~over_response
+                      & ((ratio < t['understeer_ratio']) | (gradient < t['understeer_gradient'])))
+    over = over_response & (slip_diff > t['response_slip'])
+    under = under_response & (slip_diff < -t['response_slip'])
+    codes[over] = 2
+    codes[under] = 1
+
+    # Active cornering at higher speeds
+    cornering = graded & ~(over | under) & (np.abs(lat_accel) > t['cornering_lat_accel']) & (speed > t['cornering_speed'])
+    codes[cornering & (slip_diff > t['cornering_slip'])] = 2
+    codes[cornering & ~(slip_diff > t['cornering_slip']) & (slip_diff < -t['cornering_slip'])] = 1
+    return codes, gradient
+
+
+def frame_deltas(yaw_rate, lat_accel, speed, starts):
+    """Window differences used by label_frames - independent of the thresholds"""
+    yaw_change, valid = lagged(yaw_rate, starts)
+    lat_accel_change, _ = lagged(lat_accel, starts)
+    speed_change, _ = lagged(speed, starts)
+    return yaw_change, lat_accel_change, speed_change, valid
+
+
+def label_frames_scalar(yaw_rate, lat_accel, steer_angle, speed, slip_diff, starts):
+    """Reference: feed the frames through the in-game labeler and feature engine"""
+    features = FeatureEngine(HISTORY_SIZE)
+    codes = np.zeros(len(speed), dtype=np.int8)
+    gradient = np.zeros(len(speed), dtype=np.float64)
+    rows = zip(*(np.asarray(c, dtype=np.float64).tolist()
+                 for c in (yaw_rate, lat_accel, steer_angle, speed, slip_diff)))
+    for i, (yaw, lat, steer, spd, slip) in enumerate(rows):
+        if starts[i]:
+            features.reset()
+        features.push((yaw, lat, steer, spd, slip), i)
+        _, codes[i], gradient[i] = calculate_label_improved(
+            yaw, lat, steer, spd, slip,
+            features.change(YAW_RATE), features.change(LAT_ACCEL), features.change(SPEED))
+    return codes, gradient
+
+
+# ------------------------------------
+# Logs
+
+def load_columns(file_path):
+    """
+    Labeler inputs of a log.csv (or binary log) as {column: ndarray}
+    CSV floats are parsed round-trip exact so labels match the logger's.
+    """
+    if file_path.endswith('.bin'):
+        import binlog
+        log = binlog.BinaryLog(file_path)
+        columns = {name: log.channel(name) for name in INPUT_COLUMNS[1:]}
+        columns['Lap'] = np.concatenate([np.full(e.rows, e.lap) for e in log.entries])
+        columns['Session'] = np.concatenate([np.full(e.rows, e.session) for e in log.entries])
+        return columns
+    df = pd.read_csv(file_path, sep=';', usecols=INPUT_COLUMNS, float_precision='round_trip',
+                     on_bad_lines='skip')
+    return {name: df[name].to_numpy() for name in INPUT_COLUMNS}
+
+
+def relabel(columns, thresholds=None):
+    """(label codes, yaw gradient) for loaded columns"""
+    starts = history_starts(columns['Lap'], columns.get('Session'))
+    return label_frames(columns['YawRate'], columns['LateralAccel'], columns['SteerAngle'],
+                        columns['Speed'], columns['SlipDiff'], starts, thresholds)
+
+
+def verify(columns):
+    """Compare the vectorized labels against the scalar labeler; returns True if identical"""
+    starts = history_starts(columns['Lap'], columns.get('Session'))
+    inputs = (columns['YawRate'], columns['LateralAccel'], columns['SteerAngle'],
+              columns['Speed'], columns['SlipDiff'])
+
+    start = time.perf_counter()
+    codes, gradient = label_frames(*inputs, starts)
+    vector_s = time.perf_counter() - start
+    start = time.perf_counter()
+    ref_codes, ref_gradient = label_frames_scalar(*inputs, starts)
+    scalar_s = time.perf_counter() - start
+
+    n = len(codes)
+    label_diff = np.flatnonzero(codes != ref_codes)
+    gradient_diff = np.flatnonzero((gradient != ref_gradient) & ~(np.isnan(gradient) & np.isnan(ref_gradient)))
+    print(f"{n:,} frames: vectorized {n / max(vector_s, 1e-9) / 1e6:.1f} M frames/s, "
+          f"scalar {n / max(scalar_s, 1e-9) / 1e6:.2f} M frames/s")
+    print(f"  label mismatches:         {len(label_diff):,}")
+    print(f"  yaw gradient mismatches:  {len(gradient_diff):,}")
+    for i in np.union1d(label_diff, gradient_diff)[:10]:
+        print(f"    frame {i}: vectorized {LABELS[codes[i]]} {gradient[i]!r}, "
+              f"scalar {LABELS[ref_codes[i]]} {ref_gradient[i]!r}")
+    return len(label_diff) == 0 and len(gradient_diff) == 0
+
+
+def write_relabeled(file_path, out_path, thresholds=None):
+    """Copy a log.csv with Label and YawGradient recomputed"""
+    df = pd.read_csv(file_path, sep=';', float_precision='round_trip', on_bad_lines='skip')
+    columns = {name: df[name].to_numpy() for name in INPUT_COLUMNS}
+    codes, gradient = relabel(columns, thresholds)
+    changed = int((df['Label'].to_numpy() != np.asarray(LABELS, dtype=object)[codes]).sum()) \
+        if 'Label' in df.columns else len(df)
+    df['YawGradient'] = gradient
+    df['Label'] = np.asarray(LABELS, dtype=object)[codes]
+    df.to_csv(out_path, sep=';', index=False)
+    return len(df), changed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Re-label a telemetry log with the vectorized labeler")
+    parser.add_argument("file_path", nargs="?", default=os.path.join("third_party", "log.csv"),
+                        help="log.csv or binary log (.bin)")
+    parser.add_argument("--out", metavar="CSV", help="write a copy of the log with recomputed labels")
+    parser.add_argument("--verify", action="store_true",
+                        help="check the vectorized labels against the in-game scalar labeler")
+    args = parser.parse_args()
+
+    if args.verify:
+        columns = load_columns(args.file_path)
+        raise SystemExit(0 if verify(columns) else 1)
+    if args.out:
+        rows, changed = write_relabeled(args.file_path, args.out)
+        print(f"Wrote {rows:,} rows to {args.out} ({changed:,} labels changed)")
+    else:
+        columns = load_columns(args.file_path)
+        codes, _ = relabel(columns)
+        counts = np.bincount(codes, minlength=len(LABELS))
+        for name, count in zip(LABELS, counts):
+            print(f"  {name:<11}: {count:,} ({count / max(len(codes), 1) * 100:.1f}%)")
@@ -0,0 +1,254 @@
+"""
+Headless replay of a recorded log through the in-game apps
+
+Runs LapTimeML.py (or the Template app) outside the game:
+  - sim_info maps file-backed pages laid out exactly like the simulator's
+    shared memory (sim_info.REPLAY_DIR_ENV), instead of the named mappings
+  - replay_stubs/ provides stand-ins for the game's ac and acsys modules
+  - every recorded frame is written into the pages, then acUpdate is called
+    at the chosen rate - as fast as possible unless --realtime is given
+
+Replaying a log.csv written by LapTimeML.py reproduces it: the app reads
+the same values, labels them the same way and writes the same rows. The
+recording ends on the last frame before the line (the crossing frame
+starts the next lap), so after the last frame the driver crosses the line
+once more to close that lap - it is saved complete, and only the crossing
+frame goes to log_incomplete.csv as it did in the game. Not done with
+--limit (the cut lap is not complete) or --no-close.
+
+    python replay.py third_party/log.csv --out /tmp/replay
+    python replay.py third_party/log.bin --app Template_Assetto_Corsa_App --realtime
+
+The app module is imported once per process, so one Replay per process.
+"""
+
+import os
+import sys
+import time
+import struct
+import tempfile
+import importlib
+
+import numpy as np
+import pandas as pd
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+STUBS_DIR = os.path.join(APP_DIR, "replay_stubs")
+
+# sim_info.REPLAY_DIR_ENV - sim_info must not be imported before it is set
+REPLAY_DIR_ENV = "AC_SHM_REPLAY_DIR"
+
+APPS = ("LapTimeML", "Template_Assetto_Corsa_App")
+
+# Log column -> (page, field, array index or None, scale applied by the app)
+FRAME_FIELDS = [
+    ("YawRate", "physics", "localAngularVel", 2, 1),
+    ("LateralAccel", "physics", "accG", 0, 1),
+    ("LongitudinalAccel", "physics", "accG", 1, 1),
+    ("VerticalAccel", "physics", "accG", 2, 1),
+    ("SteerAngle", "physics", "steerAngle", None, 1),
+    ("Speed", "physics", "speedKmh", None, 1),
+    ("LocalVelX", "physics", "localVelocity", 0, 1),
+    ("LocalVelY", "physics", "localVelocity", 1, 1),
+    ("LocalVelZ", "physics", "localVelocity", 2, 1),
+    ("WheelSlipFL", "physics", "wheelSlip", 0, 1),
+    ("WheelSlipFR", "physics", "wheelSlip", 1, 1),
+    ("WheelSlipRL", "physics", "wheelSlip", 2, 1),
+    ("WheelSlipRR", "physics", "wheelSlip", 3, 1),
+    ("Throttle", "physics", "gas", None, 100),
+    ("Brake", "physics", "brake", None, 100),
+    ("Gear", "physics", "gear", None, 1),
+    ("RoadTemp", "physics", "roadTemp", None, 1),
+    ("AirTemp", "physics", "airTemp", None, 1),
+    ("Heading", "physics", "heading", None, 1),
+    ("Pitch", "physics", "pitch", None, 1),
+    ("Roll", "physics", "roll", None, 1),
+    ("SurfaceGrip", "graphics", "surfaceGrip", None, 1),
+    ("TrackPos", "graphics", "normalizedCarPosition", None, 1),
+    ("CurrentTime", "graphics", "iCurrentTime", None, 1),
+    ("CarX", "graphics", "carCoordinates", 0, 1),
+    ("CarY", "graphics", "carCoordinates", 1, 1),
+    ("CarZ", "graphics", "carCoordinates", 2, 1),
+    ("Lap", "graphics", "completedLaps", None, 1),
+]
+
+
+def load_frames(file_path, limit=None):
+    """Recorded frames as {column: ndarray} from a log.csv or binary log (.bin)"""
+    if file_path.endswith(".bin"):
+        import binlog
+        log = binlog.BinaryLog(file_path)
+        columns = {name: log.channel(name) for name, _ in log.channels}
+        infos = [log.block_info(i) for i in range(len(log))]
+        columns["Lap"] = np.concatenate([np.full(rows, lap) for lap, _, rows, _, _, _ in infos])
+        columns["CarModel"] = np.concatenate([np.full(rows, car, dtype=object)
+                                              for _, _, rows, _, car, _ in infos])
+        columns["Track"] = np.concatenate([np.full(rows, track, dtype=object)
+                                           for _, _, rows, _, _, track in infos])
+        columns.pop("Label", None)
+    else:
+        df = pd.read_csv(file_path, sep=";", float_precision="round_trip", on_bad_lines="skip",
+                         nrows=limit)
+        # Empty car/track names (e.g. no session loaded) come back as NaN
+        for name in ("CarModel", "Track"):
+            if name in df.columns:
+                df[name] = df[name].fillna("")
+        columns = {name: df[name].to_numpy() for name in df.columns}
+    if limit is not None:
+        columns = {name: values[:limit] for name, values in columns.items()}
+    return columns
+
+
+class Replay:
+    def __init__(self, app="LapTimeML", replay_dir=None, output_dir=None):
+        """
+        app:         module name of the app to drive (see APPS)
+        replay_dir:  where the page files live (default: a new temporary directory)
+        output_dir:  where the app writes its logs (default: replay_dir)
+        """
+        self.replay_dir = replay_dir or tempfile.mkdtemp(prefix="ac_replay_")
+        self.output_dir = output_dir or self.replay_dir
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        # Must be in place before sim_info is first imported
+        os.environ[REPLAY_DIR_ENV] = self.replay_dir
+        for path in (STUBS_DIR, APP_DIR):
+            if path not in sys.path:
+                sys.path.insert(0, path)
+
+        import ac
+        import acsys
+        from third_party import sim_info
+        if sim_info.info.replay_dir != self.replay_dir:
+            raise RuntimeError("sim_info was imported before the replay was set up")
+        self.ac = ac
+        self.acsys = acsys
+        self.sim_info = sim_info
+        ac.reset()
+
+        self.app = importlib.import_module(app)
+        # Keep the app's logs out of the source tree
+        for attr, name in (("log_file", "log.csv"), ("binary_log_file", "log.bin"),
+                           ("incomplete_log_file", "log_incomplete.csv"), ("reference_dir", "reference_laps")):
+            if hasattr(self.app, attr):
+                setattr(self.app, attr, os.path.join(self.output_dir, name))
+
+        self._pages = {
+            "physics": (sim_info.info._acpmf_physics, sim_info.SPageFilePhysics),
+            "graphics": (sim_info.info._acpmf_graphics, sim_info.SPageFileGraphic),
+        }
+        self._packet_id = 0
+        self._car_track = None
+        sim_info.info.graphics.status = sim_info.AC_LIVE
+
+    def _setters(self, columns):
+        """(Struct, page mapping, offset, values, scale) for every recorded column"""
+        setters = []
+        for name, page, field, index, scale in FRAME_FIELDS:
+            if name not in columns:
+                continue
+            mapping, structure = self._pages[page]
+            descriptor = getattr(structure, field)
+            ctype = dict(structure._fields_)[field]
+            if index is not None:
+                ctype = ctype._type_  # Element type of the array field
+            layout = struct.Struct("=" + ctype._type_)
+            offset = descriptor.offset + (index or 0) * layout.size
+            values = np.asarray(columns[name]).tolist()
+            setters.append((layout, mapping, offset, values, scale))
+        return setters
+
+    def _write_static(self, car_model, track_name):
+        if (car_model, track_name) != self._car_track:
+            self._car_track = (car_model, track_name)
+            self.sim_info.info.static.carModel = car_model
+            self.sim_info.info.static.track = track_name
+
+    def _publish(self):
+        # The game bumps packetId once a page is complete
+        self._packet_id += 1
+        self.sim_info.info.physics.packetId = self._packet_id
+        self.sim_info.info.graphics.packetId = self._packet_id
+
+    def load(self, columns):
+        """Prepare recorded frames for write_frame; returns the frame count"""
+        car_models = columns.get("CarModel")
+        tracks = columns.get("Track")
+        if car_models is None or tracks is None:
+            car_models = tracks = None
+        self._frames = (self._setters(columns), np.asarray(columns["Lap"]).tolist(), car_models, tracks)
+        return len(self._frames[1])
+
+    def write_frame(self, i):
+        """Publish loaded frame i in the pages and the stub car state"""
+        setters, laps, car_models, tracks = self._frames
+        if car_models is not None:
+            self._write_static(str(car_models[i]), str(tracks[i]))
+        for layout, mapping, offset, values, scale in setters:
+            value = values[i] / scale if scale != 1 else values[i]
+            layout.pack_into(mapping, offset, value)
+        self._publish()
+        self.ac.car_state[self.acsys.CS.LapCount] = laps[i]
+
+    def cross_line(self):
+        """Publish the last loaded frame again just past the start/finish line (next lap, time 0)"""
+        laps = self._frames[1]
+        graphics = self.sim_info.info.graphics
+        graphics.normalizedCarPosition = 0.0
+        graphics.iCurrentTime = 0
+        graphics.completedLaps = laps[-1] + 1
+        self._publish()
+        self.ac.car_state[self.acsys.CS.LapCount] = laps[-1] + 1
+
+    def run(self, columns, rate_hz=60.0, realtime=False, ac_version="1.16", close_lap=False):
+        """
+        acMain, one acUpdate per recorded frame, acShutdown
+        close_lap: cross the line after the last frame so its lap is saved complete
+        Returns (frames, wall-clock seconds)
+        """
+        frames = self.load(columns)
+        delta_t = 1.0 / rate_hz
+
+        self.app.acMain(ac_version)
+        start = time.perf_counter()
+        for i in range(frames):
+            self.write_frame(i)
+            self.app.acUpdate(delta_t)
+            if realtime:
+                # Hold the frame until its slot in real time
+                delay = start + (i + 1) * delta_t - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        if close_lap and frames:
+            self.cross_line()
+            self.app.acUpdate(delta_t)
+        elapsed = time.perf_counter() - start
+        self.app.acShutdown()
+        return frames, elapsed
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay a recorded log through an app, headless")
+    parser.add_argument("file_path", help="log.csv or binary log (.bin) to replay")
+    parser.add_argument("--app", choices=APPS, default="LapTimeML")
+    parser.add_argument("--rate", type=float, default=60.0, help="frames per second (deltaT passed to acUpdate)")
+    parser.add_argument("--realtime", action="store_true", help="pace frames at --rate instead of running flat out")
+    parser.add_argument("--limit", type=int, help="replay only the first N frames")
+    parser.add_argument("--out", metavar="DIR", help="directory for the app's logs (default: a temporary directory)")
+    parser.add_argument("--no-close", action="store_true",
+                        help="leave the last lap open instead of crossing the line after the last frame")
+    parser.add_argument("--echo", action="store_true", help="print ac.log/ac.console output")
+    args = parser.parse_args()
+
+    columns = load_frames(args.file_path, args.limit)
+    replay = Replay(args.app, output_dir=args.out)
+    replay.ac.echo = args.echo
+    frames, elapsed = replay.run(columns, args.rate, args.realtime,
+                                 close_lap=args.limit is None and not args.no_close)
+
+    print(f"Replayed {frames:,} frames through {args.app} in {elapsed:.2f} s "
+          f"({frames / max(elapsed, 1e-9):,.0f} frames/s, {frames / args.rate / max(elapsed, 1e-9):.1f}x real time)")
+    print(f"Logs written to {replay.output_dir}")
+    for text in replay.ac.labels.values():
+        print(f"  | {text}")
@@ -0,0 +1,84 @@
+"""
+Stand-in for the game's ac module (offline replay only, see replay.py)
+
+Windows and labels are plain ids; label texts, log lines and the values
+returned by getCarState live in module globals that the replay driver
+sets and inspects.
+"""
+
+import sys
+
+# Driver-controlled: {acsys.CS id: value} for car 0
+car_state = {}
+
+# Recorded output
+labels = {}      # label id -> current text
+log_lines = []   # ac.log and ac.console messages
+calls = {}       # function name -> call count
+echo = False     # Also print log lines to stderr
+
+_next_id = [0]
+
+
+def _count(name):
+    calls[name] = calls.get(name, 0) + 1
+
+
+def _new_id():
+    _next_id[0] += 1
+    return _next_id[0]
+
+
+def reset():
+    car_state.clear()
+    labels.clear()
+    del log_lines[:]
+    calls.clear()
+
+
+def newApp(name):
+    _count("newApp")
+    return _new_id()
+
+
+def setSize(control, width, height):
+    _count("setSize")
+
+
+def addLabel(window, text):
+    _count("addLabel")
+    label = _new_id()
+    labels[label] = text
+    return label
+
+
+def setText(label, text):
+    _count("setText")
+    labels[label] = text
+
+
+def setPosition(control, x, y):
+    _count("setPosition")
+
+
+def setFontSize(control, size):
+    _count("setFontSize")
+
+
+def log(message):
+    _count("log")
+    log_lines.append(message)
+    if echo:
+        sys.stderr.write(message + "\n")
+
+
+def console(message):
+    _count("console")
+    log_lines.append(message)
+    if echo:
+        sys.stderr.write(message + "\n")
+
+
+def getCarState(car, state, *args):
+    _count("getCarState")
+    return car_state.get(state, 0)
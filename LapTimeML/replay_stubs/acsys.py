@@ -0,0 +1,19 @@
+"""
+Stand-in for the game's acsys module (offline replay only, see replay.py)
+"""
+
+
+class CS:
+    # Car state ids for ac.getCarState; values only need to be distinct here
+    SpeedMS = 0
+    SpeedMPH = 1
+    SpeedKMH = 2
+    LapTime = 3
+    LastLap = 4
+    BestLap = 5
+    LapCount = 6
+    Gas = 7
+    Brake = 8
+    Gear = 9
+    RPM = 10
+    NormalizedSplinePosition = 11
@@ -0,0 +1,263 @@
+"""
+Distance-domain lap resampling
+
+Frames are logged in time, so two laps have different sample counts and
+their rows don't line up by track position. resample() interpolates every
+channel of every lap onto one common TrackPos grid, giving a
+laps x points x channels array where grid point k is the same place on
+track for every lap - comparing laps, averaging them or taking time deltas
+become plain array operations.
+
+Per lap, positions are first unwrapped across the start/finish line
+(1.0 -> 0.0): a lap whose first frames are still just before the line starts
+slightly below 0, one whose last frames are already past it ends above 1.
+Only samples that reach a new furthest position are kept, which drops
+stationary duplicates and backwards jitter. All channels are then
+interpolated in one step from a single searchsorted of the grid: linearly,
+except the discrete channels (Gear, Corner, Label), which take the value of
+the sample at or before the grid point. Grid points the lap never covered
+(laps cut short) are NaN.
+
+    python resample.py third_party/log.csv --points 1000 --out laps.npz
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from lap_buffer import CHANNELS, LABELS
+
+DEFAULT_POINTS = 1000
+
+# Channels resampled by default: everything logged except the position itself
+DEFAULT_CHANNELS = [name for name, _ in CHANNELS if name != 'TrackPos']
+
+# Taken from the preceding sample instead of interpolated
+DISCRETE_CHANNELS = {'Gear', 'Corner', 'Label'}
+
+# A position jump larger than this between two frames is a start/finish line crossing
+WRAP_JUMP = 0.5
+
+
+def unwrap_positions(pos):
+    """Lap-relative distance: line crossings removed, a lap starting before the line begins below 0"""
+    pos = np.asarray(pos, dtype=np.float64)
+    if len(pos) == 0:
+        return pos
+    step = np.diff(pos)
+    laps = np.zeros(len(pos))
+    laps[1:] = np.cumsum((step < -WRAP_JUMP).astype(np.int64) - (step > WRAP_JUMP))
+    distance = pos + laps
+    # Most of the lap lies in [0, 1); frames before the line belong just below 0
+    finite = distance[np.isfinite(distance)]
+    if len(finite):
+        distance -= np.floor(np.median(finite))
+    return distance
+
+
+def forward_samples(distance):
+    """Mask of the frames that reach a new furthest distance (first frame of each)"""
+    distance = np.where(np.isnan(distance), -np.inf, distance)
+    keep = np.zeros(len(distance), dtype=bool)
+    if len(distance):
+        furthest = np.maximum.accumulate(distance)
+        keep[0] = np.isfinite(distance[0])
+        keep[1:] = distance[1:] > furthest[:-1]
+    return keep
+
+
+def resample_lap(pos, values, grid, discrete):
+    """
+    One lap onto the grid
+    values:   frames x channels array
+    discrete: boolean mask of the channels taken from the preceding sample
+    Returns a points x channels float64 array (NaN where the lap has no data)
+    """
+    out = np.full((len(grid), values.shape[1]), np.nan)
+    distance = unwrap_positions(pos)
+    keep = forward_samples(distance)
+    x = distance[keep]
+    if len(x) < 2:
+        return out
+    v = values[keep]
+
+    i = np.searchsorted(x, grid, side='right')
+    lo = np.clip(i - 1, 0, len(x) - 2)
+    hi = lo + 1
+    weight = (grid - x[lo]) / (x[hi] - x[lo])
+    covered = (grid >= x[0]) & (grid <= x[-1])
+
+    result = v[lo] + (v[hi] - v[lo]) * weight[:, None]
+    if discrete.any():
+        # Preceding sample (the last one exactly at x[-1] is its own)
+        at = np.where(grid >= x[-1], len(x) - 1, lo)
+        result[:, discrete] = v[at][:, discrete]
+    out[covered] = result[covered]
+    return out
+
+
+def lap_bounds(laps, sessions=None):
+    """(start, end) frame ranges of consecutive runs of the same lap (and session)"""
+    laps = np.asarray(laps)
+    change = laps[1:] != laps[:-1]
+    if sessions is not None:
+        sessions = np.asarray(sessions)
+        change |= sessions[1:] != sessions[:-1]
+    starts = np.concatenate([[0], np.flatnonzero(change) + 1])
+    ends = np.append(starts[1:], len(laps))
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+class ResampledLaps:
+    """laps x points x channels on a common TrackPos grid"""
+
+    def __init__(self, data, grid, channels, laps):
+        self.data = data
+        self.grid = grid
+        self.channels = list(channels)
+        self.laps = laps  # DataFrame: Session, Lap, CarModel, Track, Frames, Coverage
+        self._channel_index = dict((name, i) for i, name in enumerate(self.channels))
+
+    def __len__(self):
+        return len(self.data)
+
+    def channel(self, name):
+        """laps x points view of one channel"""
+        return self.data[:, :, self._channel_index[name]]
+
+    def lap_times(self):
+        """
+        Lap time in seconds at the line (NaN for laps that don't reach the last grid point)
+
+        The grid stops 1/points short of the line, so the time is extrapolated
+        to position 1.0 from the last two grid points.
+        """
+        times = self.channel('CurrentTime')[:, -2:].astype(np.float64)
+        step = self.grid[-1] - self.grid[-2]
+        return (times[:, 1] + (times[:, 1] - times[:, 0]) * (1.0 - self.grid[-1]) / step) / 1000.0
+
+    def fastest(self):
+        """Index of the fastest lap that covers the whole grid"""
+        times = self.lap_times()
+        return int(np.nanargmin(times)) if np.isfinite(times).any() else None
+
+    def delta_time(self, reference=None):
+        """laps x points time gained (-) or lost (+) in seconds against a reference lap (default: fastest)"""
+        if reference is None:
+            reference = self.fastest()
+        if reference is None:
+            raise ValueError("no lap covers the whole grid")
+        times = self.channel('CurrentTime').astype(np.float64)
+        return (times - times[reference]) / 1000.0
+
+    def mean(self, laps=None):
+        """points x channels average over the selected laps (NaN-aware)"""
+        data = self.data if laps is None else self.data[laps]
+        return np.nanmean(data.astype(np.float64), axis=0)
+
+    def save(self, path):
+        np.savez(path, data=self.data, grid=self.grid, channels=np.asarray(self.channels),
+                 **{'lap_' + name: (self.laps[name].to_numpy() if pd.api.types.is_numeric_dtype(self.laps[name])
+                                     else self.laps[name].to_numpy(dtype=str)) for name in self.laps.columns})
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as npz:
+            laps = pd.DataFrame({name[4:]: npz[name] for name in npz.files if name.startswith('lap_')})
+            return cls(npz['data'], npz['grid'], npz['channels'].tolist(), laps)
+
+
+def resample(columns, channels=None, points=DEFAULT_POINTS, dtype=np.float32):
+    """
+    Every lap of loaded columns ({name: array} with Lap, TrackPos and the channels;
+    Session, CarModel and Track if present) onto a points-long TrackPos grid
+    """
+    channels = [c for c in (channels or DEFAULT_CHANNELS) if c in columns]
+    grid = np.arange(points) / points
+    discrete = np.array([c in DISCRETE_CHANNELS for c in channels], dtype=bool)
+    sessions = columns.get('Session')
+    bounds = lap_bounds(columns['Lap'], sessions)
+
+    data = np.empty((len(bounds), points, len(channels)), dtype=dtype)
+    rows = []
+    for k, (start, end) in enumerate(bounds):
+        values = np.column_stack([np.asarray(columns[c][start:end], dtype=np.float64) for c in channels])
+        lap = resample_lap(columns['TrackPos'][start:end], values, grid, discrete)
+        data[k] = lap
+        rows.append({
+            'Session': sessions[start] if sessions is not None else 0,
+            'Lap': columns['Lap'][start],
+            'CarModel': str(columns['CarModel'][start]) if 'CarModel' in columns else '',
+            'Track': str(columns['Track'][start]) if 'Track' in columns else '',
+            'Frames': end - start,
+            'Coverage': float(np.isfinite(lap[:, 0]).mean()) if len(channels) else 0.0,
+        })
+    return ResampledLaps(data, grid, channels, pd.DataFrame(rows, columns=[
+        'Session', 'Lap', 'CarModel', 'Track', 'Frames', 'Coverage']))
+
+
+def load_log(file_path, channels=None):
+    """Lap/session/car/track and channel columns of a log.csv or binary log (.bin) as {name: ndarray}"""
+    channels = channels or DEFAULT_CHANNELS
+    if file_path.endswith('.bin'):
+        import binlog
+        log = binlog.BinaryLog(file_path)
+        names = [name for name, _ in log.channels]
+        columns = {name: log.channel(name) for name in ['TrackPos'] + channels if name in names}
+        infos = [log.block_info(i) for i in range(len(log))]
+        columns['Lap'] = np.concatenate([np.full(rows, lap) for lap, _, rows, _, _, _ in infos])
+        columns['Session'] = np.concatenate([np.full(rows, session) for _, session, rows, _, _, _ in infos])
+        columns['CarModel'] = np.concatenate([np.full(rows, car, dtype=object) for _, _, rows, _, car, _ in infos])
+        columns['Track'] = np.concatenate([np.full(rows, track, dtype=object)
+                                           for _, _, rows, _, _, track in infos])
+        return columns
+
+    wanted = set(['Lap', 'CarModel', 'Track', 'TrackPos'] + channels)
+    df = pd.read_csv(file_path, sep=';', usecols=lambda name: name in wanted, on_bad_lines='skip')
+    columns = {name: df[name].to_numpy() for name in df.columns}
+    if 'Label' in columns:
+        codes = pd.Categorical(df['Label'], categories=LABELS).codes
+        columns['Label'] = np.where(codes >= 0, codes, np.nan)
+    for name in ('CarModel', 'Track'):
+        if name in columns:
+            columns[name] = df[name].fillna('').to_numpy()
+    return columns
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Resample every lap of a log onto a common TrackPos grid")
+    parser.add_argument("file_path", nargs="?", default=os.path.join("third_party", "log.csv"),
+                        help="log.csv or binary log (.bin)")
+    parser.add_argument("--points", type=int, default=DEFAULT_POINTS,
+                        help=f"grid points per lap (default {DEFAULT_POINTS})")
+    parser.add_argument("--channels", nargs="+", metavar="NAME", help="channels to resample (default: all)")
+    parser.add_argument("--out", metavar="NPZ", help="save the resampled laps (.npz)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    columns = load_log(args.file_path, args.channels)
+    loaded_s = time.perf_counter() - start
+    start = time.perf_counter()
+    laps = resample(columns, args.channels, args.points)
+    resample_s = time.perf_counter() - start
+    print(f"Loaded {len(columns['Lap']):,} frames in {loaded_s:.2f} s, "
+          f"resampled {len(laps)} laps in {resample_s:.2f} s")
+    print(f"Array: {' x '.join(map(str, laps.data.shape))} (laps x points x channels), "
+          f"{laps.data.nbytes / 1e6:.1f} MB\n")
+
+    summary = laps.laps.copy()
+    if 'CurrentTime' in laps.channels:
+        summary['LapTime'] = laps.lap_times()
+        fastest = laps.fastest()
+        if fastest is not None:
+            summary['Delta'] = summary['LapTime'] - summary['LapTime'][fastest]
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(summary.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+    if args.out:
+        laps.save(args.out)
+        print(f"\nSaved to {args.out}")
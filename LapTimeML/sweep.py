@@ -0,0 +1,167 @@
+"""
+Threshold sweep for the labeling rules
+
+Evaluates a grid of threshold sets (see relabel.DEFAULT_THRESHOLDS) against
+a recorded log and reports, per set, the class balance and how stable the
+labels are:
+
+    flips/1k    label changes per 1000 frames (lap boundaries excluded)
+    short runs  Understeer/Oversteer runs shorter than --window frames,
+                as a percentage of all Understeer/Oversteer runs
+
+The log is parsed and the window differences computed once; worker
+processes receive them once and only re-run the threshold comparisons.
+
+    python sweep.py third_party/log.csv --grid oversteer_ratio=1.3,1.5,1.7 response_slip=0.08,0.10
+"""
+
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import relabel
+
+# Used when no --grid is given: around the hand-tuned values
+DEFAULT_GRID = {
+    'oversteer_ratio': [1.3, 1.5, 1.7],
+    'understeer_ratio': [0.6, 0.7],
+    'response_slip': [0.08, 0.10, 0.12],
+    'cornering_slip': [0.20, 0.25],
+}
+
+# Stability window in frames (~0.5 seconds at 60fps)
+DEFAULT_WINDOW = 30
+
+# Per-worker data, set once by _init_worker
+_inputs = None
+
+
+def parse_grid(specs):
+    """['name=v1,v2', ...] -> {name: [v1, v2]}"""
+    grid = {}
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        if name not in relabel.DEFAULT_THRESHOLDS:
+            raise ValueError(f"unknown threshold {name!r} (known: {', '.join(relabel.DEFAULT_THRESHOLDS)})")
+        if not values:
+            raise ValueError(f"no values given for {name}")
+        grid[name] = [float(v) for v in values.split(',')]
+    return grid
+
+
+def grid_points(grid):
+    """Every combination of the grid values as a threshold-override dict"""
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+
+
+def prepare(columns):
+    """Everything that does not depend on the thresholds, computed once per sweep"""
+    starts = relabel.history_starts(columns['Lap'], columns.get('Session'))
+    inputs = [np.asarray(columns[name], dtype=np.float64)
+              for name in ('YawRate', 'LateralAccel', 'SteerAngle', 'Speed', 'SlipDiff')]
+    deltas = relabel.frame_deltas(inputs[0], inputs[1], inputs[3], starts)
+    laps = np.asarray(columns['Lap'])
+    lap_start = np.ones(len(laps), dtype=bool)
+    lap_start[1:] = laps[1:] != laps[:-1]
+    if columns.get('Session') is not None:
+        sessions = np.asarray(columns['Session'])
+        lap_start[1:] |= sessions[1:] != sessions[:-1]
+    return inputs, starts, deltas, lap_start
+
+
+def stability(codes, lap_start, window=DEFAULT_WINDOW):
+    """(label flips per 1000 frames, % of non-Neutral runs shorter than window)"""
+    n = len(codes)
+    if n == 0:
+        return 0.0, 0.0
+    changed = np.empty(n, dtype=bool)
+    changed[0] = True
+    changed[1:] = codes[1:] != codes[:-1]
+    flips = np.count_nonzero(changed & ~lap_start)
+
+    run_starts = np.flatnonzero(changed | lap_start)
+    run_lengths = np.diff(np.append(run_starts, n))
+    labeled = codes[run_starts] != 0
+    short = np.count_nonzero(labeled & (run_lengths < window))
+    labeled_runs = np.count_nonzero(labeled)
+    return flips / n * 1000, (short / labeled_runs * 100 if labeled_runs else 0.0)
+
+
+def evaluate(thresholds, inputs, starts, deltas, lap_start, window=DEFAULT_WINDOW):
+    """Class balance and stability of one threshold set"""
+    codes, _ = relabel.label_frames(*inputs, starts, thresholds, deltas=deltas)
+    counts = np.bincount(codes, minlength=len(relabel.LABELS))
+    flips, short = stability(codes, lap_start, window)
+    result = dict(thresholds)
+    for name, count in zip(relabel.LABELS, counts):
+        result[name] = count / max(len(codes), 1) * 100
+    result['flips/1k'] = flips
+    result['short runs'] = short
+    return result
+
+
+def _init_worker(inputs, starts, deltas, lap_start, window):
+    global _inputs
+    _inputs = (inputs, starts, deltas, lap_start, window)
+
+
+def _evaluate_in_worker(thresholds):
+    inputs, starts, deltas, lap_start, window = _inputs
+    return evaluate(thresholds, inputs, starts, deltas, lap_start, window)
+
+
+def sweep(columns, grid, window=DEFAULT_WINDOW, workers=None):
+    """Evaluate every grid point; returns a DataFrame with one row per threshold set"""
+    prepared = prepare(columns)
+    points = grid_points(grid)
+    if workers == 1 or len(points) == 1:
+        results = [evaluate(p, *prepared, window) for p in points]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=prepared + (window,)) as pool:
+            results = list(pool.map(_evaluate_in_worker, points))
+    return pd.DataFrame(results, columns=list(grid) + relabel.LABELS + ['flips/1k', 'short runs'])
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Sweep label thresholds over a recorded log")
+    parser.add_argument("file_path", nargs="?", default=os.path.join("third_party", "log.csv"),
+                        help="log.csv or binary log (.bin)")
+    parser.add_argument("--grid", nargs="+", metavar="NAME=V1,V2",
+                        help="threshold values to combine (default: a grid around the current values)")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW,
+                        help=f"stability window in frames (default {DEFAULT_WINDOW})")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--csv", metavar="OUT", help="also write the results to a CSV file")
+    args = parser.parse_args()
+
+    try:
+        grid = parse_grid(args.grid) if args.grid else DEFAULT_GRID
+    except ValueError as e:
+        parser.error(str(e))
+
+    start = time.perf_counter()
+    columns = relabel.load_columns(args.file_path)
+    print(f"Loaded {len(columns['Lap']):,} frames in {time.perf_counter() - start:.2f} s")
+
+    start = time.perf_counter()
+    results = sweep(columns, grid, args.window, args.workers)
+    print(f"Evaluated {len(results)} threshold sets in {time.perf_counter() - start:.2f} s\n")
+
+    baseline = evaluate({}, *prepare(columns), args.window)
+    print("Current thresholds: " + "  ".join(
+        f"{name} {baseline[name]:.1f}%" for name in relabel.LABELS)
+        + f"  flips/1k {baseline['flips/1k']:.1f}  short runs {baseline['short runs']:.1f}%\n")
+
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(results.to_string(index=False, float_format=lambda v: f"{v:.2f}"))
+    if args.csv:
+        results.to_csv(args.csv, index=False)
+        print(f"\nSaved to {args.csv}")
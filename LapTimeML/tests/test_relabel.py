@@ -0,0 +1,109 @@
+"""
+relabel.label_frames must reproduce the in-game labeler frame for frame
+
+The scalar reference (label_frames_scalar) runs labeling.calculate_label_improved
+through a FeatureEngine exactly like LapTimeML.log_frame; sweep, dataset,
+resample and train_model rely on the vectorized version matching it.
+"""
+
+import numpy as np
+import pytest
+
+from labeling import HISTORY_SIZE
+from relabel import DEFAULT_THRESHOLDS, history_starts, label_frames, label_frames_scalar
+
+N_FRAMES = 20_000
+
+# Values that sit exactly on a threshold of calculate_label_improved
+SPEED_EDGES = [50.0, 80.0, 120.0]
+YAW_EDGES = [1.0, -1.0]
+SLIP_EDGES = [0.10, -0.10, 0.15, -0.15, 0.25, -0.25]
+LAT_EDGES = [0.3, -0.3, 0.5, -0.5]
+
+
+def with_edges(rng, values, edges, share=0.05):
+    """Replace a share of the values with threshold values"""
+    hit = rng.random(len(values)) < share
+    values[hit] = rng.choice(edges, hit.sum())
+    return values
+
+
+def synthetic_frames(seed, n=N_FRAMES, with_sessions=False):
+    """Telemetry columns with short laps, session restarts, NaNs and threshold values"""
+    rng = np.random.default_rng(seed)
+
+    # Laps of 1-40 frames (shorter than the history too); every ~8th lap change restarts the count
+    lengths = rng.integers(1, 40, n)
+    lap_of_block = np.empty(len(lengths), dtype=np.int64)
+    session_of_block = np.zeros(len(lengths), dtype=np.int64)
+    lap, session = 1, 0
+    for i in range(len(lengths)):
+        if i and rng.random() < 0.125:
+            session += 1
+            # New session: lap count restarts, or (with session ids) may even keep increasing
+            lap = lap + 1 if with_sessions and rng.random() < 0.5 else int(rng.integers(0, 2))
+        lap_of_block[i] = lap
+        session_of_block[i] = session
+        lap += 1
+    laps = np.repeat(lap_of_block, lengths)[:n]
+    sessions = np.repeat(session_of_block, lengths)[:n]
+
+    # Speed on a 0.5 km/h grid so window changes land exactly on -15 as well
+    speed = with_edges(rng, np.round(rng.uniform(20, 200, n) * 2) / 2, SPEED_EDGES)
+    yaw_rate = with_edges(rng, rng.normal(0, 0.5, n), YAW_EDGES)
+    steer = rng.normal(0, 0.3, n)
+    slip_diff = with_edges(rng, rng.normal(0, 0.2, n), SLIP_EDGES)
+    # Runs of constant lateral acceleration exercise the flat (|change| < 0.01) branch
+    lat_accel = rng.normal(0, 1.0, n)
+    held = rng.random(n) < 0.3
+    lat_accel = np.where(held, np.concatenate([[0.0], lat_accel[:-1]]), lat_accel)
+    lat_accel = with_edges(rng, lat_accel, LAT_EDGES)
+
+    columns = [yaw_rate, lat_accel, steer, speed, slip_diff]
+    for values in columns:
+        values[rng.random(n) < 0.01] = np.nan
+    return laps, (sessions if with_sessions else None), columns
+
+
+@pytest.mark.parametrize("with_sessions", [False, True])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_label_frames_matches_scalar_labeler(seed, with_sessions):
+    laps, sessions, columns = synthetic_frames(seed, with_sessions=with_sessions)
+    starts = history_starts(laps, sessions)
+
+    codes, gradient = label_frames(*columns, starts)
+    ref_codes, ref_gradient = label_frames_scalar(*columns, starts)
+
+    np.testing.assert_array_equal(codes, ref_codes)
+    np.testing.assert_array_equal(gradient, ref_gradient)  # NaN == NaN here
+    # The frames must reach every branch for the comparison to mean anything
+    assert set(np.unique(ref_codes)) == {0, 1, 2}
+    assert (ref_gradient != 0).sum() > N_FRAMES // 20
+
+
+def test_explicit_default_thresholds_match():
+    laps, sessions, columns = synthetic_frames(3)
+    starts = history_starts(laps, sessions)
+    codes, gradient = label_frames(*columns, starts)
+    tuned_codes, tuned_gradient = label_frames(*columns, starts, thresholds=DEFAULT_THRESHOLDS)
+    np.testing.assert_array_equal(codes, tuned_codes)
+    np.testing.assert_array_equal(gradient, tuned_gradient)
+
+
+def test_history_restarts_after_lap_and_session_changes():
+    laps = np.array([1, 1, 1, 2, 2, 2, 2, 2, 2, 2, 1, 1, 1])
+    starts = history_starts(laps)
+    # A new session (start, lap count dropped) starts empty, and like every lap
+    # change its first frame is labeled before the history is cleared again
+    np.testing.assert_array_equal(np.flatnonzero(starts), [0, 1, 4, 10, 11])
+
+    # The first labeled frame of a lap needs HISTORY_SIZE frames since the restart
+    speed = np.full(len(laps), 150.0)
+    slip = np.full(len(laps), 0.3)
+    lat = np.arange(len(laps), dtype=np.float64)
+    yaw = np.zeros(len(laps))
+    steer = np.zeros(len(laps))
+    codes, _ = label_frames(yaw, lat, steer, speed, slip, starts)
+    ref_codes, _ = label_frames_scalar(yaw, lat, steer, speed, slip, starts)
+    np.testing.assert_array_equal(codes, ref_codes)
+    assert np.flatnonzero(codes).tolist() == [4 + HISTORY_SIZE - 1, 4 + HISTORY_SIZE]
@@ -7,6 +7,8 @@ Changed a bit to match new data.
 
 import mmap
 import functools
+import struct
+from operator import itemgetter
 
 
 # ------------------------------------
@@ -205,16 +207,122 @@ class SPageFileStatic(ctypes.Structure):
 
     ]
 
+# ------------------------------------
+
+# Bulk decoding of a page copy: one precompiled struct.Struct per page,
+# generated from _fields_ so it always matches the ctypes layout
+
+def page_layout(cls, *names):
+    """
+    Returns (struct.Struct, {field: (first tuple index, element count)}) for cls
+    Only the named fields are decoded (all of them if none are given), the
+    rest is skipped as padding. packetId is always decoded as value 0.
+    """
+    wanted = set(names) | {"packetId"} if names else None
+    fmt = ["="]
+    fields = {}
+    pos = 0
+    index = 0
+    for name, ctype in cls._fields_:
+        if wanted is not None and name not in wanted:
+            continue
+        descriptor = getattr(cls, name)
+        if descriptor.offset > pos:
+            fmt.append("{}x".format(descriptor.offset - pos))
+        base, count = ctype, 1
+        while issubclass(base, ctypes.Array):
+            count *= base._length_
+            base = base._type_
+        if base is c_wchar:
+            # Strings stay raw bytes - decode only when actually needed
+            fmt.append("{}s".format(descriptor.size))
+            count = 1
+        else:
+            code = "f" if base is c_float else "i"
+            fmt.append(code * count)
+        fields[name] = (index, count)
+        index += count
+        pos = descriptor.offset + descriptor.size
+    return struct.Struct("".join(fmt)), fields
+
+
+PHYSICS_LAYOUT = page_layout(SPageFilePhysics)
+GRAPHICS_LAYOUT = page_layout(SPageFileGraphic)
+
+
+def field_getter(layout, *names):
+    """
+    Precompiled getter pulling several values out of a decoded snapshot tuple
+    Each name is a field ('speedKmh') or a (field, element) pair (('accG', 0))
+    """
+    fields = layout[1]
+    indices = []
+    for name in names:
+        if isinstance(name, tuple):
+            name, element = name
+            indices.append(fields[name][0] + element)
+        else:
+            indices.append(fields[name][0])
+    return itemgetter(*indices)
+
+
+# Offline replay: when set, the pages are backed by files in this directory
+# (named after the shared memory tags) instead of the game's shared memory
+REPLAY_DIR_ENV = "AC_SHM_REPLAY_DIR"
+
+
+def open_page(tag, size, replay_dir=None):
+    """
+    Map one shared memory page
+    With a replay directory the page is a file-backed region with the same
+    layout, created zero-filled if missing (see replay.py)
+    """
+    if replay_dir is None:
+        return mmap.mmap(0, size, tag)
+    path = os.path.join(replay_dir, tag)
+    with open(path, "a+b") as file:
+        if os.path.getsize(path) < size:
+            file.truncate(size)
+        return mmap.mmap(file.fileno(), size)
+
+
 class SimInfo:
-    def __init__(self):
-        self._acpmf_physics = mmap.mmap(0, ctypes.sizeof(SPageFilePhysics), "acpmf_physics")
-        self._acpmf_graphics = mmap.mmap(0, ctypes.sizeof(SPageFileGraphic), "acpmf_graphics")
-        self._acpmf_static = mmap.mmap(0, ctypes.sizeof(SPageFileStatic), "acpmf_static")
+    # Re-copy a page if the game published a new packet mid-copy
+    snapshot_retries = 3
+
+    def __init__(self, replay_dir=None):
+        if replay_dir is None:
+            replay_dir = os.environ.get(REPLAY_DIR_ENV) or None
+        self.replay_dir = replay_dir
+        self._acpmf_physics = open_page("acpmf_physics", ctypes.sizeof(SPageFilePhysics), replay_dir)
+        self._acpmf_graphics = open_page("acpmf_graphics", ctypes.sizeof(SPageFileGraphic), replay_dir)
+        self._acpmf_static = open_page("acpmf_static", ctypes.sizeof(SPageFileStatic), replay_dir)
         self.physics = SPageFilePhysics.from_buffer(self._acpmf_physics)
         self.graphics = SPageFileGraphic.from_buffer(self._acpmf_graphics)
         self.static = SPageFileStatic.from_buffer(self._acpmf_static)
 
+    def snapshot(self, physics_layout=PHYSICS_LAYOUT, graphics_layout=GRAPHICS_LAYOUT):
+        """
+        Consistent copy of the physics and graphics pages for one frame
+        Each page is read in a single pass by one precompiled unpack call,
+        which both copies and decodes it - the values can no longer change
+        under us, and a packet published mid-read is detected and re-read.
+        Returns (physics, graphics) tuples, indexed via the layouts' field maps
+        """
+        return (self._read_page(self._acpmf_physics, self.physics, physics_layout[0]),
+                self._read_page(self._acpmf_graphics, self.graphics, graphics_layout[0]))
+
+    def _read_page(self, mapping, page, layout):
+        for _ in range(self.snapshot_retries):
+            values = layout.unpack_from(mapping)
+            # packetId is the first field of both pages
+            if values[0] == page.packetId:
+                break
+        return values
+
     def close(self):
+        # The page structures export the mappings' buffers; release them first
+        self.physics = self.graphics = self.static = None
         self._acpmf_physics.close()
         self._acpmf_graphics.close()
         self._acpmf_static.close()
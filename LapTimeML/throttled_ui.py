@@ -0,0 +1,31 @@
+"""
+Rate-limited, dirty-checked label updates for the app windows
+
+Telemetry is captured every frame, but the window only needs to be
+redrawn a few times per second - and only labels whose text actually
+changed need an ac.setText call.
+"""
+
+import ac
+
+
+class ThrottledUI:
+    def __init__(self, refresh_hz=10.0):
+        """refresh_hz <= 0 redraws every frame (dirty-checking still applies)"""
+        self.interval = 1.0 / refresh_hz if refresh_hz > 0 else 0.0
+        self._elapsed = self.interval  # Draw on the very first frame
+        self._texts = {}
+
+    def tick(self, deltaT):
+        """Advance the refresh clock; True when the window is due for a redraw"""
+        self._elapsed += deltaT
+        if self._elapsed < self.interval:
+            return False
+        self._elapsed = 0.0
+        return True
+
+    def set_text(self, label, text):
+        """ac.setText, skipped when the label already shows this text"""
+        if self._texts.get(label) != text:
+            self._texts[label] = text
+            ac.setText(label, text)
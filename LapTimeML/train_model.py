@@ -0,0 +1,259 @@
+"""
+Train the in-game handling classifier (handling_model.py) on logged laps
+
+Learns each frame's Label from the last --window frames of MODEL_FEATURES.
+The targets are the logged (rule-based) labels, so out of the box the model
+is a learned, smoothed version of the rules; retrain it on relabeled or
+hand-corrected logs to go beyond them.
+
+Windows never cross a lap boundary (the logger restarts its window every
+lap) and are gathered from one zero-copy sliding-window view of the
+standardised features, so only the current mini-batch is materialised.
+Whole laps are held out for validation, and classes are weighted by
+inverse frequency since Neutral dominates. One ReLU hidden layer, trained
+with mini-batch Adam in NumPy; the result is checked against the
+pure-Python forward pass the app runs before it is saved.
+
+    python train_model.py third_party/log.csv --out third_party/handling_model.bin
+"""
+
+import os
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from handling_model import HandlingModel, MODEL_FEATURES
+from lap_buffer import LABELS
+from relabel import history_starts
+from resample import load_log, lap_bounds
+
+DEFAULT_WINDOW = 10  # Frames per prediction (~0.17 s at 60fps)
+DEFAULT_HIDDEN = 16
+DEFAULT_STEPS = 2000  # Mini-batch updates when no --epochs is given (epochs scale with the log)
+DEFAULT_BATCH = 512
+DEFAULT_LR = 1e-3
+VALIDATION_EVERY = 5  # Every 5th lap is held out
+
+# Minimum share of windows where the app's float math must pick the same class
+MIN_EXPORT_AGREEMENT = 0.99
+
+
+def window_ends(starts, window):
+    """
+    Frames with a full window in the logger: the last `window` frames since
+    the window was last emptied (relabel.history_starts - the logger resets
+    it together with the label history)
+    """
+    index = np.arange(len(starts))
+    start_index = np.maximum.accumulate(np.where(starts, index, 0))
+    return index[index - start_index >= window - 1]
+
+
+def complete_windows(ends, valid, window):
+    """The ends whose whole window is valid (labeled, finite)"""
+    invalid = np.concatenate([[0], np.cumsum(~valid)])
+    return ends[invalid[ends + 1] - invalid[ends + 1 - window] == 0]
+
+
+def split_laps(ends, bounds, every=VALIDATION_EVERY):
+    """
+    (training ends, validation ends) by the lap of each window's last frame
+    Every `every`-th lap is validation (the last lap if there are fewer; none with a single lap)
+    """
+    if len(bounds) < 2:
+        return ends, ends[:0]
+    lap_index = np.repeat(np.arange(len(bounds)), [end - start for start, end in bounds])
+    held_out = lap_index % every == every - 1 if len(bounds) >= every else lap_index == len(bounds) - 1
+    validation = held_out[ends]
+    return ends[~validation], ends[validation]
+
+
+def window_batch(windows, ends, window):
+    """Flattened windows ending at the given frames (only these are copied)"""
+    return windows[ends - window + 1].reshape(len(ends), -1)
+
+
+def init_params(rng, inputs, hidden, classes):
+    return {
+        'w1': rng.normal(0, np.sqrt(2.0 / inputs), (hidden, inputs)),
+        'b1': np.zeros(hidden),
+        'w2': rng.normal(0, np.sqrt(1.0 / hidden), (classes, hidden)),
+        'b2': np.zeros(classes),
+    }
+
+
+def forward(params, x):
+    """(hidden activations, logits) for a batch of flattened windows"""
+    hidden = np.maximum(x @ params['w1'].T + params['b1'], 0.0)
+    return hidden, hidden @ params['w2'].T + params['b2']
+
+
+def predict(params, x):
+    return forward(params, x)[1].argmax(axis=1)
+
+
+def train(windows, targets, ends, window, params, class_weights, epochs, batch, lr, seed=0):
+    """Mini-batch Adam on weighted softmax cross-entropy; returns the final epoch's mean loss"""
+    rng = np.random.default_rng(seed)
+    moments = {name: (np.zeros_like(p), np.zeros_like(p)) for name, p in params.items()}
+    beta1, beta2, eps = 0.9, 0.999, 1e-8
+    step = 0
+    loss = float('nan')
+    for _ in range(epochs):
+        order = rng.permutation(ends)
+        total, weight_sum = 0.0, 0.0
+        for first in range(0, len(order), batch):
+            idx = order[first:first + batch]
+            x = window_batch(windows, idx, window)
+            y = targets[idx]
+            w = class_weights[y]
+
+            hidden, logits = forward(params, x)
+            logits -= logits.max(axis=1, keepdims=True)
+            prob = np.exp(logits)
+            prob /= prob.sum(axis=1, keepdims=True)
+            total += -(w * np.log(prob[np.arange(len(y)), y] + 1e-12)).sum()
+            weight_sum += w.sum()
+
+            grad_logits = prob
+            grad_logits[np.arange(len(y)), y] -= 1.0
+            grad_logits *= (w / w.sum())[:, None]
+            grad_hidden = (grad_logits @ params['w2']) * (hidden > 0)
+            grads = {
+                'w2': grad_logits.T @ hidden, 'b2': grad_logits.sum(axis=0),
+                'w1': grad_hidden.T @ x, 'b1': grad_hidden.sum(axis=0),
+            }
+
+            step += 1
+            for name, grad in grads.items():
+                m, v = moments[name]
+                m *= beta1
+                m += (1 - beta1) * grad
+                v *= beta2
+                v += (1 - beta2) * grad * grad
+                params[name] -= lr * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + eps)
+        loss = total / max(weight_sum, 1e-12)
+    return loss
+
+
+def confusion(targets, predicted, classes=len(LABELS)):
+    """classes x classes counts, rows = target"""
+    return np.bincount(targets * classes + predicted, minlength=classes * classes).reshape(classes, classes)
+
+
+def print_evaluation(name, matrix):
+    total = matrix.sum()
+    accuracy = np.trace(matrix) / total if total else float('nan')
+    recalls = ', '.join(f"{label} {matrix[i, i] / matrix[i].sum():.1%}" if matrix[i].sum() else f"{label} -"
+                        for i, label in enumerate(LABELS))
+    print(f"  {name:<11}{total:>9,} windows  accuracy {accuracy:.1%}  recall: {recalls}")
+
+
+def export_model(params, window, mean, scale):
+    """HandlingModel of the trained parameters, rounded to float32 as they are saved"""
+    def values(a):
+        return a.astype(np.float32).astype(np.float64).tolist()
+    return HandlingModel(window, MODEL_FEATURES, values(mean), values(scale),
+                         values(params['w1']), values(params['b1']), values(params['w2']), values(params['b2']))
+
+
+def export_agreement(model, params, windows, ends, window, samples=500, seed=0):
+    """Share of sampled windows where the app's pure-Python forward pass picks NumPy's class"""
+    if not len(ends):
+        return 1.0
+    rng = np.random.default_rng(seed)
+    idx = rng.choice(ends, min(samples, len(ends)), replace=False)
+    x = window_batch(windows, idx, window)
+    expected = predict(params, x)
+    actual = [model.predict(row)[0] for row in x.tolist()]
+    return float(np.mean(np.asarray(actual) == expected))
+
+
+def main(file_path, out, window, hidden, epochs, batch, lr, seed):
+    start = time.perf_counter()
+    columns = load_log(file_path, list(MODEL_FEATURES) + ['Label'])
+    missing = [name for name in MODEL_FEATURES if name not in columns]
+    if missing:
+        print(f"❌ Log has no {', '.join(missing)} column(s) - record laps with the current logger first")
+        return False
+
+    labeled = np.isfinite(np.asarray(columns['Label'], dtype=np.float64))
+    features = np.column_stack([np.asarray(columns[name], dtype=np.float64) for name in MODEL_FEATURES])
+    labeled &= np.isfinite(features).all(axis=1)
+    bounds = lap_bounds(columns['Lap'], columns.get('Session'))
+    targets = np.where(labeled, np.asarray(columns['Label'], dtype=np.float64), 0).astype(np.int64)
+
+    ends = window_ends(history_starts(columns['Lap'], columns.get('Session')), window)
+    train_ends, val_ends = split_laps(ends, bounds)
+    train_ends = complete_windows(train_ends, labeled, window)
+    val_ends = complete_windows(val_ends, labeled, window)
+    if not len(train_ends):
+        print(f"❌ No complete {window}-frame windows to train on")
+        return False
+
+    # Standardise with training statistics; NaN rows are never part of a complete window
+    train_rows = np.zeros(len(features), dtype=bool)
+    for offset in range(window):
+        train_rows[train_ends - offset] = True
+    mean = features[train_rows].mean(axis=0)
+    scale = features[train_rows].std(axis=0)
+    scale[scale == 0] = 1.0
+    standardised = np.nan_to_num((features - mean) / scale)
+    windows = sliding_window_view(standardised, (window, len(MODEL_FEATURES)))[:, 0]  # Indexed by first frame
+    loaded_s = time.perf_counter() - start
+    print(f"Loaded {len(features):,} frames ({len(bounds)} laps) in {loaded_s:.2f} s: "
+          f"{len(train_ends):,} training / {len(val_ends):,} validation windows")
+
+    counts = np.bincount(targets[train_ends], minlength=len(LABELS)).astype(np.float64)
+    class_weights = np.where(counts > 0, counts.sum() / (len(LABELS) * np.maximum(counts, 1)), 0.0)
+    print("Class weights: " + ", ".join(f"{label} {w:.2f}" for label, w in zip(LABELS, class_weights)))
+
+    if epochs is None:
+        epochs = max(1, -(-DEFAULT_STEPS * batch // len(train_ends)))
+    rng = np.random.default_rng(seed)
+    params = init_params(rng, window * len(MODEL_FEATURES), hidden, len(LABELS))
+    start = time.perf_counter()
+    loss = train(windows, targets, train_ends, window, params, class_weights, epochs, batch, lr, seed)
+    print(f"Trained {epochs} epochs in {time.perf_counter() - start:.1f} s, final loss {loss:.4f}\n")
+
+    def evaluate(ends):
+        return confusion(targets[ends], predict(params, window_batch(windows, ends, window)))
+
+    print_evaluation("training", evaluate(train_ends))
+    if len(val_ends):
+        matrix = evaluate(val_ends)
+        print_evaluation("validation", matrix)
+        print("  confusion (rows: logged label, columns: predicted)")
+        for label, row in zip(LABELS, matrix):
+            print(f"    {label:<11}" + "".join(f"{n:>9,}" for n in row))
+
+    model = export_model(params, window, mean, scale)
+    agreement = export_agreement(model, params, windows, val_ends if len(val_ends) else train_ends, window)
+    print(f"\nIn-game forward pass agrees with NumPy on {agreement:.1%} of sampled windows")
+    if agreement < MIN_EXPORT_AGREEMENT:
+        print("❌ Exported model does not reproduce the trained one - not saved")
+        return False
+    if out:
+        model.save(out)
+        print(f"Saved {out} ({os.path.getsize(out):,} bytes)")
+    return True
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the in-game handling classifier on a log")
+    parser.add_argument("file_path", nargs="?", default=os.path.join("third_party", "log.csv"),
+                        help="log.csv or binary log (.bin)")
+    parser.add_argument("--out", metavar="PATH", help="model file to write (e.g. third_party/handling_model.bin)")
+    parser.add_argument("--window", type=int, default=DEFAULT_WINDOW, help=f"frames per prediction (default {DEFAULT_WINDOW})")
+    parser.add_argument("--hidden", type=int, default=DEFAULT_HIDDEN, help=f"hidden units (default {DEFAULT_HIDDEN})")
+    parser.add_argument("--epochs", type=int,
+                        help=f"passes over the training windows (default: about {DEFAULT_STEPS} mini-batches)")
+    parser.add_argument("--batch", type=int, default=DEFAULT_BATCH)
+    parser.add_argument("--lr", type=float, default=DEFAULT_LR)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    ok = main(args.file_path, args.out, args.window, args.hidden, args.epochs, args.batch, args.lr, args.seed)
+    raise SystemExit(0 if ok else 1)